@@ -0,0 +1,128 @@
+"""
+Doctor assignment for Healthcare MCP Server
+Pluggable strategies that order free doctors when a booking is auto-assigned
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from backend.occupancy import OccupancyIndex
+
+
+def daily_load(occupancy: OccupancyIndex, doctor_id: str, date: str) -> int:
+    """
+    Bookings a doctor has on date.
+
+    Popcount of the occupancy bitmap, which create/cancel keep current, so
+    no COUNT query is needed per booking.
+    """
+    return bin(occupancy.mask(doctor_id, date)).count("1")
+
+
+class AssignmentStrategy(ABC):
+    """Orders candidate doctors, best first"""
+
+    name = ""
+
+    @abstractmethod
+    def order(self, candidates: List[Dict[str, Any]], date: str, occupancy: OccupancyIndex) -> List[Dict[str, Any]]:
+        """Return candidates (free doctors for date) in the order to try them"""
+
+
+class FirstAvailableStrategy(AssignmentStrategy):
+    """Roster order (the original behaviour)"""
+
+    name = "first_available"
+
+    def order(self, candidates, date, occupancy):
+        return list(candidates)
+
+
+class LeastBookedStrategy(AssignmentStrategy):
+    """Fewest bookings that day first, ties by doctor id"""
+
+    name = "least_booked"
+
+    def order(self, candidates, date, occupancy):
+        return sorted(candidates, key=lambda doctor: (daily_load(occupancy, doctor["id"], date), doctor["id"]))
+
+
+class RoundRobinStrategy(AssignmentStrategy):
+    """Rotates the starting doctor per specialty on every booking"""
+
+    name = "round_robin"
+
+    def __init__(self):
+        self._next: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def order(self, candidates, date, occupancy):
+        if not candidates:
+            return []
+        ordered = sorted(candidates, key=lambda doctor: doctor["id"])
+        specialty = (ordered[0].get("specialty") or "").lower()
+        with self._lock:
+            start = self._next.get(specialty, 0) % len(ordered)
+            self._next[specialty] = start + 1
+        return ordered[start:] + ordered[:start]
+
+
+class ExperienceWeightedStrategy(AssignmentStrategy):
+    """
+    Lowest load per unit of capacity first, where capacity grows with
+    years_experience: with the default weight a 20-year doctor takes twice
+    the daily load of a new one before colleagues are preferred.
+    """
+
+    name = "experience_weighted"
+
+    def __init__(self, weight_per_year: float = 0.05):
+        self.weight_per_year = weight_per_year
+
+    def _capacity(self, doctor: Dict[str, Any]) -> float:
+        return 1.0 + self.weight_per_year * (doctor.get("years_experience") or 0)
+
+    def order(self, candidates, date, occupancy):
+        return sorted(
+            candidates,
+            key=lambda doctor: (
+                daily_load(occupancy, doctor["id"], date) / self._capacity(doctor),
+                -(doctor.get("years_experience") or 0),
+                doctor["id"],
+            ),
+        )
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (FirstAvailableStrategy, LeastBookedStrategy, RoundRobinStrategy, ExperienceWeightedStrategy)
+}
+
+_strategy: Optional[AssignmentStrategy] = None
+_strategy_lock = threading.Lock()
+
+
+def get_assignment_strategy() -> AssignmentStrategy:
+    """
+    Get the strategy named by ASSIGNMENT_STRATEGY (default: least_booked).
+
+    Raises:
+        ValueError: ASSIGNMENT_STRATEGY names no known strategy
+    """
+    global _strategy
+    with _strategy_lock:
+        if _strategy is None:
+            name = os.getenv("ASSIGNMENT_STRATEGY", LeastBookedStrategy.name).lower()
+            if name not in STRATEGIES:
+                raise ValueError(f"Unknown ASSIGNMENT_STRATEGY '{name}'. Choose from: {', '.join(STRATEGIES)}")
+            _strategy = STRATEGIES[name]()
+        return _strategy
+
+
+def set_assignment_strategy(strategy: AssignmentStrategy) -> None:
+    """Replace the active strategy (e.g. a custom AssignmentStrategy subclass)"""
+    global _strategy
+    with _strategy_lock:
+        _strategy = strategy
@@ -0,0 +1,140 @@
+"""
+Availability calendar for Healthcare MCP Server
+Materializes one free-slot bitmap per (doctor_id, date) from weekly schedules,
+doctor_availability overrides and the occupancy index
+"""
+
+import threading
+import time as _time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.occupancy import SLOTS_PER_DAY, OccupancyIndex, range_mask, time_to_slot
+
+# Hours used when an override opens a day the weekly schedule does not cover
+EXTRA_DAY_HOURS = ("09:00", "17:00")
+
+
+def working_mask(schedule_rows: List[Dict[str, Any]], override: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Bitmap of slots a doctor works on one date.
+
+    An override with is_available = false (vacation, sick day) clears the day;
+    one with is_available = true opens EXTRA_DAY_HOURS on a day without
+    weekly hours. Schedule end times are exclusive.
+    """
+    if override is not None and not override.get("is_available", True):
+        return 0
+
+    mask = 0
+    for row in schedule_rows:
+        if row.get("is_available", True):
+            mask |= range_mask(row["start_time"], row["end_time"])
+
+    if override is not None and not mask:
+        mask = range_mask(*EXTRA_DAY_HOURS)
+    return mask
+
+
+class AvailabilityCalendar:
+    """
+    Precomputed free slots per doctor-day.
+
+    Working hours are loaded once per doctor-day and expire after
+    `ttl_seconds`; the free bitmap is kept current by listening to the
+    occupancy index, so bookings and cancellations update it in place.
+    """
+
+    def __init__(self, occupancy: OccupancyIndex, ttl_seconds: float = 300.0):
+        self.occupancy = occupancy
+        self.ttl_seconds = ttl_seconds
+        # (doctor_id, date) -> (working_mask, free_mask, loaded_at)
+        self._days: Dict[Tuple[str, str], Tuple[int, int, float]] = {}
+        self._lock = threading.Lock()
+        occupancy.add_listener(self._on_occupancy_change)
+
+    def _entry(self, doctor_id: str, date: str) -> Optional[Tuple[int, int, float]]:
+        entry = self._days.get((doctor_id, date))
+        if entry is None or _time.monotonic() - entry[2] > self.ttl_seconds:
+            return None
+        return entry
+
+    def missing(self, doctor_ids: List[str], date: str) -> List[str]:
+        """Return the doctor_ids whose working hours for date are not loaded (or have expired)"""
+        return [doctor_id for doctor_id in doctor_ids if self._entry(doctor_id, date) is None]
+
+    def load_day(
+        self,
+        doctor_ids: List[str],
+        date: str,
+        schedules_by_doctor: Dict[str, List[Dict[str, Any]]],
+        overrides: Dict[str, Dict[str, Any]]
+    ) -> None:
+        """Materialize doctor_ids' day from that weekday's schedule rows and date overrides"""
+        loaded_at = _time.monotonic()
+        with self._lock:
+            for doctor_id in doctor_ids:
+                working = working_mask(schedules_by_doctor.get(doctor_id, []), overrides.get(doctor_id))
+                free = working & ~self.occupancy.mask(doctor_id, date)
+                self._days[(doctor_id, date)] = (working, free, loaded_at)
+
+    def _on_occupancy_change(self, doctor_id: str, date: str, booked: Optional[int]) -> None:
+        if booked is None:
+            return  # Refreshed when load_day_calendar reloads the occupancy
+        with self._lock:
+            entry = self._days.get((doctor_id, date))
+            if entry is not None:
+                working, _, loaded_at = entry
+                self._days[(doctor_id, date)] = (working, working & ~booked, loaded_at)
+
+    def working_mask(self, doctor_id: str, date: str) -> int:
+        """Slots the doctor works on date (0 if not loaded)"""
+        entry = self._entry(doctor_id, date)
+        return entry[0] if entry else 0
+
+    def free_mask(self, doctor_id: str, date: str) -> int:
+        """Slots the doctor works on date and has not booked (0 if not loaded)"""
+        entry = self._entry(doctor_id, date)
+        return entry[1] if entry else 0
+
+    def is_free(self, doctor_id: str, date: str, time: str) -> bool:
+        """True if the doctor works at `time` on date and the slot is open"""
+        return bool((self.free_mask(doctor_id, date) >> time_to_slot(time)) & 1)
+
+    def free_doctor_ids(self, doctor_ids: List[str], date: str, time: str) -> List[str]:
+        """Subset of doctor_ids with the slot at `time` open"""
+        return [doctor_id for doctor_id in doctor_ids if self.is_free(doctor_id, date, time)]
+
+    def any_free_mask(self, doctor_ids: List[str], date: str) -> int:
+        """OR of free slots across doctors - a set bit means someone is free"""
+        union = 0
+        for doctor_id in doctor_ids:
+            union |= self.free_mask(doctor_id, date)
+        return union
+
+    def invalidate(self, doctor_id: Optional[str] = None, date: Optional[str] = None) -> int:
+        """Drop materialized days for a doctor and/or date (all days if both are None)"""
+        with self._lock:
+            stale = [
+                key for key in self._days
+                if (doctor_id is None or key[0] == doctor_id) and (date is None or key[1] == date)
+            ]
+            for key in stale:
+                del self._days[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        """Drop every materialized day"""
+        with self._lock:
+            self._days.clear()
+
+
+# ============ Range Search ============
+
+def window_mask(windows: List[Tuple[str, str]]) -> int:
+    """Bitmap of slots inside any (start, end) time-of-day window; every slot if windows is empty"""
+    if not windows:
+        return (1 << SLOTS_PER_DAY) - 1
+    mask = 0
+    for start, end in windows:
+        mask |= range_mask(start, end)
+    return mask
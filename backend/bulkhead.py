@@ -0,0 +1,186 @@
+"""
+Bulkheads for Healthcare MCP Server
+Per-class concurrency limits with bounded queues, so slow tools (LLM calls)
+cannot take the capacity fast tools (bookings) need
+"""
+
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+
+from backend import deadline
+
+
+class BulkheadFull(Exception):
+    """The bulkhead's slots and queue are all taken; retry after `retry_after` seconds"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Bulkhead '{name}' is full")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued caller; granted/abandoned are only changed under the bulkhead lock"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.granted = False
+        self.abandoned = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+
+class Bulkhead:
+    """
+    At most `max_concurrent` calls run at once; up to `max_queue` more wait
+    in FIFO order and anything beyond that is rejected immediately with
+    BulkheadFull. Queued callers give up when their deadline runs out.
+
+    Works from worker threads (enter) and the event loop (enter_async,
+    run_in_thread), which share the same slots.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Moving average of call duration, used for the retry-after hint
+        self._avg_seconds = 1.0
+        self.admitted = 0
+        self.rejected = 0
+
+    def _retry_after(self) -> int:
+        # Time for the queue ahead of a new caller to drain
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._avg_seconds * backlog / self.max_concurrent))
+
+    def _admit(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[_Waiter]:
+        """Take a slot (returns None) or join the queue (returns the waiter)"""
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                self.admitted += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise BulkheadFull(self.name, self._retry_after())
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _settle(self, waiter: _Waiter) -> bool:
+        """After waiting: True if the waiter got a slot, else take it out of the queue"""
+        with self._lock:
+            if waiter.granted:
+                self.admitted += 1
+                return True
+            waiter.abandoned = True
+            self._waiters.remove(waiter)
+            return False
+
+    def _release(self, elapsed: Optional[float] = None) -> None:
+        with self._lock:
+            if elapsed is not None:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.abandoned:
+                    waiter.granted = True  # The slot passes straight to the waiter
+                    waiter.wake()
+                    return
+            self._active -= 1
+
+    @contextmanager
+    def enter(self) -> Iterator[None]:
+        """Hold a slot for the enclosed work (blocking, for worker threads)"""
+        waiter = self._admit()
+        if waiter is not None:
+            left = deadline.remaining()
+            waiter.event.wait(timeout=None if left is None else max(left, 0))
+            if not self._settle(waiter):
+                raise deadline.DeadlineExceeded(f"Timed out waiting for the '{self.name}' bulkhead")
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    async def _acquire_async(self) -> None:
+        waiter = self._admit(asyncio.get_running_loop())
+        if waiter is None:
+            return
+        left = deadline.remaining()
+        try:
+            await asyncio.wait_for(waiter.future, timeout=None if left is None else max(left, 0))
+        except BaseException:
+            # Timed out or cancelled - unless the slot was handed over meanwhile
+            if self._settle(waiter):
+                self._release()
+            raise
+        self._settle(waiter)
+
+    @asynccontextmanager
+    async def enter_async(self) -> AsyncIterator[None]:
+        """Hold a slot for the enclosed work (for the event loop)"""
+        await self._acquire_async()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    async def run_in_thread(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking function on this bulkhead's own threads.
+
+        The slot is held until the thread finishes, even if the awaiting
+        request is cancelled, so abandoned work still counts against the limit.
+        """
+        await self._acquire_async()
+        started = time.monotonic()
+        try:
+            job = self._pool().submit(contextvars.copy_context().run, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        job.add_done_callback(lambda _: self._release(time.monotonic() - started))
+        return await asyncio.wrap_future(job)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent, thread_name_prefix=f"bulkhead-{self.name}"
+                )
+            return self._executor
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy and rejection counters for metrics"""
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_ms": round(self._avg_seconds * 1000, 1),
+            }
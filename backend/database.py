@@ -3,14 +3,144 @@ Database layer for Healthcare MCP Server
 Uses Supabase (PostgreSQL) for storing doctors, schedules, and appointments
 """
 
+import asyncio
 import os
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Callable, Tuple
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from backend.availability import AvailabilityCalendar
+from backend.cache import TTLCache
+from backend.deadline import apply_deadline, apply_deadline_async
+from backend.occupancy import OccupancyIndex
+from backend.search import DoctorSearchIndex
 
 load_dotenv()
 
+# PostgREST caps responses (1000 rows by default), so large reads are paged
+PAGE_SIZE = 1000
+
+
+class RpcUnavailableError(Exception):
+    """A SQL function from supabase_schema.sql has not been deployed yet"""
+
+
+class SlotTakenError(Exception):
+    """The doctor already has an active appointment in this slot"""
+
+
+# Partial unique index on active appointments (see supabase_schema.sql)
+ACTIVE_SLOT_INDEX = "idx_appointments_active_slot"
+
+
+def _is_slot_taken(error: APIError) -> bool:
+    return getattr(error, "code", None) == "23505" and ACTIVE_SLOT_INDEX in str(getattr(error, "message", ""))
+
+
+# SQL functions PostgREST reported as missing; skipped until the process restarts
+_missing_functions: set = set()
+
+
+def _is_missing_function(error: APIError) -> bool:
+    # PostgREST answers PGRST202 when the function is not in its schema cache
+    return getattr(error, "code", None) == "PGRST202"
+
+
+def _require_function(name: str) -> None:
+    if name in _missing_functions:
+        raise RpcUnavailableError(name)
+
+
+def _mark_missing_function(name: str, error: APIError) -> None:
+    if _is_missing_function(error):
+        _missing_functions.add(name)
+        raise RpcUnavailableError(name) from error
+
+
+def _book_slot_params(booking_data: Dict[str, Any], candidates: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Map an appointment row (and an ordered auto-assign shortlist) onto the book_slot() SQL function parameters"""
+    params = {
+        "p_confirmation_number": booking_data["confirmation_number"],
+        "p_patient_id": booking_data["patient_id"],
+        "p_date": booking_data["appointment_date"],
+        "p_time": booking_data["appointment_time"],
+        "p_specialty": booking_data["specialty"],
+        "p_reason": booking_data.get("reason"),
+        "p_doctor_id": booking_data.get("doctor_id"),
+    }
+    if candidates:
+        params["p_candidates"] = candidates
+    return params
+
+
+def _supabase_credentials() -> Tuple[str, str]:
+    """Read the Supabase URL and key from the environment"""
+    supabase_url = os.getenv("SUPABASE_URL")
+    
+    # Use service_role key for admin operations if available, otherwise anon key
+    supabase_key = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY")
+    
+    if not supabase_url or not supabase_key:
+        raise ValueError(
+            "SUPABASE_URL and SUPABASE_KEY (or SUPABASE_SERVICE_KEY) must be set in environment. "
+            "Get them from https://supabase.com/dashboard/project/_/settings/api"
+        )
+    return supabase_url, supabase_key
+
+
+def _group_by_doctor(rows: List[Dict[str, Any]], doctor_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group rows by doctor_id, with an empty list for doctors that have none"""
+    grouped: Dict[str, List[Dict[str, Any]]] = {doctor_id: [] for doctor_id in doctor_ids}
+    for row in rows:
+        grouped.setdefault(row["doctor_id"], []).append(row)
+    return grouped
+
+
+def _day_schedules(weekly: Dict[str, List[Dict[str, Any]]], weekday: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Keep only the available schedule rows for one weekday"""
+    return {
+        doctor_id: [row for row in rows if row["day_of_week"] == weekday and row.get("is_available")]
+        for doctor_id, rows in weekly.items()
+    }
+
+
+def _record_booking(outcome: Dict[str, Any], doctor_cache: TTLCache, occupancy: OccupancyIndex) -> Dict[str, Any]:
+    """Mirror a book_slot() result into the in-process caches"""
+    if outcome.get("doctor"):
+        doctor_cache.set(("doctor", outcome["doctor"]["id"]), outcome["doctor"])
+    if outcome.get("status") == "booked":
+        appointment = outcome["appointment"]
+        occupancy.book(appointment["doctor_id"], appointment["appointment_date"], appointment["appointment_time"])
+    return outcome
+
+
+def _release_cancelled(
+    rows: List[Dict[str, Any]],
+    confirmation_number: str,
+    occupancy: OccupancyIndex,
+    appointment_cache: TTLCache
+) -> None:
+    """Free cancelled slots in the occupancy index and drop the cached appointment"""
+    for row in rows:
+        if row.get("doctor_id"):
+            occupancy.release(row["doctor_id"], row["appointment_date"], row["appointment_time"])
+    appointment_cache.invalidate(confirmation_number)
+
+
+def _unmatched_cancel_outcome(rows: List[Dict[str, Any]]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Explain why the conditional cancel UPDATE matched no row"""
+    if not rows:
+        return "not_found", None
+    if rows[0].get("status") == "cancelled":
+        return "already_cancelled", rows[0]
+    # Visible but not updatable (e.g. row-level security) or changed in between
+    return "not_cancellable", rows[0]
+
+
 class Database:
     _instance = None
     
@@ -22,83 +152,109 @@ class Database:
     
     def _init_client(self):
         """Initialize Supabase client"""
-        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_url, supabase_key = _supabase_credentials()
         
-        # Use service_role key for admin operations if available, otherwise anon key
-        supabase_key = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY")
+        self.client: Client = create_client(supabase_url, supabase_key)
+        # Bound every query by the calling request's remaining deadline
+        self.client.postgrest.session.event_hooks["request"].append(apply_deadline)
         
-        if not supabase_url or not supabase_key:
-            raise ValueError(
-                "SUPABASE_URL and SUPABASE_KEY (or SUPABASE_SERVICE_KEY) must be set in environment. "
-                "Get them from https://supabase.com/dashboard/project/_/settings/api"
-            )
+        # Doctors and weekly schedules change rarely - serve them from memory
+        cache_ttl = float(os.getenv("DOCTOR_CACHE_TTL_SECONDS", "300"))
+        cache_size = int(os.getenv("DOCTOR_CACHE_MAX_ENTRIES", "4096"))
+        self.doctor_cache = TTLCache(ttl_seconds=cache_ttl, maxsize=cache_size)
+        self.schedule_cache = TTLCache(ttl_seconds=cache_ttl, maxsize=cache_size)
         
-        self.client: Client = create_client(supabase_url, supabase_key)
+        # Booked-slot bitmaps per doctor-day, kept in sync by create/cancel
+        self.occupancy = OccupancyIndex(ttl_seconds=float(os.getenv("OCCUPANCY_TTL_SECONDS", "30")))
+        
+        # Free-slot bitmaps per doctor-day (schedules + overrides - occupancy)
+        self.calendar = AvailabilityCalendar(self.occupancy, ttl_seconds=cache_ttl)
+        
+        # Appointments by confirmation number for patients polling their booking
+        self.appointment_cache = TTLCache(
+            ttl_seconds=float(os.getenv("APPOINTMENT_CACHE_TTL_SECONDS", "60")),
+            maxsize=int(os.getenv("APPOINTMENT_CACHE_MAX_ENTRIES", "1024"))
+        )
+        
+        # Fuzzy name/specialty index, rebuilt whenever the cached roster changes
+        self._search_index: Optional[DoctorSearchIndex] = None
+        self._search_roster: Optional[List[Dict[str, Any]]] = None
+        
+        self._change_listeners: List[Callable[[str, Optional[str]], None]] = []
+    
+    def add_change_listener(self, listener: Callable[[str, Optional[str]], None]) -> None:
+        """
+        Call listener(table, date) after doctors, doctor_schedules or
+        doctor_availability are written through this client.
+        
+        date is the overridden date for doctor_availability, None otherwise.
+        """
+        self._change_listeners.append(listener)
+    
+    def _notify_change(self, table: str, date: Optional[str] = None) -> None:
+        for listener in self._change_listeners:
+            listener(table, date)
     
     # ============ Doctor Operations ============
     
     def get_doctors(self, specialty: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all doctors or filter by specialty"""
-        query = self.client.table("doctors").select("*")
-        
-        if specialty:
-            query = query.eq("specialty", specialty.lower())
+        """Get all doctors or filter by specialty (cached)"""
+        key = ("doctors", specialty.lower() if specialty else None)
+        return self.doctor_cache.get_or_load(key, lambda: self._fetch_doctors(specialty))
+    
+    def _fetch_doctors(self, specialty: Optional[str]) -> List[Dict[str, Any]]:
+        doctors = []
+        while True:
+            query = self.client.table("doctors").select("*")
+            
+            if specialty:
+                query = query.eq("specialty", specialty.lower())
+            
+            response = query.order("id").range(len(doctors), len(doctors) + PAGE_SIZE - 1).execute()
+            page = response.data if response.data else []
+            doctors.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
         
-        response = query.execute()
-        return response.data if response.data else []
+        # Prime per-doctor entries so get_doctor_by_id rarely hits the network
+        for doctor in doctors:
+            self.doctor_cache.set(("doctor", doctor["id"]), doctor)
+        return doctors
     
     def get_doctor_by_id(self, doctor_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific doctor by ID"""
+        """Get a specific doctor by ID (cached)"""
+        return self.doctor_cache.get_or_load(("doctor", doctor_id), lambda: self._fetch_doctor(doctor_id))
+    
+    def _fetch_doctor(self, doctor_id: str) -> Optional[Dict[str, Any]]:
         response = self.client.table("doctors").select("*").eq("id", doctor_id).single().execute()
         return response.data if hasattr(response, 'data') else None
     
+    def doctor_search_index(self) -> DoctorSearchIndex:
+        """Trigram index over the cached roster (rebuilt when the roster is reloaded)"""
+        roster = self.get_doctors()
+        if roster is not self._search_roster:
+            self._search_index = DoctorSearchIndex(roster)
+            self._search_roster = roster
+        return self._search_index
+    
     def get_doctor_by_name(self, name: str) -> Optional[Dict[str, Any]]:
-        """Find a doctor by name (partial match)"""
-        # Remove common prefixes and normalize
-        normalized_name = name.lower().replace('dr.', '').replace('dr ', '').strip()
-        
-        # Try exact match first
-        response = self.client.table("doctors").select("*").ilike("name", f"%{normalized_name}%").execute()
-        
-        if response.data and len(response.data) > 0:
-            return response.data[0]
-        
-        # Try with "Dr. " prefix
-        if not normalized_name.startswith('dr'):
-            response = self.client.table("doctors").select("*").ilike("name", f"%Dr. {normalized_name}%").execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-        
-        return None
+        """Find the best fuzzy match for a doctor's name (e.g. 'Dr. Sarah Johnson', 'priya patel')"""
+        matches = self.doctor_search_index().search(name, limit=1)
+        return matches[0][1] if matches else None
     
-    def search_doctors(self, search_term: str) -> List[Dict[str, Any]]:
-        """Search doctors by name, specialty, or ID"""
-        results = []
-        
+    def search_doctors(self, search_term: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search doctors by ID, name, or specialty - ranked best match first, served from memory"""
         # Try ID match
         if search_term.startswith('doc_'):
             doctor = self.get_doctor_by_id(search_term)
             if doctor:
-                results.append(doctor)
-                return results
-        
-        # Try name match
-        normalized = search_term.lower().replace('dr.', '').replace('dr ', '').strip()
-        response = self.client.table("doctors").select("*").ilike("name", f"%{normalized}%").execute()
-        if response.data:
-            results.extend(response.data)
-        
-        # Try specialty match
-        if not results:
-            response = self.client.table("doctors").select("*").ilike("specialty", f"%{normalized}%").execute()
-            if response.data:
-                results.extend(response.data)
+                return [doctor]
         
-        return results
+        return [doctor for _, doctor in self.doctor_search_index().search(search_term, limit=limit)]
     
-    def seed_doctors(self):
-        """Seed initial doctor data (run once) - requires service_role key"""
-        doctors = [
+    def get_default_doctors(self) -> List[Dict[str, Any]]:
+        """Get the default doctor roster for seeding"""
+        return [
             {"id": "doc_001", "name": "Dr. Sarah Johnson", "specialty": "cardiology", "email": "sarah.j@healthcare.com", "years_experience": 12},
             {"id": "doc_002", "name": "Dr. Michael Chen", "specialty": "cardiology", "email": "michael.c@healthcare.com", "years_experience": 8},
             {"id": "doc_003", "name": "Dr. Emily Davis", "specialty": "dermatology", "email": "emily.d@healthcare.com", "years_experience": 15},
@@ -108,27 +264,51 @@ class Database:
             {"id": "doc_007", "name": "Dr. Lisa Anderson", "specialty": "neurology", "email": "lisa.a@healthcare.com", "years_experience": 14},
             {"id": "doc_008", "name": "Dr. David Kim", "specialty": "general practice", "email": "david.k@healthcare.com", "years_experience": 9},
         ]
+    
+    def seed_doctors(self, doctors: Optional[List[Dict[str, Any]]] = None, batch_size: Optional[int] = None):
+        """Seed doctor data (defaults to the built-in roster) - requires service_role key"""
+        if doctors is None:
+            doctors = self.get_default_doctors()
         
-        seeded = 0
-        for doctor in doctors:
-            try:
-                self.client.table("doctors").upsert(doctor).execute()
-                seeded += 1
-            except Exception as e:
-                print(f"   ⚠️  {doctor['name']}: {str(e)[:60]}")
+        seeded = self.bulk_upsert("doctors", doctors, on_conflict="id", batch_size=batch_size)
         
+        self.invalidate_doctor_cache()
         return seeded
     
     # ============ Schedule Operations ============
     
     def get_doctor_schedule(self, doctor_id: str) -> List[Dict[str, Any]]:
-        """Get weekly schedule for a doctor"""
-        response = self.client.table("doctor_schedules") \
-            .select("*") \
-            .eq("doctor_id", doctor_id) \
-            .order("day_of_week") \
-            .execute()
-        return response.data if response.data else []
+        """Get weekly schedule for a doctor (cached)"""
+        return self.get_weekly_schedules([doctor_id])[doctor_id]
+    
+    def get_weekly_schedules(self, doctor_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get weekly schedules for many doctors, fetching only uncached ones in a single query"""
+        schedules: Dict[str, List[Dict[str, Any]]] = {}
+        missing = []
+        for doctor_id in doctor_ids:
+            cached = self.schedule_cache.get(doctor_id)
+            if cached is None:
+                missing.append(doctor_id)
+            else:
+                schedules[doctor_id] = cached
+        
+        if missing:
+            response = self.client.table("doctor_schedules") \
+                .select("*") \
+                .in_("doctor_id", missing) \
+                .order("day_of_week") \
+                .execute()
+            
+            fetched = _group_by_doctor(response.data or [], missing)
+            for doctor_id, rows in fetched.items():
+                self.schedule_cache.set(doctor_id, rows)
+            schedules.update(fetched)
+        
+        return schedules
+    
+    def get_schedules_for_day(self, doctor_ids: List[str], weekday: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Get available schedule rows for a weekday, grouped by doctor_id (served from the schedule cache)"""
+        return _day_schedules(self.get_weekly_schedules(doctor_ids), weekday)
     
     def get_default_schedules(self) -> List[Dict[str, Any]]:
         """Get default schedules for seeding"""
@@ -155,23 +335,153 @@ class Database:
         
         return schedules
     
-    def seed_schedules(self):
-        """Seed default schedules for all doctors - requires service_role key"""
-        schedules = self.get_default_schedules()
+    def seed_schedules(self, schedules: Optional[List[Dict[str, Any]]] = None, batch_size: Optional[int] = None):
+        """Seed schedules (defaults to Mon-Fri 9-5 for the built-in roster) - requires service_role key"""
+        if schedules is None:
+            schedules = self.get_default_schedules()
+        
+        seeded = self.bulk_upsert(
+            "doctor_schedules", schedules, on_conflict="doctor_id,day_of_week", batch_size=batch_size
+        )
+        
+        self.invalidate_schedule_cache()
+        return seeded
+    
+    # ============ Availability Overrides ============
+    
+    def get_day_overrides(self, doctor_ids: List[str], date: str) -> Dict[str, Dict[str, Any]]:
+        """Get doctor_availability overrides for one date, keyed by doctor_id (single query)"""
+        if not doctor_ids:
+            return {}
         
-        seeded = 0
-        for schedule in schedules:
+        response = self.client.table("doctor_availability") \
+            .select("doctor_id, date, is_available, reason") \
+            .in_("doctor_id", doctor_ids) \
+            .eq("date", date) \
+            .execute()
+        return {row["doctor_id"]: row for row in response.data or []}
+    
+    def get_range_overrides(
+        self,
+        doctor_ids: List[str],
+        start_date: str,
+        end_date: str
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Get overrides for a date range, keyed by (doctor_id, date) (single query)"""
+        if not doctor_ids:
+            return {}
+        
+        response = self.client.table("doctor_availability") \
+            .select("doctor_id, date, is_available, reason") \
+            .in_("doctor_id", doctor_ids) \
+            .gte("date", start_date) \
+            .lte("date", end_date) \
+            .execute()
+        return {(row["doctor_id"], row["date"]): row for row in response.data or []}
+    
+    def set_availability_override(
+        self,
+        doctor_id: str,
+        date: str,
+        is_available: bool,
+        reason: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Mark a doctor off (vacation) or on (extra clinic day) for one date"""
+        row = {"doctor_id": doctor_id, "date": date, "is_available": is_available, "reason": reason}
+        response = self.client.table("doctor_availability") \
+            .upsert(row, on_conflict="doctor_id,date") \
+            .execute()
+        self.calendar.invalidate(doctor_id, date)
+        self._notify_change("doctor_availability", date)
+        return response.data[0] if response.data else row
+    
+    def remove_availability_override(self, doctor_id: str, date: str) -> None:
+        """Return a doctor to their weekly schedule for one date"""
+        self.client.table("doctor_availability") \
+            .delete() \
+            .eq("doctor_id", doctor_id) \
+            .eq("date", date) \
+            .execute()
+        self.calendar.invalidate(doctor_id, date)
+        self._notify_change("doctor_availability", date)
+    
+    def load_day_calendar(self, doctor_ids: List[str], date: str) -> Dict[str, int]:
+        """
+        Ensure the availability calendar holds the given doctors' day, fetching
+        only what is not materialized yet. Returns free-slot bitmaps by doctor_id.
+        """
+        self.load_day_occupancy(doctor_ids, date)
+        missing = self.calendar.missing(doctor_ids, date)
+        if missing:
+            weekday = datetime.strptime(date, "%Y-%m-%d").weekday()  # 0=Monday
+            self.calendar.load_day(
+                missing,
+                date,
+                self.get_schedules_for_day(missing, weekday),
+                self.get_day_overrides(missing, date)
+            )
+        return {doctor_id: self.calendar.free_mask(doctor_id, date) for doctor_id in doctor_ids}
+    
+    # ============ Bulk Operations ============
+    
+    def bulk_upsert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: str = "",
+        batch_size: Optional[int] = None
+    ) -> int:
+        """
+        Upsert rows in chunks, one request per chunk instead of one per row.
+        
+        Args:
+            table: Table name
+            rows: Rows to write (all chunks share the same columns)
+            on_conflict: Comma-separated unique columns to upsert on
+            batch_size: Rows per request (defaults to SEED_BATCH_SIZE or 500)
+        
+        Returns:
+            Number of rows written
+        """
+        batch_size = batch_size or int(os.getenv("SEED_BATCH_SIZE", "500"))
+        
+        written = 0
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
             try:
-                self.client.table("doctor_schedules").upsert(schedule).execute()
-                seeded += 1
+                self.client.table(table) \
+                    .upsert(chunk, on_conflict=on_conflict, returning=ReturnMethod.minimal) \
+                    .execute()
+                written += len(chunk)
             except Exception as e:
                 error_msg = str(e)
                 if "violates row-level security" in error_msg:
                     pass  # Silently skip RLS errors
                 else:
-                    print(f"   ⚠️  Schedule error: {error_msg[:60]}")
+                    print(f"   ⚠️  {table} rows {start + 1}-{start + len(chunk)}: {error_msg[:60]}")
         
-        return seeded
+        return written
+    
+    # ============ Cache Management ============
+    
+    def invalidate_doctor_cache(self):
+        """Drop cached doctor rows (call after the doctors table changes)"""
+        self.doctor_cache.clear()
+        self._notify_change("doctors")
+    
+    def invalidate_schedule_cache(self):
+        """Drop cached weekly schedules (call after doctor_schedules changes)"""
+        self.schedule_cache.clear()
+        self.calendar.clear()
+        self._notify_change("doctor_schedules")
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the doctor and schedule caches"""
+        return {
+            "doctors": self.doctor_cache.stats(),
+            "schedules": self.schedule_cache.stats(),
+            "appointments": self.appointment_cache.stats(),
+        }
     
     # ============ Appointment Operations ============
     
@@ -188,10 +498,10 @@ class Database:
         return response.data if response.data else []
     
     def check_doctor_conflict(self, doctor_id: str, date: str, time: str) -> Optional[Dict[str, Any]]:
-        """Check if doctor already has an appointment at this time"""
+        """Check if doctor already has an appointment at this time (index-only on the active-slot index)"""
         try:
             response = self.client.table("appointments") \
-                .select("*") \
+                .select("doctor_id, appointment_date, appointment_time") \
                 .eq("doctor_id", doctor_id) \
                 .eq("appointment_date", date) \
                 .eq("appointment_time", time) \
@@ -206,11 +516,183 @@ class Database:
             # If any error (including no rows found), return None (no conflict)
             return None
     
+    def get_day_appointments(self, doctor_ids: List[str], date: str) -> List[Dict[str, Any]]:
+        """Get every non-cancelled appointment for the given doctors on one date (single query)"""
+        if not doctor_ids:
+            return []
+        
+        response = self.client.table("appointments") \
+            .select("doctor_id, appointment_time") \
+            .in_("doctor_id", doctor_ids) \
+            .eq("appointment_date", date) \
+            .neq("status", "cancelled") \
+            .execute()
+        return response.data if response.data else []
+    
+    def get_range_appointments(self, doctor_ids: List[str], start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """
+        Get every non-cancelled appointment for the given doctors between two dates,
+        ordered by date and time - one range scan on idx_appointments_datetime
+        
+        Several doctors share a date and time, so id breaks ties; without a
+        unique order, offset pages could skip or repeat rows.
+        """
+        if not doctor_ids:
+            return []
+        
+        appointments = []
+        while True:
+            response = self.client.table("appointments") \
+                .select("doctor_id, appointment_date, appointment_time") \
+                .in_("doctor_id", doctor_ids) \
+                .gte("appointment_date", start_date) \
+                .lte("appointment_date", end_date) \
+                .neq("status", "cancelled") \
+                .order("appointment_date") \
+                .order("appointment_time") \
+                .order("id") \
+                .range(len(appointments), len(appointments) + PAGE_SIZE - 1) \
+                .execute()
+            page = response.data if response.data else []
+            appointments.extend(page)
+            if len(page) < PAGE_SIZE:
+                return appointments
+    
+    def load_day_occupancy(self, doctor_ids: List[str], date: str) -> Dict[str, int]:
+        """
+        Ensure the occupancy index holds the given doctors' day, fetching only
+        doctors that are not cached yet. Returns booked-slot bitmaps by doctor_id.
+        """
+        missing = self.occupancy.missing(doctor_ids, date)
+        if missing:
+            self.occupancy.load_day(missing, date, self.get_day_appointments(missing, date))
+        return {doctor_id: self.occupancy.mask(doctor_id, date) for doctor_id in doctor_ids}
+    
     def create_appointment(self, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new appointment"""
-        response = self.client.table("appointments").insert(appointment_data).execute()
+        """
+        Create a new appointment
+        
+        Raises:
+            SlotTakenError: If the doctor already has an active appointment in this slot
+        """
+        try:
+            response = self.client.table("appointments").insert(appointment_data).execute()
+        except APIError as e:
+            if _is_slot_taken(e):
+                # Someone else holds the slot - remember that locally too
+                self.occupancy.book(
+                    appointment_data["doctor_id"],
+                    appointment_data["appointment_date"],
+                    appointment_data["appointment_time"]
+                )
+                raise SlotTakenError(appointment_data["doctor_id"]) from e
+            raise
+        self.occupancy.book(
+            appointment_data["doctor_id"],
+            appointment_data["appointment_date"],
+            appointment_data["appointment_time"]
+        )
         return response.data[0] if response.data else appointment_data
     
+    def existing_appointments(self, confirmation_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Appointments already stored under any of confirmation_numbers, by number (one query)"""
+        if not confirmation_numbers:
+            return {}
+        
+        response = self.client.table("appointments") \
+            .select("confirmation_number, patient_id, doctor_id, appointment_date, appointment_time") \
+            .in_("confirmation_number", confirmation_numbers) \
+            .execute()
+        return {row["confirmation_number"]: row for row in response.data or []}
+    
+    def insert_appointments(self, appointments: List[Dict[str, Any]]) -> None:
+        """
+        Insert many appointments in one request, skipping confirmation numbers that already exist
+        
+        Raises:
+            SlotTakenError: If any row hits an occupied slot (the whole request is rolled back)
+        """
+        try:
+            self.client.table("appointments") \
+                .upsert(
+                    appointments,
+                    on_conflict="confirmation_number",
+                    ignore_duplicates=True,
+                    returning=ReturnMethod.minimal
+                ) \
+                .execute()
+        except APIError as e:
+            if _is_slot_taken(e):
+                raise SlotTakenError(str(getattr(e, "message", ""))) from e
+            raise
+        for appointment in appointments:
+            self.occupancy.book(
+                appointment["doctor_id"],
+                appointment["appointment_date"],
+                appointment["appointment_time"]
+            )
+    
+    def book_slot(self, booking_data: Dict[str, Any], candidates: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Validate, auto-assign and insert in one transaction via the book_slot() SQL function.
+        
+        When auto-assigning, `candidates` (doctor IDs, preferred first) decides the
+        order doctors are tried in; without it the function picks least booked first.
+        
+        Returns the function's JSON result; 'status' is one of booked, doctor_not_found,
+        specialty_mismatch, conflict or unavailable.
+        
+        Raises:
+            RpcUnavailableError: If book_slot() is not deployed in this database
+        """
+        _require_function("book_slot")
+        try:
+            response = self.client.rpc("book_slot", _book_slot_params(booking_data, candidates)).execute()
+        except APIError as e:
+            _mark_missing_function("book_slot", e)
+            raise
+        return _record_booking(response.data, self.doctor_cache, self.occupancy)
+    
+    def get_appointment(self, confirmation_number: str) -> Optional[Dict[str, Any]]:
+        """Get an appointment with its doctor embedded (LRU-cached by confirmation number)"""
+        return self.appointment_cache.get_or_load(
+            confirmation_number, lambda: self._fetch_appointment(confirmation_number)
+        )
+    
+    def _fetch_appointment(self, confirmation_number: str) -> Optional[Dict[str, Any]]:
+        response = self.client.table("appointments") \
+            .select("*, doctors(*)") \
+            .eq("confirmation_number", confirmation_number) \
+            .single() \
+            .execute()
+        return response.data
+    
+    def cancel_appointment(self, confirmation_number: str, notes: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Cancel with one conditional UPDATE ... RETURNING and free the slot.
+        
+        Returns:
+            Tuple of (outcome, row) where outcome is 'cancelled', 'already_cancelled',
+            'not_cancellable' (the row exists but the update did not apply) or 'not_found'
+        """
+        response = self.client.table("appointments") \
+            .update({"status": "cancelled", "notes": notes}) \
+            .eq("confirmation_number", confirmation_number) \
+            .neq("status", "cancelled") \
+            .execute()
+        
+        if response.data:
+            _release_cancelled(response.data, confirmation_number, self.occupancy, self.appointment_cache)
+            return "cancelled", response.data[0]
+        
+        # Nothing matched: only this failure path pays for a second lookup
+        existing = self.client.table("appointments") \
+            .select("confirmation_number, status") \
+            .eq("confirmation_number", confirmation_number) \
+            .limit(1) \
+            .execute()
+        return _unmatched_cancel_outcome(existing.data)
+    
     def get_available_doctors(self, specialty: str, date: str, time: str) -> List[Dict[str, Any]]:
         """Get available doctors for a specific date/time who don't have conflicts"""
         # Get all doctors of this specialty
@@ -219,33 +701,312 @@ class Database:
         if not doctors:
             return []
         
-        available_doctors = []
+        # Schedules, overrides and bookings are already combined in the calendar
+        self.load_day_calendar([doctor['id'] for doctor in doctors], date)
+        
+        return [doctor for doctor in doctors if self.calendar.is_free(doctor['id'], date, time)]
+
+
+class AsyncDatabase:
+    """
+    Asyncio counterpart of Database for the hot booking and availability paths.
+    
+    Talks to PostgREST over one shared keep-alive httpx.AsyncClient, so the
+    event loop can run hundreds of queries concurrently without worker threads.
+    Caches and the occupancy index are shared with the sync Database so both
+    paths see the same state.
+    """
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init_client()
+        return cls._instance
+    
+    def _init_client(self):
+        """Initialize the pooled async PostgREST client"""
+        supabase_url, supabase_key = _supabase_credentials()
+        rest_url = f"{supabase_url.rstrip('/')}/rest/v1"
+        headers = {"apikey": supabase_key, "Authorization": f"Bearer {supabase_key}"}
+        
+        self.http = httpx.AsyncClient(
+            base_url=rest_url,
+            headers=headers,
+            timeout=float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10")),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20")),
+            ),
+            event_hooks={"request": [apply_deadline_async]},
+        )
+        # Every query goes through the shared pooled session; passing it in keeps
+        # postgrest from opening an AsyncClient of its own that nothing would close
+        self.client = AsyncPostgrestClient(rest_url, headers=headers, http_client=self.http)
+        
+        shared = get_db()
+        self.doctor_cache = shared.doctor_cache
+        self.schedule_cache = shared.schedule_cache
+        self.occupancy = shared.occupancy
+        self.calendar = shared.calendar
+        self.appointment_cache = shared.appointment_cache
+    
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        await self.http.aclose()
+    
+    # ============ Doctor Operations ============
+    
+    async def get_doctors(self, specialty: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get all doctors or filter by specialty (cached)"""
+        key = ("doctors", specialty.lower() if specialty else None)
+        doctors = self.doctor_cache.get(key)
+        if doctors is not None:
+            return doctors
+        
+        doctors = []
+        while True:
+            query = self.client.from_("doctors").select("*")
+            if specialty:
+                query = query.eq("specialty", specialty.lower())
+            
+            response = await query.order("id").range(len(doctors), len(doctors) + PAGE_SIZE - 1).execute()
+            page = response.data if response.data else []
+            doctors.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
         
         for doctor in doctors:
-            # Check if doctor already has appointment at this time
-            conflict = self.check_doctor_conflict(doctor['id'], date, time)
+            self.doctor_cache.set(("doctor", doctor["id"]), doctor)
+        self.doctor_cache.set(key, doctors)
+        return doctors
+    
+    async def get_doctor_by_id(self, doctor_id: str) -> Optional[Dict[str, Any]]:
+        """Get a specific doctor by ID (cached)"""
+        doctor = self.doctor_cache.get(("doctor", doctor_id))
+        if doctor is not None:
+            return doctor
+        
+        response = await self.client.from_("doctors").select("*").eq("id", doctor_id).single().execute()
+        doctor = response.data if hasattr(response, 'data') else None
+        if doctor is not None:
+            self.doctor_cache.set(("doctor", doctor_id), doctor)
+        return doctor
+    
+    # ============ Schedule Operations ============
+    
+    async def get_weekly_schedules(self, doctor_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get weekly schedules for many doctors, fetching only uncached ones in a single query"""
+        schedules: Dict[str, List[Dict[str, Any]]] = {}
+        missing = []
+        for doctor_id in doctor_ids:
+            cached = self.schedule_cache.get(doctor_id)
+            if cached is None:
+                missing.append(doctor_id)
+            else:
+                schedules[doctor_id] = cached
+        
+        if missing:
+            response = await self.client.from_("doctor_schedules") \
+                .select("*") \
+                .in_("doctor_id", missing) \
+                .order("day_of_week") \
+                .execute()
             
-            # Check if it's during their working hours
+            fetched = _group_by_doctor(response.data or [], missing)
+            for doctor_id, rows in fetched.items():
+                self.schedule_cache.set(doctor_id, rows)
+            schedules.update(fetched)
+        
+        return schedules
+    
+    async def get_schedules_for_day(self, doctor_ids: List[str], weekday: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Get available schedule rows for a weekday, grouped by doctor_id"""
+        return _day_schedules(await self.get_weekly_schedules(doctor_ids), weekday)
+    
+    # ============ Availability Overrides ============
+    
+    async def get_day_overrides(self, doctor_ids: List[str], date: str) -> Dict[str, Dict[str, Any]]:
+        """Get doctor_availability overrides for one date, keyed by doctor_id (single query)"""
+        if not doctor_ids:
+            return {}
+        
+        response = await self.client.from_("doctor_availability") \
+            .select("doctor_id, date, is_available, reason") \
+            .in_("doctor_id", doctor_ids) \
+            .eq("date", date) \
+            .execute()
+        return {row["doctor_id"]: row for row in response.data or []}
+    
+    async def get_range_overrides(
+        self,
+        doctor_ids: List[str],
+        start_date: str,
+        end_date: str
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Get overrides for a date range, keyed by (doctor_id, date) (single query)"""
+        if not doctor_ids:
+            return {}
+        
+        response = await self.client.from_("doctor_availability") \
+            .select("doctor_id, date, is_available, reason") \
+            .in_("doctor_id", doctor_ids) \
+            .gte("date", start_date) \
+            .lte("date", end_date) \
+            .execute()
+        return {(row["doctor_id"], row["date"]): row for row in response.data or []}
+    
+    async def load_day_calendar(self, doctor_ids: List[str], date: str) -> Dict[str, int]:
+        """Ensure the shared availability calendar holds the given doctors' day"""
+        await self.load_day_occupancy(doctor_ids, date)
+        missing = self.calendar.missing(doctor_ids, date)
+        if missing:
             weekday = datetime.strptime(date, "%Y-%m-%d").weekday()  # 0=Monday
-            
-            schedules = self.client.table("doctor_schedules") \
-                .select("*") \
-                .eq("doctor_id", doctor['id']) \
-                .eq("day_of_week", weekday) \
-                .eq("is_available", True) \
+            schedules, overrides = await asyncio.gather(
+                self.get_schedules_for_day(missing, weekday),
+                self.get_day_overrides(missing, date)
+            )
+            self.calendar.load_day(missing, date, schedules, overrides)
+        return {doctor_id: self.calendar.free_mask(doctor_id, date) for doctor_id in doctor_ids}
+    
+    # ============ Appointment Operations ============
+    
+    async def check_doctor_conflict(self, doctor_id: str, date: str, time: str) -> Optional[Dict[str, Any]]:
+        """Check if doctor already has an appointment at this time (index-only on the active-slot index)"""
+        try:
+            response = await self.client.from_("appointments") \
+                .select("doctor_id, appointment_date, appointment_time") \
+                .eq("doctor_id", doctor_id) \
+                .eq("appointment_date", date) \
+                .eq("appointment_time", time) \
+                .neq("status", "cancelled") \
+                .limit(1) \
                 .execute()
             
-            if not conflict and schedules.data:
-                # Check time is within working hours
-                for schedule in schedules.data:
-                    start = schedule['start_time']
-                    end = schedule['end_time']
-                    
-                    if start <= time <= end:
-                        available_doctors.append(doctor)
-                        break
+            if response and response.data and len(response.data) > 0:
+                return response.data[0]
+            return None
+        except Exception as e:
+            return None
+    
+    async def get_day_appointments(self, doctor_ids: List[str], date: str) -> List[Dict[str, Any]]:
+        """Get every non-cancelled appointment for the given doctors on one date (single query)"""
+        if not doctor_ids:
+            return []
+        
+        response = await self.client.from_("appointments") \
+            .select("doctor_id, appointment_time") \
+            .in_("doctor_id", doctor_ids) \
+            .eq("appointment_date", date) \
+            .neq("status", "cancelled") \
+            .execute()
+        return response.data if response.data else []
+    
+    async def get_range_appointments(self, doctor_ids: List[str], start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Get every non-cancelled appointment for the given doctors between two dates (one range scan)"""
+        if not doctor_ids:
+            return []
         
-        return available_doctors
+        appointments = []
+        while True:
+            response = await self.client.from_("appointments") \
+                .select("doctor_id, appointment_date, appointment_time") \
+                .in_("doctor_id", doctor_ids) \
+                .gte("appointment_date", start_date) \
+                .lte("appointment_date", end_date) \
+                .neq("status", "cancelled") \
+                .order("appointment_date") \
+                .order("appointment_time") \
+                .order("id") \
+                .range(len(appointments), len(appointments) + PAGE_SIZE - 1) \
+                .execute()
+            page = response.data if response.data else []
+            appointments.extend(page)
+            if len(page) < PAGE_SIZE:
+                return appointments
+    
+    async def load_day_occupancy(self, doctor_ids: List[str], date: str) -> Dict[str, int]:
+        """Ensure the shared occupancy index holds the given doctors' day"""
+        missing = self.occupancy.missing(doctor_ids, date)
+        if missing:
+            self.occupancy.load_day(missing, date, await self.get_day_appointments(missing, date))
+        return {doctor_id: self.occupancy.mask(doctor_id, date) for doctor_id in doctor_ids}
+    
+    async def create_appointment(self, appointment_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new appointment (raises SlotTakenError if the slot is taken)"""
+        try:
+            response = await self.client.from_("appointments").insert(appointment_data).execute()
+        except APIError as e:
+            if _is_slot_taken(e):
+                # Someone else holds the slot - remember that locally too
+                self.occupancy.book(
+                    appointment_data["doctor_id"],
+                    appointment_data["appointment_date"],
+                    appointment_data["appointment_time"]
+                )
+                raise SlotTakenError(appointment_data["doctor_id"]) from e
+            raise
+        self.occupancy.book(
+            appointment_data["doctor_id"],
+            appointment_data["appointment_date"],
+            appointment_data["appointment_time"]
+        )
+        return response.data[0] if response.data else appointment_data
+    
+    async def book_slot(self, booking_data: Dict[str, Any], candidates: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Async variant of Database.book_slot (one atomic round trip)"""
+        _require_function("book_slot")
+        try:
+            response = await self.client.rpc("book_slot", _book_slot_params(booking_data, candidates)).execute()
+        except APIError as e:
+            _mark_missing_function("book_slot", e)
+            raise
+        return _record_booking(response.data, self.doctor_cache, self.occupancy)
+    
+    async def get_appointment(self, confirmation_number: str) -> Optional[Dict[str, Any]]:
+        """Get an appointment with its doctor embedded (LRU-cached by confirmation number)"""
+        appointment = self.appointment_cache.get(confirmation_number)
+        if appointment is not None:
+            return appointment
+        
+        response = await self.client.from_("appointments") \
+            .select("*, doctors(*)") \
+            .eq("confirmation_number", confirmation_number) \
+            .single() \
+            .execute()
+        if response.data:
+            self.appointment_cache.set(confirmation_number, response.data)
+        return response.data
+    
+    async def cancel_appointment(self, confirmation_number: str, notes: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Async variant of Database.cancel_appointment"""
+        response = await self.client.from_("appointments") \
+            .update({"status": "cancelled", "notes": notes}) \
+            .eq("confirmation_number", confirmation_number) \
+            .neq("status", "cancelled") \
+            .execute()
+        
+        if response.data:
+            _release_cancelled(response.data, confirmation_number, self.occupancy, self.appointment_cache)
+            return "cancelled", response.data[0]
+        
+        existing = await self.client.from_("appointments") \
+            .select("confirmation_number, status") \
+            .eq("confirmation_number", confirmation_number) \
+            .limit(1) \
+            .execute()
+        return _unmatched_cancel_outcome(existing.data)
+    
+    async def get_available_doctors(self, specialty: str, date: str, time: str) -> List[Dict[str, Any]]:
+        """Get available doctors for a specific date/time who don't have conflicts"""
+        doctors = await self.get_doctors(specialty)
+        
+        if not doctors:
+            return []
+        
+        await self.load_day_calendar([doctor['id'] for doctor in doctors], date)
+        
+        return [doctor for doctor in doctors if self.calendar.is_free(doctor['id'], date, time)]
 
 
 # Global database instance
@@ -254,4 +1015,9 @@ db = Database()
 
 def get_db() -> Database:
     """Get database instance"""
-    return db
\ No newline at end of file
+    return db
+
+
+def get_async_db() -> AsyncDatabase:
+    """Get the async database instance (created lazily inside the event loop)"""
+    return AsyncDatabase()
\ No newline at end of file
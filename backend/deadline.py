@@ -0,0 +1,107 @@
+"""
+Deadlines for Healthcare MCP Server
+Carries the remaining time budget of a request through the call stack so
+Supabase and Mistral requests never outlive the caller
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+import httpx
+
+# Request header carrying the caller's remaining budget in milliseconds
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+# Absolute time.monotonic() value after which work should stop; None = unbounded.
+# Context variables follow asyncio tasks and asyncio.to_thread automatically.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out"""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Bound the enclosed work to `seconds` from now.
+
+    Nested scopes can only shorten the deadline, never extend it.
+    """
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    candidate = time.monotonic() + seconds
+    token = _deadline.set(candidate if current is None else min(current, candidate))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget (None if unbounded, may be negative)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check() -> None:
+    """Raise DeadlineExceeded if the current budget is spent"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+
+
+def timeout_ms(default: Optional[float] = None) -> Optional[int]:
+    """
+    Remaining budget in milliseconds for SDKs that take a per-call timeout.
+
+    Args:
+        default: Timeout in seconds to use when it is shorter than the budget (or there is none)
+
+    Raises:
+        DeadlineExceeded: If the budget is already spent
+    """
+    check()
+    left = remaining()
+    candidates = [value for value in (left, default) if value is not None]
+    return max(1, int(min(candidates) * 1000)) if candidates else None
+
+
+def parse_budget_ms(value: Any) -> Optional[float]:
+    """Budget in seconds from a millisecond value such as the X-Deadline-Ms header (None if absent or invalid)"""
+    try:
+        ms = float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+    return ms / 1000 if ms is not None and ms > 0 else None
+
+
+# ============ httpx Hooks ============
+
+def apply_deadline(request: httpx.Request) -> None:
+    """
+    httpx request hook: clamp the request's timeouts to the remaining budget.
+
+    The transport reads the timeout extension per request, so this bounds
+    every query made through a client without changing its call sites.
+    """
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {request.method} {request.url.path}")
+
+    timeouts = dict(request.extensions.get("timeout") or {})
+    request.extensions["timeout"] = {
+        phase: left if timeouts.get(phase) is None else min(timeouts[phase], left)
+        for phase in ("connect", "read", "write", "pool")
+    }
+
+
+async def apply_deadline_async(request: httpx.Request) -> None:
+    """Async httpx request hook, see apply_deadline"""
+    apply_deadline(request)
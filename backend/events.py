@@ -0,0 +1,110 @@
+"""
+Event bus for Healthcare MCP Server
+Fans booking changes out to connected chat sessions, so the server can tell a
+client that a slot it was shown has just been taken instead of the client polling
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+from backend.database import get_db
+
+Event = Dict[str, Any]
+
+
+class Subscription:
+    """
+    One subscriber's queue of events, bound to the event loop that reads it.
+
+    A subscriber that falls behind by more than `maxsize` events loses the
+    newest ones rather than holding memory for a stalled connection.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self) -> Event:
+        """Wait for the next event"""
+        return await self.queue.get()
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for server-side events.
+
+    publish() may be called from any thread (bookings run on worker threads
+    as well as the event loop); each event is handed to every subscriber's
+    loop. Only changes made by this process are seen - bookings through
+    other workers reach clients on their next lookup.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self) -> Subscription:
+        """Start receiving events on the running event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: Event) -> None:
+        """Deliver event to every subscriber"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it unsubscribes on its way out
+                pass
+
+    def on_slot_change(self, doctor_id: str, date: Any, time: str, booked: bool) -> None:
+        """Occupancy slot listener: publish slot_taken / slot_released"""
+        self.publish({
+            "event": "slot_taken" if booked else "slot_released",
+            "doctor_id": doctor_id,
+            "date": str(date),
+            "time": time,
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        """Subscriber and delivery counters for metrics"""
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": sum(subscription.dropped for subscription in self._subscribers),
+            }
+
+
+_event_bus: Optional[EventBus] = None
+_event_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus, subscribed to booking changes"""
+    global _event_bus
+    with _event_bus_lock:
+        if _event_bus is None:
+            _event_bus = EventBus(queue_size=int(os.getenv("MCP_EVENT_QUEUE_SIZE", "256")))
+            get_db().occupancy.add_slot_listener(_event_bus.on_slot_change)
+        return _event_bus
@@ -1,14 +1,24 @@
 
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
-from backend.mcp import tools, call_tool, get_available_tools
+from backend.mcp import tools, call_tool_async, stream_tool, bulkhead_stats, coalescing_stats, get_available_tools
+from backend.mcp_transport import handle_raw
+from backend.ws_transport import serve_websocket
+from backend.events import get_event_bus
+from backend.deadline import DEADLINE_HEADER, deadline_scope, parse_budget_ms
+from backend.database import get_db, get_async_db
+from backend.result_cache import get_result_cache
+from backend.replay import ReplayWorker
+from backend.tools.booking import get_booking_wal
 from typing import Dict, Any
+import asyncio
 import logging
 import json
 import os
+import time
 from datetime import datetime
 
 # Configure logging
@@ -35,6 +45,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# How often a running tool call checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.25
+DISCONNECTED = object()
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """Run the request under the caller's X-Deadline-Ms budget, if given"""
+    with deadline_scope(parse_budget_ms(request.headers.get(DEADLINE_HEADER))):
+        return await call_next(request)
+
+async def until_disconnect(request: Request, work):
+    """
+    Await work, cancelling it if the client goes away first.
+    
+    Returns DISCONNECTED if the client disconnected.
+    """
+    task = asyncio.ensure_future(work)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            logger.warning(f"⚠️  Client disconnected, cancelled {request.url.path}")
+            return DISCONNECTED
+
 @app.get("/api")
 def api_info():
     return {
@@ -42,6 +78,11 @@ def api_info():
         "endpoints": {
             "tools": "/mcp/tools",
             "call": "/mcp/call",
+            "call_batch": "/mcp/call_batch",
+            "stream": "/mcp/stream",
+            "jsonrpc": "/mcp",
+            "websocket": "/ws",
+            "metrics": "/mcp/metrics",
             "docs": "/docs"
         }
     }
@@ -51,8 +92,55 @@ def list_tools():
     """Get all available MCP tools with their schemas"""
     return {"tools": get_available_tools()}
 
+@app.get("/mcp/metrics")
+def metrics():
+    """Tool result cache hit rates and latency saved, request coalescing, bulkheads, pushed events, fallback replay and the database-level caches"""
+    return {
+        "result_cache": get_result_cache().stats(),
+        "coalescing": coalescing_stats(),
+        "bulkheads": bulkhead_stats(),
+        "events": get_event_bus().stats(),
+        # renumbered/conflicts > 0 means bookings in the renumbered-*/conflicts-* logs need follow-up;
+        # corrupt_lines > 0 means fallback log lines were unreadable and skipped
+        "replay": (
+            {**replay_worker.stats, "corrupt_lines": replay_worker.wal.corrupt_lines}
+            if replay_worker is not None else None
+        ),
+        "database_caches": get_db().cache_stats()
+    }
+
+replay_worker = None
+
+# Limits for /mcp/call_batch
+MCP_BATCH_MAX_CALLS = int(os.getenv("MCP_BATCH_MAX_CALLS", "20"))
+MCP_BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", "8"))
+
+@app.on_event("startup")
+def start_replay_worker():
+    """Drain bookings saved to the local fallback log back into Supabase"""
+    global replay_worker
+    if os.getenv("BOOKINGS_REPLAY_ENABLED", "true").lower() != "true":
+        return
+    try:
+        replay_worker = ReplayWorker(
+            get_booking_wal(),
+            batch_size=int(os.getenv("BOOKINGS_REPLAY_BATCH_SIZE", "200")),
+            concurrency=int(os.getenv("BOOKINGS_REPLAY_CONCURRENCY", "4")),
+            poll_interval=float(os.getenv("BOOKINGS_REPLAY_INTERVAL_SECONDS", "5")),
+        )
+        replay_worker.start()
+    except Exception as e:
+        logger.warning(f"Fallback replay disabled: {e}")
+
+@app.on_event("shutdown")
+async def close_database():
+    """Release the pooled async Supabase connections"""
+    if replay_worker is not None:
+        replay_worker.stop()
+    await get_async_db().aclose()
+
 @app.post("/mcp/call")
-def mcp_call(payload: Dict[str, Any] = Body(...)):
+async def mcp_call(request: Request, payload: Dict[str, Any] = Body(...)):
     """
     Execute an MCP tool with provided arguments
     
@@ -78,7 +166,9 @@ def mcp_call(payload: Dict[str, Any] = Body(...)):
     logger.info("-" * 80)
     
     # Execute the tool
-    result = call_tool(name, args)
+    result = await until_disconnect(request, call_tool_async(name, args))
+    if result is DISCONNECTED:
+        return Response(status_code=499)  # Nobody is left to read a response
     
     # Log the response
     if "error" in result:
@@ -106,8 +196,133 @@ def mcp_call(payload: Dict[str, Any] = Body(...)):
     logger.info("=" * 80)
     logger.info("")
     
+    if result.get("retry_after"):
+        # Rejected by a full bulkhead - tell the client when to come back
+        return JSONResponse(result, status_code=429, headers={"Retry-After": str(result["retry_after"])})
     return result
 
+@app.post("/mcp/stream")
+async def mcp_stream(payload: Dict[str, Any] = Body(...)):
+    """
+    Execute an MCP tool and stream its output as Server-Sent Events
+    
+    Request body is the same as /mcp/call. generate_diet and general_query
+    send each piece of text as it is generated:
+    
+        event: token
+        data: {"text": "..."}
+    
+    and every tool ends with one event carrying the same JSON /mcp/call returns:
+    
+        event: result
+        data: { ... }
+    """
+    name = payload.get("name")
+    args = payload.get("args", {})
+    
+    if not name:
+        logger.error("❌ Missing 'name' field in request")
+        return {"error": "Missing 'name' field in request"}
+    
+    logger.info(f"🔧 STREAM CALL: {name}")
+    
+    async def events():
+        # Starlette stops iterating when the client disconnects, which
+        # closes stream_tool and cancels the model call
+        started = time.perf_counter()
+        async for event, data in stream_tool(name, args):
+            if event == "result":
+                status = "❌ ERROR" if data.get("error") else "✅ SUCCESS"
+                logger.info(f"{status}: streamed {name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/mcp/call_batch")
+async def mcp_call_batch(request: Request, payload: Dict[str, Any] = Body(...)):
+    """
+    Execute several independent MCP tools concurrently
+    
+    Request body:
+    {
+        "calls": [
+            {"name": "tool_name", "args": { ... }},
+            ...
+        ]
+    }
+    
+    Results come back in request order; a failing call only fails its own entry.
+    """
+    calls = payload.get("calls")
+    
+    if not isinstance(calls, list) or not calls:
+        logger.error("❌ Missing 'calls' list in batch request")
+        return {"error": "Missing 'calls' list in request"}
+    if len(calls) > MCP_BATCH_MAX_CALLS:
+        return {"error": f"Too many calls in batch: {len(calls)} (max {MCP_BATCH_MAX_CALLS})"}
+    
+    semaphore = asyncio.Semaphore(MCP_BATCH_CONCURRENCY)
+    
+    async def run(call):
+        if not isinstance(call, dict) or not call.get("name"):
+            return {"error": "Missing 'name' field in call"}
+        async with semaphore:
+            return await call_tool_async(call["name"], call.get("args") or {})
+    
+    logger.info("=" * 80)
+    logger.info(f"🔧 BATCH CALL: {', '.join(str(call.get('name') or '?') if isinstance(call, dict) else '?' for call in calls)}")
+    
+    started = time.perf_counter()
+    results = await until_disconnect(
+        request, asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+    )
+    if results is DISCONNECTED:
+        return Response(status_code=499)
+    results = [
+        {"error": f"Tool execution failed: {str(result)}"} if isinstance(result, Exception) else result
+        for result in results
+    ]
+    
+    failed = sum(1 for result in results if "error" in result)
+    logger.info(f"{'⚠️ ' if failed else '✅'} {len(results) - failed}/{len(results)} succeeded in {(time.perf_counter() - started) * 1000:.0f} ms")
+    logger.info("=" * 80)
+    logger.info("")
+    
+    return {"results": results}
+
+@app.post("/mcp")
+async def mcp_jsonrpc(request: Request):
+    """
+    MCP streamable HTTP transport (JSON-RPC 2.0)
+    
+    Accepts a single message or a batch; batched requests run concurrently
+    and are answered together, so one POST can carry many tool calls.
+    """
+    response = await until_disconnect(request, handle_raw(await request.body()))
+    if response is DISCONNECTED:
+        return Response(status_code=499)
+    if response is None:
+        return Response(status_code=202)  # Only notifications
+    return JSONResponse(response)
+
+@app.get("/mcp")
+def mcp_jsonrpc_stream():
+    """This server does not open server-initiated SSE streams"""
+    return Response(status_code=405, headers={"Allow": "POST"})
+
+@app.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Persistent chat channel: tool calls multiplexed by id, streamed LLM
+    text and pushed booking events (see backend/ws_transport.py)
+    """
+    await serve_websocket(websocket)
+
 # ── Serve Frontend ──────────────────────────────────────────────────────
 # Mount frontend static files (must be after API routes)
 FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend")
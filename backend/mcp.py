@@ -3,14 +3,55 @@ Healthcare MCP (Model Context Protocol) Server
 Provides tools for diet planning, appointment booking, doctor management, and health queries.
 """
 
-from typing import Dict, Any, List, Optional
+import asyncio
+import os
+import re
+import time
+from datetime import datetime
+import httpx
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator, Tuple
 from backend.tools import diet, booking, general, doctors
+from backend import deadline
+from backend.assignment import get_assignment_strategy
+from backend.result_cache import canonical_key, get_result_cache
+from backend.singleflight import SingleFlight
+from backend.bulkhead import Bulkhead, BulkheadFull
 
+# Patterns referenced by the schemas below (HH:MM and HH:MM-HH:MM)
+TIME_PATTERN = r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$"
+TIME_WINDOW_PATTERN = r"^\s*([01]?[0-9]|2[0-3]):[0-5][0-9]\s*-\s*([01]?[0-9]|2[0-3]):[0-5][0-9]\s*$"
 
-# MCP Tool Registry with detailed schemas
+# Concurrency limits per tool class. LLM tools block on Mistral for seconds,
+# so they get a small pool of their own and cannot starve database tools.
+BULKHEADS = {
+    "llm": Bulkhead(
+        "llm",
+        max_concurrent=int(os.getenv("MCP_LLM_CONCURRENCY", "4")),
+        max_queue=int(os.getenv("MCP_LLM_QUEUE", "8"))
+    ),
+    "database": Bulkhead(
+        "database",
+        max_concurrent=int(os.getenv("MCP_DATABASE_CONCURRENCY", "64")),
+        max_queue=int(os.getenv("MCP_DATABASE_QUEUE", "256"))
+    ),
+}
+
+_SERVER_FIELDS = {"deadline_ms", "bulkhead"}
+
+# Ways a call can run out of time: our own deadline, an httpx timeout from
+# Supabase or Mistral, or asyncio.wait_for giving up on the handler
+_TIMEOUTS = (deadline.DeadlineExceeded, httpx.TimeoutException, asyncio.TimeoutError)
+
+
+# MCP Tool Registry with detailed schemas. Server-side settings, left out of
+# the published schemas:
+#   deadline_ms - default time budget for a call
+#   bulkhead    - which BULKHEADS entry limits its concurrency
 tools = {
     "generate_diet": {
         "name": "generate_diet",
+        "deadline_ms": 45000,
+        "bulkhead": "llm",
         "description": "Generate personalized AI-powered diet plans based on user preferences and health goals",
         "inputSchema": {
             "type": "object",
@@ -34,6 +75,8 @@ tools = {
     },
     "book_appointment": {
         "name": "book_appointment",
+        "deadline_ms": 10000,
+        "bulkhead": "database",
         "description": "Book medical appointments with healthcare providers. Appointments are scheduled in 15-minute intervals. Auto-assigns available doctor if none specified.",
         "inputSchema": {
             "type": "object",
@@ -44,10 +87,12 @@ tools = {
                 },
                 "date": {
                     "type": "string",
+                    "format": "date",
                     "description": "Appointment date (YYYY-MM-DD format)"
                 },
                 "time": {
                     "type": "string",
+                    "pattern": TIME_PATTERN,
                     "description": "Appointment time in 15-minute intervals (HH:MM format, e.g., '09:00', '09:15', '09:30')"
                 },
                 "specialty": {
@@ -68,6 +113,8 @@ tools = {
     },
     "get_doctors": {
         "name": "get_doctors",
+        "deadline_ms": 5000,
+        "bulkhead": "database",
         "description": "Get list of doctors filtered by specialty. Use this before booking to see available doctors.",
         "inputSchema": {
             "type": "object",
@@ -82,6 +129,8 @@ tools = {
     },
     "get_available_slots": {
         "name": "get_available_slots",
+        "deadline_ms": 5000,
+        "bulkhead": "database",
         "description": "Get available appointment slots for a specific date and specialty. Shows which doctors are free at each time slot.",
         "inputSchema": {
             "type": "object",
@@ -92,6 +141,7 @@ tools = {
                 },
                 "date": {
                     "type": "string",
+                    "format": "date",
                     "description": "Date to check availability (YYYY-MM-DD format)"
                 },
                 "doctor_id": {
@@ -102,8 +152,49 @@ tools = {
             "required": ["specialty", "date"]
         }
     },
+    "find_next_available": {
+        "name": "find_next_available",
+        "deadline_ms": 8000,
+        "bulkhead": "database",
+        "description": "Find the earliest open appointment times across a range of days for a specialty or a specific doctor. Skips weekends and doctors' days off. Use this when the patient wants 'the next available' slot instead of a specific date.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "specialty": {
+                    "type": "string",
+                    "description": "Medical specialty (e.g., 'cardiology'). Required unless doctor_id is given."
+                },
+                "doctor_id": {
+                    "type": "string",
+                    "description": "Specific doctor ID to search (optional)"
+                },
+                "start_date": {
+                    "type": "string",
+                    "format": "date",
+                    "description": "First date to search (YYYY-MM-DD format, defaults to today)"
+                },
+                "days": {
+                    "type": "integer",
+                    "description": "Number of days to search ahead (default 14, max 90)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of open times to return (default 5, max 50)"
+                },
+                "time_windows": {
+                    "type": "array",
+                    "items": {"type": "string", "pattern": TIME_WINDOW_PATTERN},
+                    "description": "Acceptable times of day as HH:MM-HH:MM ranges (e.g., ['09:00-12:00'])"
+                }
+            },
+            "required": [],
+            "anyOf": [{"required": ["specialty"]}, {"required": ["doctor_id"]}]
+        }
+    },
     "get_doctor_schedule": {
         "name": "get_doctor_schedule",
+        "deadline_ms": 5000,
+        "bulkhead": "database",
         "description": "Get weekly working schedule for a specific doctor. Accepts doctor ID (doc_001) or name (Priya Patel).",
         "inputSchema": {
             "type": "object",
@@ -118,13 +209,15 @@ tools = {
     },
     "get_appointment": {
         "name": "get_appointment",
+        "deadline_ms": 5000,
+        "bulkhead": "database",
         "description": "Retrieve appointment details using confirmation number",
         "inputSchema": {
             "type": "object",
             "properties": {
                 "confirmation_number": {
                     "type": "string",
-                    "description": "Confirmation number from booking (e.g., 'APT-12345')"
+                    "description": "Confirmation number from booking (e.g., 'APT-3F9A0C71D2E4')"
                 }
             },
             "required": ["confirmation_number"]
@@ -132,6 +225,8 @@ tools = {
     },
     "cancel_appointment": {
         "name": "cancel_appointment",
+        "deadline_ms": 10000,
+        "bulkhead": "database",
         "description": "Cancel an existing appointment",
         "inputSchema": {
             "type": "object",
@@ -150,6 +245,8 @@ tools = {
     },
     "general_query": {
         "name": "general_query",
+        "deadline_ms": 30000,
+        "bulkhead": "llm",
         "description": "Answer general health and wellness questions with evidence-based information",
         "inputSchema": {
             "type": "object",
@@ -176,122 +273,483 @@ def get_available_tools() -> List[Dict[str, Any]]:
     Returns:
         List of tool definitions compatible with MCP protocol
     """
-    return list(tools.values())
+    return [
+        {field: value for field, value in tool.items() if field not in _SERVER_FIELDS}
+        for tool in tools.values()
+    ]
+
+
+# ============ Argument Validation ============
+
+Validator = Callable[[Any, str], Optional[str]]
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+}
+
+_PATTERN_HINTS = {
+    TIME_PATTERN: "HH:MM",
+    TIME_WINDOW_PATTERN: "HH:MM-HH:MM",
+}
+
+
+def _is_date(value: str) -> bool:
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+        return True
+    except ValueError:
+        return False
+
+
+_FORMAT_CHECKS: Dict[str, tuple[Callable[[str], bool], str]] = {
+    "date": (_is_date, "YYYY-MM-DD"),
+}
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or value == ""
+
+
+def _compile_value(schema: Dict[str, Any]) -> Validator:
+    """Build a checker for one value; every regex and sub-schema is compiled here, once"""
+    checks: List[Validator] = []
+
+    expected = schema.get("type")
+    if expected:
+        is_type = _TYPE_CHECKS[expected]
+        checks.append(
+            lambda value, path: None if is_type(value) else f"Invalid type for '{path}': expected {expected}"
+        )
+
+    if schema.get("format") in _FORMAT_CHECKS:
+        is_valid, hint = _FORMAT_CHECKS[schema["format"]]
+        checks.append(
+            lambda value, path: None if is_valid(value) else f"Invalid value for '{path}': {value!r} (expected {hint})"
+        )
+
+    if "pattern" in schema:
+        regex = re.compile(schema["pattern"])
+        hint = _PATTERN_HINTS.get(schema["pattern"], schema["pattern"])
+        checks.append(
+            lambda value, path: None if regex.match(value) else f"Invalid value for '{path}': {value!r} (expected {hint})"
+        )
+
+    if "items" in schema:
+        check_item = _compile_value(schema["items"])
+
+        def check_items(value, path):
+            for index, item in enumerate(value):
+                error = check_item(item, f"{path}[{index}]")
+                if error:
+                    return error
+            return None
+        checks.append(check_items)
+
+    if "properties" in schema or "required" in schema:
+        checks.append(_compile_object(schema))
+
+    def check(value, path):
+        for run_check in checks:
+            error = run_check(value, path)
+            if error:
+                return error
+        return None
+    return check
+
+
+def _compile_object(schema: Dict[str, Any]) -> Validator:
+    """Required fields, alternative required sets (anyOf) and per-property checks"""
+    required = list(schema.get("required", []))
+    alternatives = [option["required"] for option in schema.get("anyOf", [])]
+    properties = {name: _compile_value(prop) for name, prop in schema.get("properties", {}).items()}
+
+    def check(value, path):
+        for field in required:
+            if _is_missing(value.get(field)):
+                return f"Missing required field: {field}"
+        if alternatives and not any(all(not _is_missing(value.get(field)) for field in option) for option in alternatives):
+            return "Missing required field: " + " or ".join(", ".join(option) for option in alternatives)
+        for field, check_field in properties.items():
+            field_value = value.get(field)
+            if field_value is not None:
+                error = check_field(field_value, f"{path}.{field}" if path else field)
+                if error:
+                    return error
+        return None
+    return check
+
+
+def compile_validator(input_schema: Dict[str, Any]) -> Callable[[Any], Optional[str]]:
+    """
+    Compile a tool's inputSchema into a validator.
+    
+    Supports the subset of JSON Schema the tool registry uses: type,
+    required, properties, items, anyOf of required sets, format "date"
+    and pattern. Unknown arguments are ignored and optional arguments
+    may be null.
+    
+    Args:
+        input_schema: The tool's inputSchema
+        
+    Returns:
+        Function taking the arguments and returning an error message or None
+    """
+    check = _compile_object(input_schema)
+    return lambda args: check(args, "") if isinstance(args, dict) else "Tool arguments must be an object"
+
+
+# ============ Dispatch ============
+
+# Sync entry point of every tool, called with validated arguments
+_handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "generate_diet": lambda args: diet.generate(
+        preferences=args["preferences"],
+        calories=args.get("calories"),
+        allergies=args.get("allergies") or []
+    ),
+    "book_appointment": lambda args: booking.book(
+        user_id=args["user_id"],
+        date=args["date"],
+        time=args["time"],
+        specialty=args.get("specialty"),
+        reason=args.get("reason"),
+        doctor_id=args.get("doctor_id")
+    ),
+    "get_doctors": lambda args: doctors.get_doctors(
+        specialty=args.get("specialty")
+    ),
+    "get_available_slots": lambda args: doctors.get_available_slots(
+        specialty=args["specialty"],
+        date=args["date"],
+        doctor_id=args.get("doctor_id")
+    ),
+    "find_next_available": lambda args: doctors.find_next_available(
+        specialty=args.get("specialty"),
+        doctor_id=args.get("doctor_id"),
+        start_date=args.get("start_date"),
+        days=args.get("days", 14),
+        limit=args.get("limit", 5),
+        time_windows=args.get("time_windows")
+    ),
+    "get_doctor_schedule": lambda args: doctors.get_doctor_schedule(
+        doctor_identifier=args["doctor_id"]
+    ),
+    "get_appointment": lambda args: booking.get_appointment(
+        confirmation_number=args["confirmation_number"]
+    ),
+    "cancel_appointment": lambda args: booking.cancel_appointment(
+        confirmation_number=args["confirmation_number"],
+        reason=args.get("reason")
+    ),
+    "general_query": lambda args: general.answer(
+        question=args["question"],
+        context=args.get("context")
+    ),
+}
+
+# Tools with a native asyncio implementation. Everything else (LLM tools,
+# schedule lookups) runs its sync handler on a worker thread.
+_async_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "get_doctors": lambda args: doctors.get_doctors_async(
+        specialty=args.get("specialty")
+    ),
+    "get_available_slots": lambda args: doctors.get_available_slots_async(
+        specialty=args["specialty"],
+        date=args["date"],
+        doctor_id=args.get("doctor_id")
+    ),
+    "find_next_available": lambda args: doctors.find_next_available_async(
+        specialty=args.get("specialty"),
+        doctor_id=args.get("doctor_id"),
+        start_date=args.get("start_date"),
+        days=args.get("days", 14),
+        limit=args.get("limit", 5),
+        time_windows=args.get("time_windows")
+    ),
+    "book_appointment": lambda args: booking.book_async(
+        user_id=args["user_id"],
+        date=args["date"],
+        time=args["time"],
+        specialty=args.get("specialty"),
+        reason=args.get("reason"),
+        doctor_id=args.get("doctor_id")
+    ),
+    "get_appointment": lambda args: booking.get_appointment_async(
+        confirmation_number=args["confirmation_number"]
+    ),
+    "cancel_appointment": lambda args: booking.cancel_appointment_async(
+        confirmation_number=args["confirmation_number"],
+        reason=args.get("reason")
+    ),
+}
+
+# Tools that can stream their output: async generators yielding text pieces
+# as the model produces them, then the same result dict as the sync handler
+_stream_handlers: Dict[str, Callable[[Dict[str, Any]], AsyncIterator[Any]]] = {
+    "generate_diet": lambda args: diet.generate_stream(
+        preferences=args["preferences"],
+        calories=args.get("calories"),
+        allergies=args.get("allergies") or []
+    ),
+    "general_query": lambda args: general.answer_stream(
+        question=args["question"],
+        context=args.get("context")
+    ),
+}
+
+_missing_handlers = set(tools) - set(_handlers)
+if _missing_handlers:
+    raise RuntimeError(f"MCP tools without a handler: {', '.join(sorted(_missing_handlers))}")
+
+_unknown_bulkheads = {tool["bulkhead"] for tool in tools.values()} - set(BULKHEADS)
+if _unknown_bulkheads:
+    raise RuntimeError(f"MCP tools reference unknown bulkheads: {', '.join(sorted(_unknown_bulkheads))}")
+
+# Fail at startup rather than on the first auto-assigned booking if ASSIGNMENT_STRATEGY is misspelled
+get_assignment_strategy()
+
+# Compiled once at import, so a call only pays for the checks themselves
+_validators = {name: compile_validator(tool["inputSchema"]) for name, tool in tools.items()}
+
+
+# Identical read-only calls in flight at the same time share one execution
+_flights = SingleFlight()
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    """How many read calls joined an identical call already in flight"""
+    return _flights.stats()
+
+
+def bulkhead_stats() -> Dict[str, Any]:
+    """Active, queued and rejected calls per bulkhead"""
+    return {name: bulkhead.stats() for name, bulkhead in BULKHEADS.items()}
+
+
+def _deadline_error(name: str) -> Dict[str, Any]:
+    return {
+        "error": "Tool did not finish within its deadline",
+        "tool": name,
+        "suggestion": "Please try again; the service may be busy"
+    }
+
+
+def _busy_error(name: str, full: BulkheadFull) -> Dict[str, Any]:
+    return {
+        "error": "Too many requests of this kind are in progress",
+        "tool": name,
+        "retry_after": full.retry_after,
+        "suggestion": f"Please try again in {full.retry_after} second(s)"
+    }
+
+
+def _unknown_tool(name: str) -> Dict[str, Any]:
+    return {
+        "error": f"Unknown tool: {name}",
+        "available_tools": list(tools.keys())
+    }
 
 
 def call_tool(name: str, args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Execute a tool by name with provided arguments.
     
+    Arguments are checked against the tool's compiled schema validator
+    before the handler (and any database or LLM work) runs; read-only
+    tools are answered from the result cache when possible, and identical
+    read calls already in flight are joined instead of repeated. The call
+    runs under the tool's deadline_ms (or the caller's shorter deadline).
+    
     Args:
         name: Name of the tool to execute
         args: Dictionary of arguments for the tool
         
     Returns:
         Tool execution result or error message
-        
-    Raises:
-        ValueError: If tool name is unknown or required arguments are missing
     """
     if args is None:
         args = {}
     
-    # Validate tool exists
-    if name not in tools:
+    handler = _handlers.get(name)
+    if handler is None:
+        return _unknown_tool(name)
+    
+    error = _validators[name](args)
+    if error:
+        return {"error": error}
+    
+    cache = get_result_cache()
+    cached = cache.get(name, args)
+    if cached is not None:
+        return cached
+    
+    executed = False
+    
+    def execute():
+        nonlocal executed
+        executed = True
+        version = cache.version()
+        with BULKHEADS[tools[name]["bulkhead"]].enter():
+            started = time.perf_counter()
+            result = handler(args)
+        cache.put(name, args, result, time.perf_counter() - started, version)
+        return result
+    
+    try:
+        with deadline.deadline_scope(tools[name]["deadline_ms"] / 1000):
+            key = canonical_key(name, args)
+            result = execute() if key is None else _flights.do(key, execute)
+        if not executed:
+            cache.record_coalesced(name, args)
+        cache.invalidate_for(name, args)
+        return result
+    except BulkheadFull as full:
+        return _busy_error(name, full)
+    except _TIMEOUTS:
+        return _deadline_error(name)
+    except Exception as e:
         return {
-            "error": f"Unknown tool: {name}",
-            "available_tools": list(tools.keys())
+            "error": f"Tool execution failed: {str(e)}",
+            "tool": name
         }
+
+
+async def call_tool_async(name: str, args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Execute a tool by name from inside the event loop.
+    
+    Database-bound tools run natively on AsyncDatabase; the rest run
+    their sync handler on their bulkhead's threads. Caching and coalescing work
+    as in call_tool.
+    
+    Args:
+        name: Name of the tool to execute
+        args: Dictionary of arguments for the tool
+        
+    Returns:
+        Tool execution result or error message
+    """
+    if args is None:
+        args = {}
+    
+    handler = _handlers.get(name)
+    if handler is None:
+        return _unknown_tool(name)
+    
+    error = _validators[name](args)
+    if error:
+        return {"error": error}
+    
+    cache = get_result_cache()
+    cached = cache.get(name, args)
+    if cached is not None:
+        return cached
+    
+    executed = False
+    
+    async def execute():
+        nonlocal executed
+        executed = True
+        version = cache.version()
+        bulkhead = BULKHEADS[tools[name]["bulkhead"]]
+        started = time.perf_counter()
+        async_handler = _async_handlers.get(name)
+        if async_handler is None:
+            result = await bulkhead.run_in_thread(handler, args)
+        else:
+            async with bulkhead.enter_async():
+                result = await async_handler(args)
+        cache.put(name, args, result, time.perf_counter() - started, version)
+        return result
     
     try:
-        # Route to appropriate tool handler
-        if name == "generate_diet":
-            preferences = args.get("preferences")
-            if not preferences:
-                return {"error": "Missing required parameter: preferences"}
-            
-            return diet.generate(
-                preferences=preferences,
-                calories=args.get("calories"),
-                allergies=args.get("allergies", [])
-            )
-            
-        elif name == "book_appointment":
-            user_id = args.get("user_id")
-            date = args.get("date")
-            time = args.get("time")
-            
-            if not user_id or not date or not time:
-                return {"error": "Missing required parameters: user_id, date, and time"}
-            
-            return booking.book(
-                user_id=user_id,
-                date=date,
-                time=time,
-                specialty=args.get("specialty"),
-                reason=args.get("reason"),
-                doctor_id=args.get("doctor_id")
-            )
-
-        elif name == "get_doctors":
-            return doctors.get_doctors(
-                specialty=args.get("specialty")
-            )
-
-        elif name == "get_available_slots":
-            specialty = args.get("specialty")
-            date = args.get("date")
-            
-            if not specialty or not date:
-                return {"error": "Missing required parameters: specialty and date"}
-            
-            return doctors.get_available_slots(
-                specialty=specialty,
-                date=date,
-                doctor_id=args.get("doctor_id")
-            )
-
-        elif name == "get_doctor_schedule":
-            doctor_id = args.get("doctor_id")
-            if not doctor_id:
-                return {"error": "Missing required parameter: doctor_id"}
-            
-            return doctors.get_doctor_schedule(doctor_identifier=doctor_id)
-
-        elif name == "get_appointment":
-            confirmation_number = args.get("confirmation_number")
-            if not confirmation_number:
-                return {"error": "Missing required parameter: confirmation_number"}
-            
-            return booking.get_appointment(confirmation_number=confirmation_number)
-
-        elif name == "cancel_appointment":
-            confirmation_number = args.get("confirmation_number")
-            if not confirmation_number:
-                return {"error": "Missing required parameter: confirmation_number"}
-            
-            return booking.cancel_appointment(
-                confirmation_number=confirmation_number,
-                reason=args.get("reason")
-            )
-            
-        elif name == "general_query":
-            question = args.get("question")
-            if not question:
-                return {"error": "Missing required parameter: question"}
-            
-            return general.answer(
-                question=question,
-                context=args.get("context")
-            )
-            
+        with deadline.deadline_scope(tools[name]["deadline_ms"] / 1000):
+            key = canonical_key(name, args)
+            work = execute() if key is None else _flights.do_async(key, execute)
+            # Stop waiting once the budget is spent; Supabase and Mistral calls
+            # made for this request carry the same deadline and give up too
+            result = await asyncio.wait_for(work, timeout=max(deadline.remaining(), 0))
+        if not executed:
+            cache.record_coalesced(name, args)
+        cache.invalidate_for(name, args)
+        return result
+    except BulkheadFull as full:
+        return _busy_error(name, full)
+    except _TIMEOUTS:
+        return _deadline_error(name)
     except Exception as e:
         return {
             "error": f"Tool execution failed: {str(e)}",
             "tool": name
         }
+
+
+async def stream_tool(name: str, args: Optional[Dict[str, Any]] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Execute a tool, yielding its output as it is produced.
+    
+    Streaming tools yield ("token", {"text": ...}) for each piece of text,
+    then every tool yields exactly one ("result", result) with the dict
+    call_tool_async would return. Tools without a streaming handler, and
+    calls with invalid arguments, yield only the result.
+    
+    The stream holds a bulkhead slot and runs under the tool's deadline
+    like any other call; closing the iterator early cancels the work.
     
-    return {"error": "Tool handler not implemented"}
+    Args:
+        name: Name of the tool to execute
+        args: Dictionary of arguments for the tool
+    """
+    if args is None:
+        args = {}
+    
+    stream_handler = _stream_handlers.get(name)
+    if stream_handler is None or _validators[name](args):
+        yield "result", await call_tool_async(name, args)
+        return
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def pump():
+        result = None
+        async with BULKHEADS[tools[name]["bulkhead"]].enter_async():
+            async for item in stream_handler(args):
+                if isinstance(item, dict):
+                    result = item
+                else:
+                    events.put_nowait(("token", {"text": item}))
+        return result
+    
+    async def produce():
+        # Runs in its own task so the deadline scope never spans a yield
+        try:
+            with deadline.deadline_scope(tools[name]["deadline_ms"] / 1000):
+                result = await asyncio.wait_for(pump(), timeout=max(deadline.remaining(), 0))
+        except BulkheadFull as full:
+            result = _busy_error(name, full)
+        except _TIMEOUTS:
+            result = _deadline_error(name)
+        except Exception as e:
+            result = {
+                "error": f"Tool execution failed: {str(e)}",
+                "tool": name
+            }
+        events.put_nowait(("result", result))
+    
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            event = await events.get()
+            yield event
+            if event[0] == "result":
+                return
+    finally:
+        task.cancel()
 
 
 def validate_tool_args(tool_name: str, args: Dict[str, Any]) -> tuple[bool, Optional[str]]:
@@ -305,14 +763,9 @@ def validate_tool_args(tool_name: str, args: Dict[str, Any]) -> tuple[bool, Opti
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if tool_name not in tools:
+    validator = _validators.get(tool_name)
+    if validator is None:
         return False, f"Unknown tool: {tool_name}"
     
-    tool_schema = tools[tool_name]["inputSchema"]
-    required_fields = tool_schema.get("required", [])
-    
-    for field in required_fields:
-        if field not in args or args[field] is None:
-            return False, f"Missing required field: {field}"
-    
-    return True, None
\ No newline at end of file
+    error = validator(args)
+    return error is None, error
@@ -0,0 +1,239 @@
+"""
+MCP JSON-RPC transport for Healthcare MCP Server
+Serves the tool registry over JSON-RPC 2.0 (initialize, tools/list, tools/call)
+on stdio and on the streamable HTTP endpoint POST /mcp
+
+Requests on one connection are handled concurrently and answered as they
+finish, correlated by id, so a client can pipeline tool calls.
+
+Usage:
+    python -m backend.mcp_transport        # stdio, for MCP clients that spawn the server
+"""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Union
+
+from backend.deadline import deadline_scope, parse_budget_ms
+from backend.mcp import tools, call_tool_async, get_available_tools
+
+SUPPORTED_PROTOCOL_VERSIONS = ["2025-03-26", "2024-11-05"]
+SERVER_INFO = {"name": "healthcare-mcp", "version": "1.0.0"}
+
+# Requests from one stdio or WebSocket connection running at once
+MCP_MAX_IN_FLIGHT = int(os.getenv("MCP_MAX_IN_FLIGHT", "32"))
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+Message = Dict[str, Any]
+
+
+class JsonRpcError(Exception):
+    """Raised by a method handler to answer with a JSON-RPC error object"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _error(request_id: Any, code: int, message: str) -> Message:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+# ============ Methods ============
+
+async def _initialize(params: Dict[str, Any]) -> Dict[str, Any]:
+    requested = params.get("protocolVersion")
+    version = requested if requested in SUPPORTED_PROTOCOL_VERSIONS else SUPPORTED_PROTOCOL_VERSIONS[0]
+    return {
+        "protocolVersion": version,
+        "capabilities": {"tools": {"listChanged": False}},
+        "serverInfo": SERVER_INFO,
+    }
+
+
+async def _ping(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {}
+
+
+async def _tools_list(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"tools": get_available_tools()}
+
+
+async def _tools_call(params: Dict[str, Any]) -> Dict[str, Any]:
+    name = params.get("name")
+    if name not in tools:
+        raise JsonRpcError(INVALID_PARAMS, f"Unknown tool: {name}")
+
+    arguments = params.get("arguments") or {}
+    # Clients without HTTP headers can pass their budget as _meta.deadlineMs
+    budget = parse_budget_ms((params.get("_meta") or {}).get("deadlineMs"))
+    with deadline_scope(budget):
+        result = await call_tool_async(name, arguments)
+
+    # Tool-level failures (bad arguments, slot taken, ...) are results the
+    # model should see, not protocol errors
+    return {
+        "content": [{"type": "text", "text": json.dumps(result, default=str)}],
+        "structuredContent": result,
+        "isError": bool(result.get("error")),
+    }
+
+
+_methods = {
+    "initialize": _initialize,
+    "ping": _ping,
+    "tools/list": _tools_list,
+    "tools/call": _tools_call,
+}
+
+
+# ============ Dispatch ============
+
+async def handle_message(message: Any) -> Optional[Message]:
+    """
+    Handle one JSON-RPC request or notification.
+
+    Args:
+        message: Decoded JSON-RPC message
+
+    Returns:
+        The response, or None for notifications
+    """
+    if isinstance(message, dict) and "method" not in message and ("result" in message or "error" in message):
+        # A response to a server-initiated request; this server sends none
+        return None
+    if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or not isinstance(message.get("method"), str):
+        return _error(message.get("id") if isinstance(message, dict) else None, INVALID_REQUEST, "Invalid Request")
+
+    is_notification = "id" not in message
+    request_id = message.get("id")
+    method = _methods.get(message["method"])
+
+    if is_notification:
+        # notifications/initialized, notifications/cancelled, ... need no reply
+        return None
+    if method is None:
+        return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {message['method']}")
+
+    params = message.get("params") or {}
+    if not isinstance(params, dict):
+        return _error(request_id, INVALID_PARAMS, "params must be an object")
+
+    try:
+        return {"jsonrpc": "2.0", "id": request_id, "result": await method(params)}
+    except JsonRpcError as e:
+        return _error(request_id, e.code, e.message)
+    except Exception as e:
+        return _error(request_id, INTERNAL_ERROR, f"Internal error: {str(e)}")
+
+
+async def handle_payload(payload: Union[Message, List[Any]]) -> Optional[Union[Message, List[Message]]]:
+    """
+    Handle a single message or a JSON-RPC batch.
+
+    Batch entries run concurrently; responses keep the batch order and
+    notifications are left out.
+
+    Returns:
+        Response(s), or None if there is nothing to answer
+    """
+    if isinstance(payload, list):
+        if not payload:
+            return _error(None, INVALID_REQUEST, "Empty batch")
+        responses = await asyncio.gather(*(handle_message(message) for message in payload))
+        responses = [response for response in responses if response is not None]
+        return responses or None
+    return await handle_message(payload)
+
+
+async def handle_raw(raw: Union[str, bytes]) -> Optional[Union[Message, List[Message]]]:
+    """Parse and handle one JSON-RPC payload as received on the wire"""
+    try:
+        payload = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        return _error(None, PARSE_ERROR, "Parse error")
+    return await handle_payload(payload)
+
+
+# ============ stdio ============
+
+async def serve_stdio() -> None:
+    """
+    Serve newline-delimited JSON-RPC on stdin/stdout until stdin closes.
+
+    Each line is handled in its own task, so slow calls (LLM answers) do not
+    hold up quick ones; responses are written as they complete. A
+    notifications/cancelled message cancels the named request, which then
+    gets no response.
+    """
+    out = sys.stdout.buffer
+    # Tools log with print(); keep stdout for protocol messages only
+    sys.stdout = sys.stderr
+
+    write_lock = asyncio.Lock()
+    in_flight = asyncio.Semaphore(MCP_MAX_IN_FLIGHT)
+    pending = set()
+    by_id: Dict[Any, asyncio.Task] = {}
+
+    async def respond(payload: Any) -> None:
+        try:
+            # Waited for inside the task so the reader keeps handling
+            # notifications/cancelled while every slot is taken
+            async with in_flight:
+                response = await handle_payload(payload)
+        except asyncio.CancelledError:
+            return
+        if response is not None:
+            data = json.dumps(response, default=str).encode() + b"\n"
+            async with write_lock:
+                out.write(data)
+                out.flush()
+
+    async def write_error(code: int, message: str) -> None:
+        async with write_lock:
+            out.write(json.dumps(_error(None, code, message)).encode() + b"\n")
+            out.flush()
+
+    print("🔌 MCP stdio transport ready", file=sys.stderr)
+    while True:
+        line = await asyncio.to_thread(sys.stdin.buffer.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+
+        try:
+            payload = json.loads(line)
+        except (ValueError, UnicodeDecodeError):
+            await write_error(PARSE_ERROR, "Parse error")
+            continue
+
+        if isinstance(payload, dict) and payload.get("method") == "notifications/cancelled":
+            task = by_id.get((payload.get("params") or {}).get("requestId"))
+            if task is not None:
+                task.cancel()
+            continue
+
+        task = asyncio.create_task(respond(payload))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        if isinstance(payload, dict) and payload.get("id") is not None:
+            request_id = payload["id"]
+            by_id[request_id] = task
+            task.add_done_callback(lambda done, request_id=request_id: by_id.pop(request_id, None))
+
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_stdio())
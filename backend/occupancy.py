@@ -0,0 +1,162 @@
+"""
+Slot occupancy index for Healthcare MCP Server
+Keeps one integer bitmap per (doctor_id, date) with one bit per 15-minute slot,
+so availability checks are bit operations instead of database queries
+"""
+
+import threading
+import time as _time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES  # 96 slots, bit 0 = 00:00
+
+
+def time_to_slot(time_str: str) -> int:
+    """Convert 'HH:MM' or 'HH:MM:SS' into a slot index (0-95)"""
+    hour, minute = map(int, time_str.split(":")[:2])
+    return (hour * 60 + minute) // SLOT_MINUTES
+
+
+def slot_to_time(slot: int) -> str:
+    """Convert a slot index back into 'HH:MM'"""
+    minutes = slot * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def range_mask(start_time: str, end_time: str) -> int:
+    """Bitmap with every slot in [start_time, end_time) set"""
+    start = time_to_slot(start_time)
+    end = time_to_slot(end_time)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def iter_slots(mask: int) -> Iterable[int]:
+    """Yield the index of every set bit, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def run_starts(mask: int, length: int) -> int:
+    """Bitmap of slots that begin a run of `length` consecutive set bits in mask"""
+    runs = mask
+    for offset in range(1, length):
+        runs &= mask >> offset
+    return runs
+
+
+class OccupancyIndex:
+    """
+    In-process index of booked slots per doctor-day.
+
+    A day is only trusted once it has been loaded from the database; entries
+    expire after `ttl_seconds` so bookings made by other workers are picked up.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._days: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, str, int], None]] = []
+        self._slot_listeners: List[Callable[[str, str, str, bool], None]] = []
+
+    def add_listener(self, listener: Callable[[str, str, Optional[int]], None]) -> None:
+        """
+        Call listener(doctor_id, date, booked_mask) whenever a day changes.
+
+        booked_mask is None when a slot was booked or released on a day that
+        is not loaded, so only the fact that it changed is known.
+        """
+        self._listeners.append(listener)
+
+    def add_slot_listener(self, listener: Callable[[str, str, str, bool], None]) -> None:
+        """
+        Call listener(doctor_id, date, time, booked) for every slot booked or
+        released through this index. Loading a day from the database is not
+        a change and does not notify.
+        """
+        self._slot_listeners.append(listener)
+
+    def _notify(self, changes: Dict[Tuple[str, str], Optional[int]]) -> None:
+        for (doctor_id, date), mask in changes.items():
+            for listener in self._listeners:
+                listener(doctor_id, date, mask)
+
+    def _entry(self, doctor_id: str, date: str) -> Optional[int]:
+        entry = self._days.get((doctor_id, date))
+        if entry is None:
+            return None
+        mask, loaded_at = entry
+        if _time.monotonic() - loaded_at > self.ttl_seconds:
+            return None
+        return mask
+
+    def missing(self, doctor_ids: List[str], date: str) -> List[str]:
+        """Return the doctor_ids whose day is not loaded (or has expired)"""
+        return [doctor_id for doctor_id in doctor_ids if self._entry(doctor_id, date) is None]
+
+    def load_day(self, doctor_ids: List[str], date: str, appointments: List[Dict]) -> None:
+        """Replace the bitmaps for doctor_ids on date from appointment rows"""
+        masks = {doctor_id: 0 for doctor_id in doctor_ids}
+        for row in appointments:
+            if row["doctor_id"] in masks:
+                masks[row["doctor_id"]] |= 1 << time_to_slot(row["appointment_time"])
+
+        loaded_at = _time.monotonic()
+        with self._lock:
+            for doctor_id, mask in masks.items():
+                self._days[(doctor_id, date)] = (mask, loaded_at)
+        self._notify({(doctor_id, date): mask for doctor_id, mask in masks.items()})
+
+    def mask(self, doctor_id: str, date: str) -> int:
+        """Booked-slot bitmap for a doctor-day (0 if not loaded)"""
+        return self._entry(doctor_id, date) or 0
+
+    def is_free(self, doctor_id: str, date: str, time: str) -> bool:
+        """True if the slot at `time` is not booked"""
+        return not (self.mask(doctor_id, date) >> time_to_slot(time)) & 1
+
+    def free_doctor_ids(self, doctor_ids: List[str], date: str, time: str) -> List[str]:
+        """Subset of doctor_ids with the slot at `time` open"""
+        return [doctor_id for doctor_id in doctor_ids if self.is_free(doctor_id, date, time)]
+
+    def free_mask(self, doctor_id: str, date: str, working_mask: int) -> int:
+        """Open slots for one doctor within their working hours"""
+        return working_mask & ~self.mask(doctor_id, date)
+
+    def any_free_mask(self, working_masks: Dict[str, int], date: str) -> int:
+        """OR of free slots across doctors - a set bit means someone is free"""
+        union = 0
+        for doctor_id, working_mask in working_masks.items():
+            union |= self.free_mask(doctor_id, date, working_mask)
+        return union
+
+    def _update(self, doctor_id: str, date: str, slot: int, booked: bool) -> None:
+        with self._lock:
+            entry = self._days.get((doctor_id, date))
+            if entry is None:
+                mask = None  # Not loaded yet - the next load reads it from the database
+            else:
+                mask, loaded_at = entry
+                mask = mask | (1 << slot) if booked else mask & ~(1 << slot)
+                self._days[(doctor_id, date)] = (mask, loaded_at)
+        self._notify({(doctor_id, date): mask})
+        for listener in self._slot_listeners:
+            listener(doctor_id, date, slot_to_time(slot), booked)
+
+    def book(self, doctor_id: str, date: str, time: str) -> None:
+        """Mark a slot as taken"""
+        self._update(doctor_id, date, time_to_slot(time), True)
+
+    def release(self, doctor_id: str, date: str, time: str) -> None:
+        """Mark a slot as open again (e.g. after cancellation)"""
+        self._update(doctor_id, date, time_to_slot(time), False)
+
+    def clear(self) -> None:
+        """Drop every loaded day"""
+        with self._lock:
+            self._days.clear()
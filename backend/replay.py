@@ -0,0 +1,316 @@
+"""
+Fallback replay for Healthcare MCP Server
+Background worker that drains bookings from the write-ahead log into Supabase
+once the database is reachable again
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.database import get_db, SlotTakenError
+from backend.occupancy import slot_to_time, time_to_slot
+from backend.wal import WriteAheadLog, try_exclusive
+
+Checkpoint = Tuple[Optional[str], int]  # (segment name, byte offset after the last replayed record)
+
+
+def _booking_key(row: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """
+    What makes two records the same booking: confirmation number, patient,
+    date and time. The doctor is left out because replay may reassign it.
+    """
+    return (
+        row["confirmation_number"],
+        row["patient_id"],
+        str(row["appointment_date"]),
+        slot_to_time(time_to_slot(str(row["appointment_time"]))),
+    )
+
+
+def replacement_number(row: Dict[str, Any]) -> str:
+    """
+    Confirmation number for a booking whose own number belongs to another appointment.
+
+    Derived from the booking itself, so a batch that is replayed again after
+    a crash gives the booking the same number and finds its earlier insert.
+    """
+    digest = hashlib.sha256("|".join(_booking_key(row)).encode("utf-8")).hexdigest()
+    return f"APT-{digest[:12].upper()}"
+
+
+class ReplayWorker:
+    """
+    Tails a booking WAL and bulk-inserts its records into the appointments table.
+
+    Records are read in batches from the last checkpoint; up to `concurrency`
+    batches are inserted in parallel and the checkpoint only advances past
+    batches that completed, so a crash or outage replays at most one wave again.
+    Each uvicorn worker runs its own ReplayWorker; a lock file in the WAL
+    directory lets only one process replay (and prune segments) at a time,
+    the others skip that round. Replays are idempotent: a record whose booking is already stored (same
+    confirmation number, patient, date and time) is skipped. A record whose
+    confirmation number belongs to a different appointment is a collision,
+    not a duplicate - it is inserted under replacement_number(), and the
+    old and new numbers are logged to the "renumbered" log so the patient
+    can be told. Failures back off exponentially up to `max_backoff` seconds.
+    """
+
+    def __init__(
+        self,
+        wal: WriteAheadLog,
+        db=None,
+        batch_size: int = 200,
+        concurrency: int = 4,
+        poll_interval: float = 5.0,
+        max_backoff: float = 300.0,
+    ):
+        self.wal = wal
+        self.db = db or get_db()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.checkpoint_path = os.path.join(wal.directory, "replay.checkpoint")
+        self._run_lock_fd = os.open(os.path.join(wal.directory, "replay.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        # Bookings that could not be placed with any doctor, kept for manual follow-up
+        self.conflicts = WriteAheadLog(wal.directory, prefix="conflicts", commit_delay=0)
+        # Bookings replayed under a new confirmation number, for telling the patient
+        self.renumbered = WriteAheadLog(wal.directory, prefix="renumbered", commit_delay=0)
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay")
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "replayed": 0, "duplicates": 0, "renumbered": 0, "reassigned": 0, "conflicts": 0, "failures": 0
+        }
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    # ============ Checkpoint ============
+
+    def load_checkpoint(self) -> Checkpoint:
+        """Position to resume from ((None, 0) = start of the log)"""
+        if not os.path.exists(self.checkpoint_path):
+            return None, 0
+        with open(self.checkpoint_path, "r") as f:
+            data = json.load(f)
+        return data["segment"], data["offset"]
+
+    def save_checkpoint(self, checkpoint: Checkpoint) -> None:
+        """Atomically persist the replay position"""
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"segment": checkpoint[0], "offset": checkpoint[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # ============ Replay ============
+
+    def _read_wave(self, checkpoint: Checkpoint) -> List[Tuple[List[Dict[str, Any]], Checkpoint]]:
+        """Next `concurrency` batches after checkpoint, each with the checkpoint at its end"""
+        batches, rows = [], []
+        for segment, offset, record in self.wal.read(*checkpoint):
+            rows.append(record)
+            if len(rows) == self.batch_size:
+                batches.append((rows, (segment, offset)))
+                rows = []
+                if len(batches) == self.concurrency:
+                    return batches
+        if rows:
+            batches.append((rows, (segment, offset)))
+        return batches
+
+    def run_once(self) -> int:
+        """
+        Replay everything after the checkpoint.
+
+        Returns:
+            Number of records processed (0 if another process is replaying)
+
+        Raises:
+            Exception: The first batch failure, after checkpointing the batches before it
+        """
+        with try_exclusive(self._run_lock_fd) as locked:
+            if not locked:
+                return 0
+            return self._replay_from_checkpoint()
+
+    def _replay_from_checkpoint(self) -> int:
+        processed = 0
+        checkpoint = self.load_checkpoint()
+
+        while True:
+            wave = self._read_wave(checkpoint)
+            if not wave:
+                break
+
+            futures = [self._pool.submit(self._replay_batch, rows) for rows, _ in wave]
+            for future, (rows, batch_end) in zip(futures, wave):
+                try:
+                    future.result()
+                except Exception:
+                    self.save_checkpoint(checkpoint)  # later batches in the wave are simply redone
+                    raise
+                checkpoint = batch_end
+                processed += len(rows)
+            self.save_checkpoint(checkpoint)
+
+        if checkpoint[0]:
+            self.wal.prune(checkpoint[0])
+        return processed
+
+    def _replay_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """Dedupe, detect taken slots, bulk-insert the rest and resolve conflicts"""
+        # The same booking logged twice keeps its last copy
+        unique = {_booking_key(row): row for row in rows}
+        self._count("duplicates", len(rows) - len(unique))
+        # A collided booking may have been stored under its replacement number by an earlier run
+        numbers_to_check = set()
+        for row in unique.values():
+            numbers_to_check.update((row["confirmation_number"], replacement_number(row)))
+        existing = self.db.existing_appointments(sorted(numbers_to_check))
+
+        pending, numbers = [], set()
+        for key, row in unique.items():
+            if self._stored(existing, row):
+                self._count("duplicates")  # Replayed before
+                continue
+            if row["confirmation_number"] in existing or row["confirmation_number"] in numbers:
+                renumbered = {**row, "confirmation_number": replacement_number(row)}
+                if self._stored(existing, renumbered):
+                    self._count("duplicates")  # Renumbered and replayed before
+                    continue
+                if renumbered["confirmation_number"] in existing or renumbered["confirmation_number"] in numbers:
+                    self._keep_conflict(row, "replacement confirmation number also taken")
+                    continue
+                row = self._renumber(row, renumbered)
+            numbers.add(row["confirmation_number"])
+            pending.append(row)
+        if not pending:
+            return
+
+        insertable, conflicting = self._split_by_slot(pending)
+        if insertable:
+            try:
+                self.db.insert_appointments(insertable)
+                self._count("replayed", len(insertable))
+            except SlotTakenError:
+                # Raced with a live booking - fall back to row-by-row inserts
+                for row in insertable:
+                    self._insert_or_resolve(row)
+
+        for row in conflicting:
+            self._resolve_conflict(row)
+
+    @staticmethod
+    def _stored(existing: Dict[str, Dict[str, Any]], row: Dict[str, Any]) -> bool:
+        stored = existing.get(row["confirmation_number"])
+        return stored is not None and _booking_key(stored) == _booking_key(row)
+
+    def _renumber(self, row: Dict[str, Any], renumbered: Dict[str, Any]) -> Dict[str, Any]:
+        """Record that a booking is replayed under a new confirmation number"""
+        self.renumbered.append({
+            "original_confirmation_number": row["confirmation_number"],
+            "confirmation_number": renumbered["confirmation_number"],
+            "patient_id": row["patient_id"],
+            "appointment_date": row["appointment_date"],
+            "appointment_time": row["appointment_time"],
+        })
+        self._count("renumbered")
+        print(
+            f"   ⚠️  {row['confirmation_number']} already belongs to another appointment; "
+            f"replaying {row['patient_id']}'s booking as {renumbered['confirmation_number']}"
+        )
+        return renumbered
+
+    def _split_by_slot(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Separate rows whose slot is already taken (in the database or earlier in this batch)"""
+        by_date = defaultdict(list)
+        for row in rows:
+            by_date[row["appointment_date"]].append(row)
+
+        insertable, conflicting = [], []
+        for date, day_rows in by_date.items():
+            doctor_ids = sorted({row["doctor_id"] for row in day_rows if row.get("doctor_id")})
+            self.db.load_day_occupancy(doctor_ids, date)
+            claimed = set()
+            for row in day_rows:
+                slot = (row.get("doctor_id"), row["appointment_time"])
+                if not row.get("doctor_id") or slot in claimed \
+                        or not self.db.occupancy.is_free(row["doctor_id"], date, row["appointment_time"]):
+                    conflicting.append(row)
+                else:
+                    claimed.add(slot)
+                    insertable.append(row)
+        return insertable, conflicting
+
+    def _insert_or_resolve(self, row: Dict[str, Any]) -> None:
+        try:
+            self.db.insert_appointments([row])
+            self._count("replayed")
+        except SlotTakenError:
+            self._resolve_conflict(row)
+
+    def _resolve_conflict(self, row: Dict[str, Any]) -> None:
+        """Move a booking whose slot was taken to another free doctor of the same specialty"""
+        candidates = self.db.get_available_doctors(row["specialty"], row["appointment_date"], row["appointment_time"])
+        for doctor in candidates:
+            try:
+                self.db.insert_appointments([{**row, "doctor_id": doctor["id"]}])
+            except SlotTakenError:
+                continue
+            self._count("reassigned")
+            print(f"   🔁 Replayed {row['confirmation_number']} with {doctor['id']} (was {row.get('doctor_id')})")
+            return
+
+        self._keep_conflict(row, "slot taken and no doctor free")
+
+    def _keep_conflict(self, row: Dict[str, Any], reason: str) -> None:
+        self.conflicts.append(row)
+        self._count("conflicts")
+        print(f"   ⚠️  Could not replay {row['confirmation_number']}: {reason}")
+
+    # ============ Background Thread ============
+
+    def _backoff(self, failures: int) -> float:
+        # Full jitter keeps many workers from retrying in lockstep
+        return random.uniform(0, min(self.max_backoff, self.poll_interval * 2 ** failures))
+
+    def _run(self) -> None:
+        failures = 0
+        delay = 0.0
+        while not self._stop.wait(delay):
+            try:
+                processed = self.run_once()
+                if processed:
+                    print(f"   ✅ Replayed {processed} fallback bookings")
+                failures = 0
+                delay = self.poll_interval
+            except Exception as e:
+                failures += 1
+                self._count("failures")
+                delay = self._backoff(failures)
+                print(f"   ⚠️  Fallback replay failed ({e}); retrying in {delay:.1f}s")
+
+    def start(self) -> None:
+        """Start replaying in a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="fallback-replay", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
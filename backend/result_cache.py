@@ -0,0 +1,295 @@
+"""
+Tool result cache for Healthcare MCP Server
+Serves repeated read-only tool calls from memory, keyed by tool name and
+canonicalized arguments, and drops entries when bookings change a doctor-day
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from backend.cache import TTLCache
+from backend.database import get_db
+from backend.search import normalize
+
+Tag = Tuple[Hashable, ...]
+
+
+def _text(value: Any) -> Any:
+    return " ".join(value.split()) if isinstance(value, str) else value
+
+
+def _specialty(value: Any) -> Any:
+    # Doctors are stored with lowercase specialties and matched exactly
+    return _text(value).lower() if isinstance(value, str) else value
+
+
+def _doctor_identifier(value: Any) -> Any:
+    # IDs are looked up verbatim; names go through the fuzzy index, which
+    # ignores case, punctuation and a leading "Dr."
+    if not isinstance(value, str) or value.startswith("doc_"):
+        return value
+    return normalize(value)
+
+
+def _confirmation_number(value: Any) -> Any:
+    return value.strip() if isinstance(value, str) else value
+
+
+# tool -> (default TTL seconds, canonicalizer per argument, tags(canonical args))
+TOOL_POLICIES: Dict[str, Tuple[float, Dict[str, Callable[[Any], Any]], Callable[[Dict[str, Any]], Set[Tag]]]] = {
+    "get_doctors": (
+        300.0,
+        {"specialty": _specialty},
+        lambda args: {("doctors",)},
+    ),
+    "get_doctor_schedule": (
+        300.0,
+        {"doctor_id": _doctor_identifier},
+        lambda args: {("schedules",)},
+    ),
+    "get_available_slots": (
+        15.0,
+        {"specialty": _specialty, "date": _text, "doctor_id": _text},
+        lambda args: {("slots", args.get("date"), args.get("specialty")), ("slots", args.get("date")), ("slots",)},
+    ),
+    "get_appointment": (
+        60.0,
+        {"confirmation_number": _confirmation_number},
+        lambda args: {("appointment", args.get("confirmation_number"))},
+    ),
+}
+
+def canonical_key(name: str, args: Dict[str, Any]) -> Optional[Tuple[Hashable, ...]]:
+    """Tool name plus canonicalized arguments, or None for tools that are not read-only lookups"""
+    policy = TOOL_POLICIES.get(name)
+    if policy is None:
+        return None
+    canonicalizers = policy[1]
+    canonical = tuple(sorted(
+        (field, canonicalizers[field](value))
+        for field, value in args.items()
+        if field in canonicalizers and value not in (None, "")
+    ))
+    return (name,) + canonical
+
+
+# Writes that make cached results stale beyond what the occupancy listener sees
+WRITE_TAGS: Dict[str, Callable[[Dict[str, Any]], Set[Tag]]] = {
+    "cancel_appointment": lambda args: {("appointment", _confirmation_number(args.get("confirmation_number")))},
+}
+
+# Database table writes (seeding, availability overrides) -> tags they make stale
+TABLE_TAGS: Dict[str, Callable[[Optional[str]], Set[Tag]]] = {
+    # Schedules and slot listings show doctor names and specialties
+    "doctors": lambda date: {("doctors",), ("schedules",), ("slots",)},
+    "doctor_schedules": lambda date: {("schedules",), ("slots",)},
+    # An override changes one date's slots; schedules are weekly and unaffected
+    "doctor_availability": lambda date: {("slots", str(date))} if date else {("slots",)},
+}
+
+
+class ToolResultCache:
+    """
+    TTL cache in front of call_tool for read-only tools.
+
+    Each tool has its own TTL (MCP_CACHE_TTL_<TOOL> overrides the default;
+    0 disables caching for that tool). Entries carry tags so writes can drop
+    exactly what they affect: a booking or cancellation on a doctor-day
+    drops cached slot listings for that date and the doctor's specialty,
+    a cancellation drops that appointment, and seeding or an availability
+    override drops the doctor, schedule and slot results it changes.
+    Errors are never cached.
+    
+    A call takes a version() before it runs and hands it to put(); if one
+    of its tags was invalidated in between, the result may predate the
+    write and is not stored.
+    """
+
+    def __init__(self, maxsize: int = 2048):
+        self.ttls = {
+            name: float(os.getenv(f"MCP_CACHE_TTL_{name.upper()}", str(ttl)))
+            for name, (ttl, _, _) in TOOL_POLICIES.items()
+        }
+        self._entries = TTLCache(ttl_seconds=max(self.ttls.values()), maxsize=maxsize)
+        self._tags: Dict[Tag, Set[Hashable]] = {}
+        self._puts = 0
+        # Invalidation counter, and the count at which each tag was last invalidated
+        self._invalidations = 0
+        self._invalidated_at: Dict[Tag, int] = {}
+        # Versions below this are treated as stale (history forgotten or cache cleared)
+        self._oldest_version = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            name: {"hits": 0, "misses": 0, "coalesced": 0, "miss_seconds": 0.0, "saved_seconds": 0.0}
+            for name in TOOL_POLICIES
+        }
+
+    def key(self, name: str, args: Dict[str, Any]) -> Optional[Tuple[Hashable, ...]]:
+        """Canonical cache key for a call, or None if the tool is not cached"""
+        if self.ttls.get(name, 0) <= 0:
+            return None
+        return canonical_key(name, args)
+
+    def get(self, name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Cached result for the call, or None on a miss.
+        
+        Only hits are counted here: a miss is counted by put() once the call
+        has run, or by record_coalesced() if it joined one already running.
+        """
+        key = self.key(name, args)
+        if key is None:
+            return None
+        result = self._entries.get(key)
+        if result is not None:
+            with self._lock:
+                self._stats[name]["hits"] += 1
+                self._credit_saved(self._stats[name])
+        return result
+
+    def record_coalesced(self, name: str, args: Dict[str, Any]) -> None:
+        """Count a call that missed but shared another call's execution"""
+        if self.key(name, args) is None:
+            return
+        with self._lock:
+            self._stats[name]["coalesced"] += 1
+            self._credit_saved(self._stats[name])
+
+    @staticmethod
+    def _credit_saved(stats: Dict[str, float]) -> None:
+        # Credit the average cost of an execution as time saved
+        if stats["misses"]:
+            stats["saved_seconds"] += stats["miss_seconds"] / stats["misses"]
+
+    def version(self) -> int:
+        """Invalidation version to take before computing a result for put()"""
+        with self._lock:
+            return self._invalidations
+
+    def put(self, name: str, args: Dict[str, Any], result: Dict[str, Any], elapsed: float, version: int) -> None:
+        """
+        Store a successful result and record how long it took to compute.
+        
+        version is what version() returned before the result was computed;
+        the result is dropped if any of its tags was invalidated since.
+        """
+        key = self.key(name, args)
+        if key is None:
+            return
+        with self._lock:
+            self._stats[name]["misses"] += 1
+            self._stats[name]["miss_seconds"] += elapsed
+        if result.get("error"):
+            return
+
+        tags = TOOL_POLICIES[name][2](dict(key[1:]))
+        with self._lock:
+            # Checked and stored under the lock so an invalidation cannot land in between
+            if version < self._oldest_version or any(
+                self._invalidated_at.get(tag, 0) > version for tag in tags
+            ):
+                return
+            self._entries.set(key, result, ttl_seconds=self.ttls[name])
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._puts += 1
+            if self._puts % self._entries.maxsize == 0:
+                self._prune_tags()
+
+    def _prune_tags(self) -> None:
+        # Expired and evicted keys linger in the tag index until swept here
+        for tag in list(self._tags):
+            live = {key for key in self._tags[tag] if self._entries.peek(key) is not None}
+            if live:
+                self._tags[tag] = live
+            else:
+                del self._tags[tag]
+
+    def invalidate_tag(self, tag: Tag) -> int:
+        """Drop every entry carrying tag"""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            self._invalidations += 1
+            self._invalidated_at[tag] = self._invalidations
+            if len(self._invalidated_at) > self._entries.maxsize:
+                # Forget per-tag history; calls that started before now skip put()
+                self._invalidated_at.clear()
+                self._oldest_version = self._invalidations
+        for key in keys:
+            self._entries.invalidate(key)
+        return len(keys)
+
+    def invalidate_for(self, name: str, args: Dict[str, Any]) -> None:
+        """Drop entries made stale by a write tool call"""
+        for tag in WRITE_TAGS.get(name, lambda args: set())(args):
+            self.invalidate_tag(tag)
+
+    def on_table_change(self, table: str, date: Optional[str] = None) -> None:
+        """Database change listener: doctors, schedules or an availability override were written"""
+        for tag in TABLE_TAGS.get(table, lambda date: set())(date):
+            self.invalidate_tag(tag)
+
+    def attach(self, db: Any) -> None:
+        """
+        Invalidate on db's bookings, cancellations and table writes.
+        
+        Subscribes to slot changes only: loading a day's occupancy from the
+        database is not a change, and treating it as one would make every
+        cold lookup invalidate (and so refuse to cache) its own result.
+        """
+        db.occupancy.add_slot_listener(self.on_slot_change)
+        db.add_change_listener(self.on_table_change)
+
+    def on_slot_change(self, doctor_id: str, date: str, time: str, booked: bool) -> None:
+        """Occupancy slot listener: a booking or cancellation changed doctor_id's day"""
+        doctor = get_db().doctor_cache.peek(("doctor", doctor_id))
+        if doctor and doctor.get("specialty"):
+            self.invalidate_tag(("slots", str(date), _specialty(doctor["specialty"])))
+        else:
+            self.invalidate_tag(("slots", str(date)))
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._tags.clear()
+            self._invalidations += 1
+            self._invalidated_at.clear()
+            self._oldest_version = self._invalidations
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Per-tool hit rate and latency saved, for /mcp/metrics.
+        
+        misses counts executions; coalesced counts calls that missed the
+        cache but joined an identical execution instead of running their own.
+        """
+        with self._lock:
+            tools = {}
+            for name, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+                tools[name] = {
+                    "ttl_seconds": self.ttls[name],
+                    "hits": int(stats["hits"]),
+                    "misses": int(stats["misses"]),
+                    "coalesced": int(stats["coalesced"]),
+                    "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+                    "avg_miss_ms": round(stats["miss_seconds"] / stats["misses"] * 1000, 1) if stats["misses"] else 0.0,
+                    "saved_ms": round(stats["saved_seconds"] * 1000, 1),
+                }
+        return {"entries": len(self._entries), "evictions": self._entries.evictions, "tools": tools}
+
+
+_result_cache: Optional[ToolResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ToolResultCache:
+    """Get the process-wide result cache, subscribed to booking changes"""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ToolResultCache(maxsize=int(os.getenv("MCP_CACHE_MAX_ENTRIES", "2048")))
+            _result_cache.attach(get_db())
+        return _result_cache
@@ -0,0 +1,119 @@
+"""
+Doctor search index for Healthcare MCP Server
+In-memory trigram + prefix index over doctor names and specialties,
+built from the cached roster so fuzzy lookups need no network call
+"""
+
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_TITLE_PREFIX = re.compile(r"^(dr\.?|doctor)\s+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop a leading 'Dr.' title and collapse punctuation to single spaces"""
+    text = _TITLE_PREFIX.sub("", text.lower().strip())
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Padded character trigrams of every word ('  pa', ' pat', 'pat', ...)"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class _FieldIndex:
+    """Trigram and word-prefix postings for one text field"""
+
+    def __init__(self):
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        self.prefixes: Dict[str, Set[str]] = defaultdict(set)
+        self.gram_counts: Dict[str, int] = {}
+        self.words: Dict[str, List[str]] = {}
+
+    def add(self, doc_id: str, text: str) -> None:
+        normalized = normalize(text)
+        grams = trigrams(normalized)
+        self.gram_counts[doc_id] = len(grams)
+        self.words[doc_id] = normalized.split()
+        for gram in grams:
+            self.grams[gram].add(doc_id)
+        for word in self.words[doc_id]:
+            for end in range(1, len(word) + 1):
+                self.prefixes[word[:end]].add(doc_id)
+
+    def score(self, query: str) -> Dict[str, float]:
+        """Similarity in [0, 1] for every document sharing a trigram or word prefix with query"""
+        query_grams = trigrams(query)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for doc_id in self.grams.get(gram, ()):
+                shared[doc_id] += 1
+
+        scores = {}
+        for doc_id, overlap in shared.items():
+            # Jaccard similarity of the trigram sets
+            scores[doc_id] = overlap / (len(query_grams) + self.gram_counts[doc_id] - overlap)
+
+        # Every query word starts a word of the field ("pri pat" -> "priya patel")
+        query_words = query.split()
+        if query_words:
+            matched = set.intersection(*(self.prefixes.get(word, set()) for word in query_words))
+            for doc_id in matched:
+                exact = self.words[doc_id] == query_words
+                scores[doc_id] = max(scores.get(doc_id, 0.0), 1.0 if exact else 0.9)
+
+        return scores
+
+
+class DoctorSearchIndex:
+    """Ranked fuzzy lookup of doctors by ID, name or specialty"""
+
+    def __init__(self, doctors: Iterable[Dict[str, Any]], min_score: float = 0.3):
+        self.min_score = min_score
+        self._doctors: Dict[str, Dict[str, Any]] = {}
+        self._names = _FieldIndex()
+        self._specialties = _FieldIndex()
+
+        for doctor in doctors:
+            self._doctors[doctor["id"]] = doctor
+            self._names.add(doctor["id"], doctor.get("name") or "")
+            self._specialties.add(doctor["id"], doctor.get("specialty") or "")
+
+    def __len__(self) -> int:
+        return len(self._doctors)
+
+    def _rank(self, scores: Dict[str, float], limit: int) -> List[Tuple[float, Dict[str, Any]]]:
+        ranked = sorted(
+            ((score, self._doctors[doc_id]) for doc_id, score in scores.items() if score >= self.min_score),
+            key=lambda item: (-item[0], item[1].get("name") or ""),
+        )
+        return ranked[:limit]
+
+    def search(self, term: str, limit: int = 10) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Find doctors matching term, best first.
+
+        Tries an exact ID, then names, and falls back to specialties when no
+        name is similar enough.
+
+        Returns:
+            List of (score, doctor) tuples
+        """
+        term = term.strip()
+        if term in self._doctors:
+            return [(1.0, self._doctors[term])]
+
+        query = normalize(term)
+        if not query:
+            return []
+
+        matches = self._rank(self._names.score(query), limit)
+        if not matches:
+            matches = self._rank(self._specialties.score(query), limit)
+        return matches
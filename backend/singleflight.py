@@ -0,0 +1,103 @@
+"""
+Request coalescing for Healthcare MCP Server
+Concurrent identical calls share one in-flight execution and all receive its result
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """One in-flight execution that worker threads can wait on"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key.
+
+    The first caller (the leader) runs the work; callers arriving while it
+    is in flight wait for the leader's result or exception instead of
+    repeating it. Nothing is remembered once the call completes - caching
+    results is the result cache's job.
+
+    `do` serves worker threads and `do_async` the event loop. On the async
+    path the work runs in its own task, so a leader whose request is
+    cancelled (client disconnect) does not cancel the followers.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], "asyncio.Future"] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn, or wait for the identical call already running in another thread"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), or the identical call already in flight on this event loop"""
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = loop.create_task(fn())
+                task.add_done_callback(lambda done: self._finish(task_key, done))
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, task_key: Tuple[int, Hashable], task: "asyncio.Future") -> None:
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every waiter was cancelled
+
+    def stats(self) -> Dict[str, Any]:
+        """Executions vs. calls that joined one already in flight, for metrics"""
+        with self._lock:
+            calls = self.executions + self.coalesced
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+                "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+            }
@@ -3,32 +3,59 @@ Booking management tools for Healthcare MCP Server
 Uses Supabase for persistent storage of appointments
 """
 
-import random
+import asyncio
+import threading
+import uuid
 from datetime import datetime
 import json
 import os
-from typing import Optional, Tuple
-from backend.database import get_db
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from backend import deadline
+from backend.assignment import AssignmentStrategy, get_assignment_strategy
+from backend.database import get_db, get_async_db, RpcUnavailableError, SlotTakenError
+from backend.wal import WriteAheadLog
 
 BOOKINGS_FILE = "bookings.json"  # Kept for backward compatibility/fallback
+BOOKINGS_WAL_DIR = os.getenv("BOOKINGS_WAL_DIR", "bookings_wal")
+
+# The request ran out of time after it may have reached the database, so the
+# write may still have committed: re-raised, never retried or sent to the
+# fallback log. Connect and pool timeouts never sent the request - they are an
+# outage like any other and fall back to the log.
+TIMEOUT_ERRORS = (deadline.DeadlineExceeded, httpx.ReadTimeout, httpx.WriteTimeout)
+
+_wal: Optional[WriteAheadLog] = None
+_wal_lock = threading.Lock()
+
+
+def get_booking_wal() -> WriteAheadLog:
+    """Get the write-ahead log that holds bookings made while Supabase was unreachable"""
+    global _wal
+    with _wal_lock:
+        if _wal is None:
+            _wal = WriteAheadLog(
+                BOOKINGS_WAL_DIR,
+                segment_max_bytes=int(os.getenv("BOOKINGS_WAL_SEGMENT_BYTES", str(16 * 1024 * 1024))),
+                commit_delay=float(os.getenv("BOOKINGS_WAL_COMMIT_DELAY_MS", "2")) / 1000,
+            )
+        return _wal
 
 
 def load_bookings():
-    """Load existing bookings from JSON file (legacy)"""
+    """Load fallback bookings: the legacy JSON file followed by the write-ahead log"""
+    bookings = []
     if os.path.exists(BOOKINGS_FILE):
         with open(BOOKINGS_FILE, "r") as f:
-            return json.load(f)
-    return []
+            bookings = json.load(f)
+    if os.path.isdir(BOOKINGS_WAL_DIR):
+        bookings.extend(get_booking_wal().records())
+    return bookings
 
 
 def save_booking(booking_data):
-    """Save booking to JSON file (legacy)"""
-    bookings = load_bookings()
-    bookings.append(booking_data)
-
-    with open(BOOKINGS_FILE, "w") as f:
-        json.dump(bookings, f, indent=2)
-
+    """Durably append a booking to the write-ahead log (constant time, safe across workers)"""
+    get_booking_wal().append(booking_data)
     return booking_data
 
 
@@ -144,7 +171,245 @@ def book(
 
     Returns:
         Confirmation details or error if validation fails or conflict exists
+
+    Raises:
+        DeadlineExceeded, httpx.ReadTimeout, httpx.WriteTimeout: If the database did
+            not answer in time; the outcome is unknown, so nothing is written to the fallback log
     """
+    error, booking_data = _prepare_booking(user_id, date, time, specialty, reason, doctor_id)
+    if error:
+        return error
+
+    db = get_db()
+
+    # Rank free doctors locally (calendar + occupancy, no COUNT queries) so the
+    # configured assignment strategy decides who gets an auto-assigned booking
+    ranked = None
+    if not doctor_id:
+        # Resolved outside the try: a bad ASSIGNMENT_STRATEGY is an error, not a skipped ranking
+        strategy = get_assignment_strategy()
+        try:
+            ranked = _rank_doctors(_available_doctors(db, booking_data), booking_data, db.occupancy, strategy)
+        except Exception as e:
+            _recover(e, "Could not rank doctors locally")
+
+    # One atomic round trip when the book_slot() SQL function is deployed
+    try:
+        outcome = db.book_slot(booking_data, _candidate_ids(ranked))
+    except RpcUnavailableError:
+        outcome = None
+    except Exception as e:
+        _recover(e, "book_slot failed, retrying step by step")
+        outcome = None
+
+    if outcome is None:
+        return _book_step_by_step(db, booking_data, ranked)
+    return _book_slot_response(outcome, booking_data)
+
+
+def _book_step_by_step(db, booking_data: Dict[str, Any], ranked: Optional[List[dict]] = None) -> dict:
+    """Validate, assign and insert with separate queries (schemas without book_slot)"""
+    doctor_id = booking_data["doctor_id"]
+
+    # If doctor_id provided, verify they exist and specialize in this area;
+    # otherwise auto-assign an available doctor, in assignment-strategy order
+    if doctor_id:
+        error, candidates = _requested_doctor(db.get_doctor_by_id(doctor_id), booking_data)
+    else:
+        if ranked is None:
+            ranked = _rank_doctors(_available_doctors(db, booking_data), booking_data, db.occupancy)
+        error, candidates = _auto_assign_candidates(ranked, booking_data)
+    if error:
+        return error
+
+    # The active-slot unique index rejects taken slots, so no pre-insert conflict
+    # query is needed; on the auto-assign path just move on to the next doctor
+    for assigned_doctor in candidates:
+        booking_data["doctor_id"] = assigned_doctor["id"]
+        try:
+            db.create_appointment(booking_data)
+            print(f"   ✅ Appointment saved to database")
+        except SlotTakenError:
+            continue
+        except Exception as e:
+            _recover(e, "Database save failed, falling back to JSON")
+            save_booking(_fallback_copy(booking_data))
+
+        return _booking_confirmation(booking_data, assigned_doctor)
+
+    return _slot_taken_error(candidates, booking_data, doctor_id)
+
+
+async def book_async(
+    user_id: str,
+    date: str,
+    time: str,
+    specialty: Optional[str] = None,
+    reason: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+) -> dict:
+    """Async variant of book backed by AsyncDatabase"""
+    error, booking_data = _prepare_booking(user_id, date, time, specialty, reason, doctor_id)
+    if error:
+        return error
+
+    adb = get_async_db()
+
+    ranked = None
+    if not doctor_id:
+        strategy = get_assignment_strategy()
+        try:
+            ranked = _rank_doctors(await _available_doctors(adb, booking_data), booking_data, adb.occupancy, strategy)
+        except Exception as e:
+            _recover(e, "Could not rank doctors locally")
+
+    try:
+        outcome = await adb.book_slot(booking_data, _candidate_ids(ranked))
+    except RpcUnavailableError:
+        outcome = None
+    except Exception as e:
+        _recover(e, "book_slot failed, retrying step by step")
+        outcome = None
+
+    if outcome is None:
+        return await _book_step_by_step_async(adb, booking_data, ranked)
+    return _book_slot_response(outcome, booking_data)
+
+
+async def _book_step_by_step_async(adb, booking_data: Dict[str, Any], ranked: Optional[List[dict]] = None) -> dict:
+    """Async variant of _book_step_by_step"""
+    doctor_id = booking_data["doctor_id"]
+
+    if doctor_id:
+        error, candidates = _requested_doctor(await adb.get_doctor_by_id(doctor_id), booking_data)
+    else:
+        if ranked is None:
+            ranked = _rank_doctors(await _available_doctors(adb, booking_data), booking_data, adb.occupancy)
+        error, candidates = _auto_assign_candidates(ranked, booking_data)
+    if error:
+        return error
+
+    for assigned_doctor in candidates:
+        booking_data["doctor_id"] = assigned_doctor["id"]
+        try:
+            await adb.create_appointment(booking_data)
+            print(f"   ✅ Appointment saved to database")
+        except SlotTakenError:
+            continue
+        except Exception as e:
+            _recover(e, "Database save failed, falling back to JSON")
+            await asyncio.to_thread(save_booking, _fallback_copy(booking_data))
+
+        return _booking_confirmation(booking_data, assigned_doctor)
+
+    return _slot_taken_error(candidates, booking_data, doctor_id)
+
+
+# ============ Booking Steps Shared by book and book_async ============
+
+def _prepare_booking(
+    user_id: str,
+    date: str,
+    time: str,
+    specialty: Optional[str],
+    reason: Optional[str],
+    doctor_id: Optional[str],
+) -> Tuple[Optional[dict], Dict[str, Any]]:
+    """Log and validate a booking request; returns (error_response, booking_data)"""
+    _log_booking_call(user_id, date, time, specialty, reason, doctor_id)
+
+    # Set default specialty
+    if not specialty:
+        specialty = "General Practice"
+
+    request_error = _validate_booking_request(date, time)
+    return request_error, _new_booking_data(user_id, doctor_id, date, time, specialty, reason)
+
+
+def _available_doctors(db, booking_data: Dict[str, Any]):
+    """Free doctors for the booking's slot (a coroutine when db is AsyncDatabase)"""
+    return db.get_available_doctors(
+        booking_data["specialty"], booking_data["appointment_date"], booking_data["appointment_time"]
+    )
+
+
+def _rank_doctors(
+    doctors: List[dict], booking_data: Dict[str, Any], occupancy, strategy: Optional[AssignmentStrategy] = None
+) -> List[dict]:
+    """Order free doctors with the active assignment strategy (ASSIGNMENT_STRATEGY)"""
+    strategy = strategy or get_assignment_strategy()
+    return strategy.order(doctors, booking_data["appointment_date"], occupancy)
+
+
+def _recover(error: Exception, action: str) -> None:
+    """
+    Decide whether a failed database step may fall back.
+
+    Timeouts that may have reached the database are re-raised; anything else
+    is logged and the caller carries on with its fallback.
+    """
+    if isinstance(error, TIMEOUT_ERRORS):
+        raise error
+    print(f"   ⚠️  {action}: {error}")
+
+
+def _candidate_ids(ranked: Optional[List[dict]]) -> Optional[List[str]]:
+    # An empty local shortlist may just be stale - let book_slot() search itself
+    return [doctor["id"] for doctor in ranked] if ranked else None
+
+
+def _requested_doctor(doctor: Optional[dict], booking_data: Dict[str, Any]) -> Tuple[Optional[dict], List[dict]]:
+    """Candidates when the patient chose a doctor; returns (error_response, candidates)"""
+    doctor_error = _check_doctor(doctor, booking_data["doctor_id"], booking_data["specialty"])
+    if doctor_error:
+        return doctor_error, []
+    return None, [doctor]
+
+
+def _auto_assign_candidates(ranked: List[dict], booking_data: Dict[str, Any]) -> Tuple[Optional[dict], List[dict]]:
+    """Candidates when the doctor is auto-assigned; returns (error_response, candidates)"""
+    if not ranked:
+        return _no_doctors_error(
+            booking_data["specialty"], booking_data["appointment_date"], booking_data["appointment_time"]
+        ), []
+    return None, ranked
+
+
+def _fallback_copy(booking_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Stamp a booking for the fallback log"""
+    booking_data["booked_at"] = datetime.now().isoformat()
+    return booking_data
+
+
+def _slot_taken_error(candidates: List[dict], booking_data: Dict[str, Any], doctor_id: Optional[str]) -> dict:
+    """Every candidate's slot was taken by the time we inserted"""
+    date = booking_data["appointment_date"]
+    time = booking_data["appointment_time"]
+    if doctor_id:
+        return _doctor_booked_error(candidates[0], date, time)
+    return _no_doctors_error(booking_data["specialty"], date, time)
+
+
+def _book_slot_response(outcome: Dict[str, Any], booking_data: Dict[str, Any]) -> dict:
+    """Translate a book_slot() result into the book_appointment response"""
+    status = outcome.get("status")
+    doctor = outcome.get("doctor")
+    date = booking_data["appointment_date"]
+    time = booking_data["appointment_time"]
+    specialty = booking_data["specialty"]
+
+    if status == "booked":
+        print(f"   ✅ Appointment saved to database")
+        booking_data["doctor_id"] = doctor["id"]
+        return _booking_confirmation(booking_data, doctor)
+    if status in ("doctor_not_found", "specialty_mismatch"):
+        return _check_doctor(doctor, booking_data["doctor_id"], specialty)
+    if status == "conflict":
+        return _doctor_booked_error(doctor, date, time)
+    return _no_doctors_error(specialty, date, time)
+
+
+def _log_booking_call(user_id, date, time, specialty, reason, doctor_id):
     print(f"\n🔧 TOOL CALLED: book_appointment")
     print(f"   Patient: {user_id}")
     print(f"   Date: {date}")
@@ -153,10 +418,9 @@ def book(
     print(f"   Reason: {reason}")
     print(f"   Preferred Doctor: {doctor_id or 'Auto-assign'}")
 
-    # Set default specialty
-    if not specialty:
-        specialty = "General Practice"
 
+def _validate_booking_request(date: str, time: str) -> Optional[dict]:
+    """Run the date, interval and business-hours checks; return an error response or None"""
     # Validate date format
     date_valid, date_error = validate_date(date)
     if not date_valid:
@@ -187,57 +451,61 @@ def book(
             "suggestion": "Clinic hours: Monday–Friday, 08:00 AM – 05:45 PM",
         }
 
-    db = get_db()
+    return None
 
-    # If doctor_id provided, verify they exist and specialize in this area
-    if doctor_id:
-        doctor = db.get_doctor_by_id(doctor_id)
-        if not doctor:
-            return {
-                "error": True,
-                "message": f"Doctor not found: {doctor_id}",
-                "suggestion": "Use get_doctors to find valid doctor IDs",
-            }
-
-        # Check if doctor specializes in requested specialty
-        if doctor["specialty"].lower() != specialty.lower():
-            return {
-                "error": True,
-                "message": f"Dr. {doctor['name']} specializes in {doctor['specialty']}, not {specialty}",
-                "suggestion": f"Choose a {specialty} specialist or change specialty to {doctor['specialty']}",
-            }
-
-        # Check if doctor is available at this time
-        conflict = db.check_doctor_conflict(doctor_id, date, time)
-        if conflict:
-            return {
-                "error": True,
-                "message": f"Dr. {doctor['name']} is already booked at {time} on {date}",
-                "suggestion": "Use get_available_slots to find open times with this doctor",
-            }
-
-        assigned_doctor = doctor
-    else:
-        # Auto-assign an available doctor
-        available_doctors = db.get_available_doctors(specialty, date, time)
 
-        if not available_doctors:
-            return {
-                "error": True,
-                "message": f"No {specialty} doctors available at {time} on {date}",
-                "suggestion": "Use get_available_slots to find open appointment times",
-            }
+def _check_doctor(doctor: Optional[dict], doctor_id: str, specialty: str) -> Optional[dict]:
+    """Return an error response if the doctor is unknown or in a different specialty"""
+    if not doctor:
+        return {
+            "error": True,
+            "message": f"Doctor not found: {doctor_id}",
+            "suggestion": "Use get_doctors to find valid doctor IDs",
+        }
 
-        # Pick first available doctor (could implement load balancing here)
-        assigned_doctor = available_doctors[0]
-        doctor_id = assigned_doctor["id"]
+    # Check if doctor specializes in requested specialty
+    if doctor["specialty"].lower() != specialty.lower():
+        return {
+            "error": True,
+            "message": f"Dr. {doctor['name']} specializes in {doctor['specialty']}, not {specialty}",
+            "suggestion": f"Choose a {specialty} specialist or change specialty to {doctor['specialty']}",
+        }
 
-    # Generate confirmation number
-    confirmation_number = f"APT-{random.randint(10000, 99999)}"
+    return None
 
-    # Create booking data
-    booking_data = {
-        "confirmation_number": confirmation_number,
+
+def _doctor_booked_error(doctor: dict, date: str, time: str) -> dict:
+    return {
+        "error": True,
+        "message": f"Dr. {doctor['name']} is already booked at {time} on {date}",
+        "suggestion": "Use get_available_slots to find open times with this doctor",
+    }
+
+
+def _no_doctors_error(specialty: str, date: str, time: str) -> dict:
+    return {
+        "error": True,
+        "message": f"No {specialty} doctors available at {time} on {date}",
+        "suggestion": "Use get_available_slots to find open appointment times",
+    }
+
+
+def new_confirmation_number() -> str:
+    """
+    Random confirmation number such as 'APT-3F9A0C71D2E4'.
+
+    48 random bits, so numbers made while Supabase is unreachable (and only
+    checked for uniqueness on replay) practically never collide.
+    """
+    return f"APT-{uuid.uuid4().hex[:12].upper()}"
+
+
+def _new_booking_data(
+    user_id: str, doctor_id: str, date: str, time: str, specialty: str, reason: Optional[str]
+) -> Dict[str, Any]:
+    """Build the appointment row with a fresh confirmation number"""
+    return {
+        "confirmation_number": new_confirmation_number(),
         "patient_id": user_id,
         "doctor_id": doctor_id,
         "appointment_date": date,
@@ -247,14 +515,10 @@ def book(
         "status": "confirmed",
     }
 
-    # Save to Supabase
-    try:
-        db.create_appointment(booking_data)
-        print(f"   ✅ Appointment saved to database")
-    except Exception as e:
-        print(f"   ⚠️  Database save failed, falling back to JSON: {e}")
-        booking_data["booked_at"] = datetime.now().isoformat()
-        save_booking(booking_data)
+
+def _booking_confirmation(booking_data: Dict[str, Any], assigned_doctor: dict) -> dict:
+    """Shape the book_appointment success response"""
+    confirmation_number = booking_data["confirmation_number"]
 
     print(f"   ✅ Appointment booked successfully")
     print(f"   Confirmation: {confirmation_number}")
@@ -264,13 +528,13 @@ def book(
         "message": f"Appointment successfully booked with Dr. {assigned_doctor['name']}!",
         "confirmation_number": confirmation_number,
         "details": {
-            "Patient ID": user_id,
+            "Patient ID": booking_data["patient_id"],
             "Doctor": assigned_doctor["name"],
-            "Doctor ID": doctor_id,
-            "Date": date,
-            "Time": time,
-            "Specialty": specialty,
-            "Reason": reason or "General checkup",
+            "Doctor ID": booking_data["doctor_id"],
+            "Date": booking_data["appointment_date"],
+            "Time": booking_data["appointment_time"],
+            "Specialty": booking_data["specialty"],
+            "Reason": booking_data["reason"] or "General checkup",
             "Status": "Confirmed",
         },
         "instructions": [
@@ -297,46 +561,53 @@ def get_appointment(confirmation_number: str) -> dict:
     db = get_db()
 
     try:
-        response = (
-            db.client.table("appointments")
-            .select("*, doctors(*)")
-            .eq("confirmation_number", confirmation_number)
-            .single()
-            .execute()
-        )
-
-        if not response.data:
-            return {
-                "error": True,
-                "message": f"Appointment not found: {confirmation_number}",
-                "suggestion": "Check your confirmation number and try again",
-            }
+        return _format_appointment(db.get_appointment(confirmation_number), confirmation_number)
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        return {"error": True, "message": f"Failed to retrieve appointment: {str(e)}"}
 
-        appt = response.data
 
-        return {
-            "message": "Appointment found",
-            "appointment": {
-                "confirmation_number": appt["confirmation_number"],
-                "status": appt["status"],
-                "patient_id": appt["patient_id"],
-                "date": appt["appointment_date"],
-                "time": appt["appointment_time"],
-                "specialty": appt["specialty"],
-                "reason": appt.get("reason", "Not specified"),
-                "doctor": {
-                    "name": appt.get("doctors", {}).get("name", "Unknown"),
-                    "specialty": appt.get("doctors", {}).get("specialty", "Unknown"),
-                },
-                "booked_at": appt.get("booked_at"),
-            },
-        }
+async def get_appointment_async(confirmation_number: str) -> dict:
+    """Async variant of get_appointment backed by AsyncDatabase"""
+    print(f"\n🔧 TOOL CALLED: get_appointment (async)")
+    print(f"   Confirmation: {confirmation_number}")
 
+    try:
+        appt = await get_async_db().get_appointment(confirmation_number)
+        return _format_appointment(appt, confirmation_number)
     except Exception as e:
         print(f"   ❌ Error: {e}")
         return {"error": True, "message": f"Failed to retrieve appointment: {str(e)}"}
 
 
+def _format_appointment(appt: Optional[dict], confirmation_number: str) -> dict:
+    """Shape an appointment row (with embedded doctor) into the get_appointment response"""
+    if not appt:
+        return {
+            "error": True,
+            "message": f"Appointment not found: {confirmation_number}",
+            "suggestion": "Check your confirmation number and try again",
+        }
+
+    return {
+        "message": "Appointment found",
+        "appointment": {
+            "confirmation_number": appt["confirmation_number"],
+            "status": appt["status"],
+            "patient_id": appt["patient_id"],
+            "date": appt["appointment_date"],
+            "time": appt["appointment_time"],
+            "specialty": appt["specialty"],
+            "reason": appt.get("reason", "Not specified"),
+            "doctor": {
+                "name": appt.get("doctors", {}).get("name", "Unknown"),
+                "specialty": appt.get("doctors", {}).get("specialty", "Unknown"),
+            },
+            "booked_at": appt.get("booked_at"),
+        },
+    }
+
+
 def cancel_appointment(confirmation_number: str, reason: Optional[str] = None) -> dict:
     """
     Cancel an existing appointment
@@ -354,34 +625,56 @@ def cancel_appointment(confirmation_number: str, reason: Optional[str] = None) -
     db = get_db()
 
     try:
-        # First get the appointment
-        response = (
-            db.client.table("appointments")
-            .select("*")
-            .eq("confirmation_number", confirmation_number)
-            .single()
-            .execute()
+        # One conditional update; also frees the slot and drops the cached lookup
+        outcome, _ = db.cancel_appointment(confirmation_number, reason or "Cancelled by patient")
+        return _cancel_response(outcome, confirmation_number)
+
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        return {"error": True, "message": f"Failed to cancel appointment: {str(e)}"}
+
+
+async def cancel_appointment_async(confirmation_number: str, reason: Optional[str] = None) -> dict:
+    """Async variant of cancel_appointment backed by AsyncDatabase"""
+    print(f"\n🔧 TOOL CALLED: cancel_appointment (async)")
+    print(f"   Confirmation: {confirmation_number}")
+
+    try:
+        outcome, _ = await get_async_db().cancel_appointment(
+            confirmation_number, reason or "Cancelled by patient"
         )
+        return _cancel_response(outcome, confirmation_number)
 
-        if not response.data:
-            return {
-                "error": True,
-                "message": f"Appointment not found: {confirmation_number}",
-            }
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        return {"error": True, "message": f"Failed to cancel appointment: {str(e)}"}
 
-        # Update status to cancelled
-        db.client.table("appointments").update(
-            {"status": "cancelled", "notes": reason or "Cancelled by patient"}
-        ).eq("confirmation_number", confirmation_number).execute()
 
-        print(f"   ✅ Appointment cancelled")
+def _cancel_response(outcome: str, confirmation_number: str) -> dict:
+    """Shape the cancel_appointment response from Database.cancel_appointment's outcome"""
+    if outcome == "not_found":
+        return {
+            "error": True,
+            "message": f"Appointment not found: {confirmation_number}",
+        }
 
+    if outcome == "already_cancelled":
         return {
-            "message": "Appointment successfully cancelled",
-            "confirmation_number": confirmation_number,
-            "refund_policy": "Refund will be processed within 5-7 business days",
+            "error": True,
+            "message": f"Appointment {confirmation_number} is already cancelled",
         }
 
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
-        return {"error": True, "message": f"Failed to cancel appointment: {str(e)}"}
\ No newline at end of file
+    if outcome == "not_cancellable":
+        return {
+            "error": True,
+            "message": f"Appointment {confirmation_number} could not be cancelled",
+            "suggestion": "Please try again, or contact the clinic to cancel this appointment",
+        }
+
+    print(f"   ✅ Appointment cancelled")
+
+    return {
+        "message": "Appointment successfully cancelled",
+        "confirmation_number": confirmation_number,
+        "refund_policy": "Refund will be processed within 5-7 business days",
+    }
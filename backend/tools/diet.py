@@ -1,60 +1,50 @@
-
 import os
 from mistralai import Mistral
+from backend import deadline
 
-def generate(preferences, calories=None, allergies=None):
-    """
-    Generate a personalized diet plan based on preferences.
-    
-    Args:
-        preferences: Dietary preference (vegetarian, vegan, keto, etc.)
-        calories: Target daily calorie intake (optional)
-        allergies: List of food allergies or restrictions (optional)
-    """
-    print(f"\n🔧 TOOL CALLED: generate_diet")
-    print(f"   Preferences: {preferences}")
-    print(f"   Calories: {calories or 'Not specified'}")
-    print(f"   Allergies: {allergies or 'None'}")
-    
-    if allergies is None:
-        allergies = []
-    
+# Upper bound for one Mistral call; a shorter request deadline takes precedence
+MISTRAL_TIMEOUT_SECONDS = float(os.getenv("MISTRAL_TIMEOUT_SECONDS", "30"))
+
+def _api_key():
+    """Configured Mistral API key, or None while .env still has the placeholder"""
     api_key = os.getenv("MISTRAL_API_KEY")
-    
     if not api_key or api_key == "your-mistral-api-key-here":
-        print(f"   ⚠️ Mistral API key not configured, using template response")
-        diet_plan = {
-            "error": False,
-            "message": "🥗 Here's your personalized diet plan",
-            "preference": preferences,
-            "daily_calories": calories or 2000,
-            "allergies": allergies or ["None"],
-            "meals": {
-                "Breakfast": f"Healthy {preferences} breakfast - oatmeal with berries (400 cal)",
-                "Morning Snack": "Greek yogurt with honey (150 cal)",
-                "Lunch": f"Nutritious {preferences} lunch - quinoa bowl with vegetables (500 cal)",
-                "Afternoon Snack": "Fresh fruits and nuts (200 cal)",
-                "Dinner": f"Balanced {preferences} dinner with protein and veggies (600 cal)",
-                "Evening": "Herbal tea (0 cal)"
-            },
-            "tips": [
-                "💧 Stay hydrated - drink 8-10 glasses of water daily",
-                "🥗 Include variety of colorful vegetables",
-                "🍽️ Practice portion control",
-                "🧘 Eat mindfully and avoid distractions",
-                "🏃 Combine with 30 minutes of daily exercise"
-            ],
-            "note": "⚠️ Configure Mistral API key in .env for AI-powered recommendations"
-        }
-        return diet_plan
-    
-    try:
-        client = Mistral(api_key=api_key)
+        return None
+    return api_key
 
-        allergy_str = ', '.join(allergies) if allergies else 'None'
-        calorie_target = calories or 2000
+def _template_plan(preferences, calories, allergies):
+    """Fixed plan returned when Mistral is not configured"""
+    diet_plan = {
+        "error": False,
+        "message": "🥗 Here's your personalized diet plan",
+        "preference": preferences,
+        "daily_calories": calories or 2000,
+        "allergies": allergies or ["None"],
+        "meals": {
+            "Breakfast": f"Healthy {preferences} breakfast - oatmeal with berries (400 cal)",
+            "Morning Snack": "Greek yogurt with honey (150 cal)",
+            "Lunch": f"Nutritious {preferences} lunch - quinoa bowl with vegetables (500 cal)",
+            "Afternoon Snack": "Fresh fruits and nuts (200 cal)",
+            "Dinner": f"Balanced {preferences} dinner with protein and veggies (600 cal)",
+            "Evening": "Herbal tea (0 cal)"
+        },
+        "tips": [
+            "💧 Stay hydrated - drink 8-10 glasses of water daily",
+            "🥗 Include variety of colorful vegetables",
+            "🍽️ Practice portion control",
+            "🧘 Eat mindfully and avoid distractions",
+            "🏃 Combine with 30 minutes of daily exercise"
+        ],
+        "note": "⚠️ Configure Mistral API key in .env for AI-powered recommendations"
+    }
+    return diet_plan
 
-        prompt = f"""Create a one-day diet plan with these exact constraints:
+def _messages(preferences, calories, allergies):
+    """Chat messages asking Mistral for the plan"""
+    allergy_str = ', '.join(allergies) if allergies else 'None'
+    calorie_target = calories or 2000
+
+    prompt = f"""Create a one-day diet plan with these exact constraints:
 - Dietary style: {preferences}
 - Total daily calories: {calorie_target} kcal (±50 kcal tolerance)
 - ALLERGIES/RESTRICTIONS — MUST AVOID: {allergy_str}
@@ -87,40 +77,130 @@ Respond in this exact format — no deviations:
 
 ⚠️ This plan is for informational purposes. Consult a registered dietitian for personalized medical nutrition therapy."""
 
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a registered dietitian. You ONLY output diet plans in the exact format requested. "
+                "You never fabricate calorie counts — use standard nutritional reference values. "
+                f"CRITICAL: The user has these allergies/restrictions: {allergy_str}. "
+                "Before finalizing each meal, verify it contains NONE of these allergens."
+            )
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def _plan_result(diet_content, preferences, calories, allergies):
+    return {
+        "error": False,
+        "message": "🥗 Your AI-Powered Personalized Diet Plan (Mistral AI)",
+        "plan": diet_content,
+        "preference": preferences,
+        "daily_calories": calories or 2000,
+        "allergies": allergies or ["None"]
+    }
+
+def _error_result(e):
+    print(f"   ❌ Error: {str(e)}")
+    return {
+        "error": True,
+        "message": f"Failed to generate diet plan: {str(e)}",
+        "fallback": "Please check your Mistral API key configuration in .env file"
+    }
+
+def generate(preferences, calories=None, allergies=None):
+    """
+    Generate a personalized diet plan based on preferences.
+    
+    Args:
+        preferences: Dietary preference (vegetarian, vegan, keto, etc.)
+        calories: Target daily calorie intake (optional)
+        allergies: List of food allergies or restrictions (optional)
+    """
+    print(f"\n🔧 TOOL CALLED: generate_diet")
+    print(f"   Preferences: {preferences}")
+    print(f"   Calories: {calories or 'Not specified'}")
+    print(f"   Allergies: {allergies or 'None'}")
+    
+    if allergies is None:
+        allergies = []
+    
+    api_key = _api_key()
+    
+    if not api_key:
+        print(f"   ⚠️ Mistral API key not configured, using template response")
+        return _template_plan(preferences, calories, allergies)
+    
+    try:
+        client = Mistral(api_key=api_key)
+
         response = client.chat.complete(
             model=os.getenv("MISTRAL_MODEL", "mistral-small-latest"),
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a registered dietitian. You ONLY output diet plans in the exact format requested. "
-                        "You never fabricate calorie counts — use standard nutritional reference values. "
-                        f"CRITICAL: The user has these allergies/restrictions: {allergy_str}. "
-                        "Before finalizing each meal, verify it contains NONE of these allergens."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
+            messages=_messages(preferences, calories, allergies),
             temperature=0.3,
-            max_tokens=900
+            max_tokens=900,
+            timeout_ms=deadline.timeout_ms(MISTRAL_TIMEOUT_SECONDS)
         )
         
         diet_content = response.choices[0].message.content
         print(f"   ✅ Result: AI diet plan generated with Mistral")
         
-        return {
-            "error": False,
-            "message": "🥗 Your AI-Powered Personalized Diet Plan (Mistral AI)",
-            "plan": diet_content,
-            "preference": preferences,
-            "daily_calories": calories or 2000,
-            "allergies": allergies or ["None"]
-        }
+        return _plan_result(diet_content, preferences, calories, allergies)
+        
+    except Exception as e:
+        return _error_result(e)
+
+async def generate_stream(preferences, calories=None, allergies=None):
+    """
+    Streaming variant of generate() for the SSE endpoint.
+    
+    Yields the plan's text pieces (str) as Mistral produces them, then
+    the same result dict generate() returns. Without an API key only the
+    template result is yielded.
+    
+    Args:
+        preferences: Dietary preference (vegetarian, vegan, keto, etc.)
+        calories: Target daily calorie intake (optional)
+        allergies: List of food allergies or restrictions (optional)
+    """
+    print(f"\n🔧 TOOL CALLED: generate_diet (streaming)")
+    print(f"   Preferences: {preferences}")
+    print(f"   Calories: {calories or 'Not specified'}")
+    print(f"   Allergies: {allergies or 'None'}")
+    
+    if allergies is None:
+        allergies = []
+    
+    api_key = _api_key()
+    
+    if not api_key:
+        print(f"   ⚠️ Mistral API key not configured, using template response")
+        yield _template_plan(preferences, calories, allergies)
+        return
+    
+    try:
+        client = Mistral(api_key=api_key)
+        
+        stream = await client.chat.stream_async(
+            model=os.getenv("MISTRAL_MODEL", "mistral-small-latest"),
+            messages=_messages(preferences, calories, allergies),
+            temperature=0.3,
+            max_tokens=900,
+            timeout_ms=deadline.timeout_ms(MISTRAL_TIMEOUT_SECONDS)
+        )
+        
+        pieces = []
+        async with stream:
+            async for event in stream:
+                text = event.data.choices[0].delta.content if event.data.choices else None
+                if isinstance(text, str) and text:
+                    pieces.append(text)
+                    yield text
+        
+        print(f"   ✅ Result: AI diet plan streamed from Mistral")
+        result = _plan_result("".join(pieces), preferences, calories, allergies)
         
     except Exception as e:
-        print(f"   ❌ Error: {str(e)}")
-        return {
-            "error": True,
-            "message": f"Failed to generate diet plan: {str(e)}",
-            "fallback": "Please check your Mistral API key configuration in .env file"
-        }
+        result = _error_result(e)
+    
+    yield result
@@ -3,9 +3,13 @@ Doctor management tools for Healthcare MCP Server
 Handles doctor queries, availability checks, and slot generation
 """
 
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
-from backend.database import get_db
+import asyncio
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import date, datetime, timedelta
+import numpy as np
+from backend.database import get_db, get_async_db
+from backend.availability import EXTRA_DAY_HOURS, AvailabilityCalendar, window_mask
+from backend.occupancy import SLOT_MINUTES, SLOTS_PER_DAY, iter_slots, slot_to_time, time_to_slot
 
 
 def get_doctors(specialty: Optional[str] = None) -> Dict[str, Any]:
@@ -24,45 +28,62 @@ def get_doctors(specialty: Optional[str] = None) -> Dict[str, Any]:
     db = get_db()
     
     try:
-        doctors = db.get_doctors(specialty)
-        
-        if not doctors:
-            return {
-                "message": f"No doctors found{f' for specialty: {specialty}' if specialty else ''}",
-                "doctors": [],
-                "suggestion": "Try searching for a different specialty"
-            }
-        
-        # Format response
-        formatted_doctors = []
-        specialties_found = set()
-        
-        for doc in doctors:
-            specialties_found.add(doc.get("specialty", "").title())
-            formatted_doctors.append({
-                "id": doc["id"],
-                "name": doc["name"],
-                "specialty": doc["specialty"].title(),
-                "experience": f"{doc.get('years_experience', 'N/A')} years",
-                "email": doc.get("email", "N/A")
-            })
-        
-        print(f"   ✅ Found {len(doctors)} doctors")
-        
-        return {
-            "message": f"Found {len(doctors)} doctor(s)",
-            "specialties_available": list(specialties_found),
-            "doctors": formatted_doctors,
-            "instruction": "Use get_available_slots to check when these doctors are available"
-        }
-        
+        return _format_doctors(db.get_doctors(specialty), specialty)
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        return _doctors_error(e)
+
+
+async def get_doctors_async(specialty: Optional[str] = None) -> Dict[str, Any]:
+    """Async variant of get_doctors backed by AsyncDatabase"""
+    print(f"\n🔧 TOOL CALLED: get_doctors (async)")
+    print(f"   Specialty: {specialty or 'All'}")
+    
+    try:
+        return _format_doctors(await get_async_db().get_doctors(specialty), specialty)
+    except Exception as e:
+        return _doctors_error(e)
+
+
+def _format_doctors(doctors: List[Dict[str, Any]], specialty: Optional[str]) -> Dict[str, Any]:
+    """Shape doctor rows into the get_doctors response"""
+    if not doctors:
         return {
-            "error": True,
-            "message": f"Failed to fetch doctors: {str(e)}",
-            "doctors": []
+            "message": f"No doctors found{f' for specialty: {specialty}' if specialty else ''}",
+            "doctors": [],
+            "suggestion": "Try searching for a different specialty"
         }
+    
+    # Format response
+    formatted_doctors = []
+    specialties_found = set()
+    
+    for doc in doctors:
+        specialties_found.add(doc.get("specialty", "").title())
+        formatted_doctors.append({
+            "id": doc["id"],
+            "name": doc["name"],
+            "specialty": doc["specialty"].title(),
+            "experience": f"{doc.get('years_experience', 'N/A')} years",
+            "email": doc.get("email", "N/A")
+        })
+    
+    print(f"   ✅ Found {len(doctors)} doctors")
+    
+    return {
+        "message": f"Found {len(doctors)} doctor(s)",
+        "specialties_available": list(specialties_found),
+        "doctors": formatted_doctors,
+        "instruction": "Use get_available_slots to check when these doctors are available"
+    }
+
+
+def _doctors_error(e: Exception) -> Dict[str, Any]:
+    print(f"   ❌ Error: {e}")
+    return {
+        "error": True,
+        "message": f"Failed to fetch doctors: {str(e)}",
+        "doctors": []
+    }
 
 
 def get_available_slots(specialty: str, date: str, doctor_id: Optional[str] = None) -> Dict[str, Any]:
@@ -77,12 +98,69 @@ def get_available_slots(specialty: str, date: str, doctor_id: Optional[str] = No
     Returns:
         Available time slots with doctor assignments
     """
-    print(f"\n🔧 TOOL CALLED: get_available_slots")
+    _log_slots_call(specialty, date, doctor_id)
+    
+    date_error = _validate_slot_date(date)
+    if date_error:
+        return date_error
+    
+    db = get_db()
+    
+    try:
+        # If specific doctor requested, verify they exist; otherwise all doctors for this specialty
+        if doctor_id:
+            doctor_error, target_doctors = _requested_doctor(db.get_doctor_by_id(doctor_id), doctor_id, specialty)
+            if doctor_error:
+                return doctor_error
+        else:
+            target_doctors = db.get_doctors(specialty)
+        
+        if target_doctors:
+            # Make sure the calendar holds this day, then read free slots locally
+            db.load_day_calendar([doctor["id"] for doctor in target_doctors], date)
+        
+        return _build_slots_response(specialty, date, target_doctors, db.calendar)
+        
+    except Exception as e:
+        return _slots_error(e)
+
+
+async def get_available_slots_async(specialty: str, date: str, doctor_id: Optional[str] = None) -> Dict[str, Any]:
+    """Async variant of get_available_slots backed by AsyncDatabase"""
+    _log_slots_call(specialty, date, doctor_id, " (async)")
+    
+    date_error = _validate_slot_date(date)
+    if date_error:
+        return date_error
+    
+    adb = get_async_db()
+    
+    try:
+        if doctor_id:
+            doctor_error, target_doctors = _requested_doctor(await adb.get_doctor_by_id(doctor_id), doctor_id, specialty)
+            if doctor_error:
+                return doctor_error
+        else:
+            target_doctors = await adb.get_doctors(specialty)
+        
+        if target_doctors:
+            await adb.load_day_calendar([doctor["id"] for doctor in target_doctors], date)
+        
+        return _build_slots_response(specialty, date, target_doctors, adb.calendar)
+        
+    except Exception as e:
+        return _slots_error(e)
+
+
+def _log_slots_call(specialty: str, date: str, doctor_id: Optional[str], variant: str = "") -> None:
+    print(f"\n🔧 TOOL CALLED: get_available_slots{variant}")
     print(f"   Specialty: {specialty}")
     print(f"   Date: {date}")
     print(f"   Doctor ID: {doctor_id or 'Any'}")
-    
-    # Validate date format
+
+
+def _validate_slot_date(date: str) -> Optional[Dict[str, Any]]:
+    """Return an early response if the date is invalid, past, or a weekend"""
     try:
         check_date = datetime.strptime(date, "%Y-%m-%d").date()
         today = datetime.now().date()
@@ -111,101 +189,540 @@ def get_available_slots(specialty: str, date: str, doctor_id: Optional[str] = No
             "suggestion": "Use YYYY-MM-DD format (e.g., 2026-01-25)"
         }
     
+    return None
+
+
+def _check_requested_doctor(
+    doctor: Optional[Dict[str, Any]], doctor_id: str, specialty: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Return an error response if the requested doctor is missing or in another specialty"""
+    if not doctor:
+        return {
+            "error": True,
+            "message": f"Doctor not found: {doctor_id}",
+            "suggestion": "Use get_doctors to find valid doctor IDs"
+        }
+    if specialty and doctor["specialty"].lower() != specialty.lower():
+        return {
+            "error": True,
+            "message": f"Doctor {doctor['name']} specializes in {doctor['specialty']}, not {specialty}",
+            "suggestion": "Choose a doctor matching your required specialty"
+        }
+    return None
+
+
+def _requested_doctor(
+    doctor: Optional[Dict[str, Any]], doctor_id: str, specialty: Optional[str]
+) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Target doctors for a request naming one doctor; returns (error_response, target_doctors)"""
+    doctor_error = _check_requested_doctor(doctor, doctor_id, specialty)
+    if doctor_error:
+        return doctor_error, []
+    return None, [doctor]
+
+
+def _build_slots_response(
+    specialty: str,
+    date: str,
+    target_doctors: List[Dict[str, Any]],
+    calendar: AvailabilityCalendar
+) -> Dict[str, Any]:
+    """Read free slots from a loaded availability calendar and shape the response"""
+    if not target_doctors:
+        return {
+            "message": f"No doctors available for {specialty}",
+            "available_slots": [],
+            "suggestion": "Try a different specialty or date"
+        }
+    
+    # Walk each doctor's precomputed free-slot bitmap (working hours,
+    # overrides and bookings are already applied)
+    available_slots = []
+    
+    for doctor in target_doctors:
+        for slot in iter_slots(calendar.free_mask(doctor["id"], date)):
+            available_slots.append({
+                "time": slot_to_time(slot),
+                "doctor_id": doctor["id"],
+                "doctor_name": doctor["name"],
+                "specialty": doctor["specialty"].title()
+            })
+    
+    available_slots.sort(key=lambda slot: slot["time"])
+    
+    if not available_slots:
+        return {
+            "message": f"No available slots for {specialty} on {date}",
+            "available_slots": [],
+            "suggestion": "Try a different date or check if doctors have availability overrides"
+        }
+    
+    # Group by time slot for better readability
+    slots_by_time = {}
+    for slot in available_slots:
+        time = slot["time"]
+        if time not in slots_by_time:
+            slots_by_time[time] = []
+        slots_by_time[time].append({
+            "doctor_id": slot["doctor_id"],
+            "doctor_name": slot["doctor_name"]
+        })
+    
+    print(f"   ✅ Found {len(available_slots)} available slots")
+    
+    return {
+        "message": f"Found {len(slots_by_time)} available time slots for {specialty}",
+        "date": date,
+        "specialty": specialty.title(),
+        "available_slots": slots_by_time,
+        "total_options": len(available_slots),
+        "instruction": "Use book_appointment with doctor_id to book a specific slot"
+    }
+
+
+def _slots_error(e: Exception) -> Dict[str, Any]:
+    print(f"   ❌ Error: {e}")
+    return {
+        "error": True,
+        "message": f"Failed to get available slots: {str(e)}",
+        "available_slots": []
+    }
+
+
+MAX_SEARCH_DAYS = 90
+MAX_SEARCH_RESULTS = 50
+
+
+def find_next_available(
+    specialty: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    days: int = 14,
+    limit: int = 5,
+    time_windows: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Find the next open appointment times across a range of days
+    
+    Args:
+        specialty: Medical specialty required (optional if doctor_id is given)
+        doctor_id: Specific doctor ID (optional)
+        start_date: First date to search (YYYY-MM-DD, defaults to today)
+        days: Number of days to search (1-90)
+        limit: Number of open times to return (1-50)
+        time_windows: Acceptable times of day, e.g. ["09:00-12:00", "14:00-16:00"]
+    
+    Returns:
+        Earliest open times with the doctors free at each
+    """
+    _log_search_call(specialty, doctor_id, start_date, days)
+    
+    search, search_error = _parse_search(specialty, doctor_id, start_date, days, limit, time_windows)
+    if search_error:
+        return search_error
+    
     db = get_db()
     
     try:
-        # If specific doctor requested, verify they exist
-        target_doctors = []
         if doctor_id:
-            doctor = db.get_doctor_by_id(doctor_id)
-            if not doctor:
-                return {
-                    "error": True,
-                    "message": f"Doctor not found: {doctor_id}",
-                    "suggestion": "Use get_doctors to find valid doctor IDs"
-                }
-            if doctor["specialty"].lower() != specialty.lower():
-                return {
-                    "error": True,
-                    "message": f"Doctor {doctor['name']} specializes in {doctor['specialty']}, not {specialty}",
-                    "suggestion": "Choose a doctor matching your required specialty"
-                }
-            target_doctors = [doctor]
+            doctor_error, target_doctors = _requested_doctor(db.get_doctor_by_id(doctor_id), doctor_id, specialty)
+            if doctor_error:
+                return doctor_error
         else:
-            # Get all doctors for this specialty
             target_doctors = db.get_doctors(specialty)
-            
-        if not target_doctors:
-            return {
-                "message": f"No doctors available for {specialty}",
-                "available_slots": [],
-                "suggestion": "Try a different specialty or date"
-            }
         
-        # Generate 15-minute slots
-        available_slots = []
-        slot_times = []
-        
-        for hour in range(9, 17):  # 9 AM to 5 PM
-            for minute in [0, 15, 30, 45]:
-                slot_time = f"{hour:02d}:{minute:02d}"
-                
-                # Skip last 15 minutes of day
-                if hour == 17 and minute > 0:
-                    continue
-                    
-                slot_times.append(slot_time)
-        
-        # Check each slot against each doctor
-        for slot_time in slot_times:
-            for doctor in target_doctors:
-                # Check if doctor is already booked
-                conflict = db.check_doctor_conflict(doctor["id"], date, slot_time)
-                
-                if not conflict:
-                    available_slots.append({
-                        "time": slot_time,
-                        "doctor_id": doctor["id"],
-                        "doctor_name": doctor["name"],
-                        "specialty": doctor["specialty"].title()
-                    })
-        
-        if not available_slots:
-            return {
-                "message": f"No available slots for {specialty} on {date}",
-                "available_slots": [],
-                "suggestion": "Try a different date or check if doctors have availability overrides"
-            }
+        doctor_ids, first, last = _search_scope(search, target_doctors)
         
-        # Group by time slot for better readability
-        slots_by_time = {}
-        for slot in available_slots:
-            time = slot["time"]
-            if time not in slots_by_time:
-                slots_by_time[time] = []
-            slots_by_time[time].append({
-                "doctor_id": slot["doctor_id"],
-                "doctor_name": slot["doctor_name"]
-            })
+        # Three set-based reads cover the whole range: cached weekly schedules,
+        # one overrides query and one appointments range scan
+        weekly = db.get_weekly_schedules(doctor_ids)
+        overrides = db.get_range_overrides(doctor_ids, first, last)
+        appointments = db.get_range_appointments(doctor_ids, first, last)
         
-        print(f"   ✅ Found {len(available_slots)} available slots")
+        return _build_next_available_response(search, target_doctors, weekly, overrides, appointments)
         
-        return {
-            "message": f"Found {len(slots_by_time)} available time slots for {specialty}",
-            "date": date,
-            "specialty": specialty.title(),
-            "available_slots": slots_by_time,
-            "total_options": len(available_slots),
-            "instruction": "Use book_appointment with doctor_id to book a specific slot"
-        }
+    except Exception as e:
+        return _next_available_error(e)
+
+
+async def find_next_available_async(
+    specialty: Optional[str] = None,
+    doctor_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    days: int = 14,
+    limit: int = 5,
+    time_windows: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Async variant of find_next_available backed by AsyncDatabase"""
+    _log_search_call(specialty, doctor_id, start_date, days, " (async)")
+    
+    search, search_error = _parse_search(specialty, doctor_id, start_date, days, limit, time_windows)
+    if search_error:
+        return search_error
+    
+    adb = get_async_db()
+    
+    try:
+        if doctor_id:
+            doctor_error, target_doctors = _requested_doctor(await adb.get_doctor_by_id(doctor_id), doctor_id, specialty)
+            if doctor_error:
+                return doctor_error
+        else:
+            target_doctors = await adb.get_doctors(specialty)
+        
+        doctor_ids, first, last = _search_scope(search, target_doctors)
+        
+        weekly, overrides, appointments = await asyncio.gather(
+            adb.get_weekly_schedules(doctor_ids),
+            adb.get_range_overrides(doctor_ids, first, last),
+            adb.get_range_appointments(doctor_ids, first, last)
+        )
+        
+        return _build_next_available_response(search, target_doctors, weekly, overrides, appointments)
         
     except Exception as e:
-        print(f"   ❌ Error: {e}")
-        return {
+        return _next_available_error(e)
+
+
+def _log_search_call(
+    specialty: Optional[str], doctor_id: Optional[str], start_date: Optional[str], days: int, variant: str = ""
+) -> None:
+    print(f"\n🔧 TOOL CALLED: find_next_available{variant}")
+    print(f"   Specialty: {specialty or 'Any'}")
+    print(f"   Doctor ID: {doctor_id or 'Any'}")
+    print(f"   From: {start_date or 'today'} for {days} days")
+
+
+def _search_scope(
+    search: Dict[str, Any], target_doctors: List[Dict[str, Any]]
+) -> Tuple[List[str], str, str]:
+    """Doctor IDs and first/last ISO dates the range reads cover"""
+    doctor_ids = [doctor["id"] for doctor in target_doctors]
+    return doctor_ids, search["start"].isoformat(), search["end"].isoformat()
+
+
+def _parse_search(
+    specialty: Optional[str],
+    doctor_id: Optional[str],
+    start_date: Optional[str],
+    days: int,
+    limit: int,
+    time_windows: Optional[List[str]]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Validate find_next_available arguments; returns (search, error_response)"""
+    if not specialty and not doctor_id:
+        return None, {
             "error": True,
-            "message": f"Failed to get available slots: {str(e)}",
-            "available_slots": []
+            "message": "Provide a specialty or a doctor_id to search",
+            "suggestion": "Use get_doctors to see specialties and doctor IDs"
+        }
+    
+    now = datetime.now()
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else now.date()
+    except ValueError:
+        return None, {
+            "error": True,
+            "message": f"Invalid date format: {start_date}",
+            "suggestion": "Use YYYY-MM-DD format (e.g., 2026-01-25)"
+        }
+    if start < now.date():
+        return None, {
+            "error": True,
+            "message": f"Cannot search availability from a past date: {start_date}",
+            "suggestion": "Please provide a future date"
+        }
+    
+    windows = []
+    for window in time_windows or []:
+        try:
+            window_start, window_end = [part.strip() for part in window.split("-")]
+            opens = datetime.strptime(window_start, "%H:%M")
+            closes = datetime.strptime(window_end, "%H:%M")
+        except ValueError:
+            return None, {
+                "error": True,
+                "message": f"Invalid time window: {window}",
+                "suggestion": "Use HH:MM-HH:MM windows (e.g., '09:00-12:00')"
+            }
+        if opens >= closes:
+            return None, {
+                "error": True,
+                "message": f"Invalid time window: {window} (start must be before end)",
+                "suggestion": "Use HH:MM-HH:MM windows that start before they end (e.g., '09:00-12:00')"
+            }
+        windows.append((window_start, window_end))
+    
+    days = max(1, min(int(days or 14), MAX_SEARCH_DAYS))
+    
+    # Today only offers slots that have not started yet
+    earliest_slot = 0
+    if start == now.date():
+        earliest_slot = time_to_slot(now.strftime("%H:%M")) + 1
+    
+    return {
+        "start": start,
+        "end": start + timedelta(days=days - 1),
+        "limit": max(1, min(int(limit or 5), MAX_SEARCH_RESULTS)),
+        "allowed": window_mask(windows),
+        "earliest_slot": earliest_slot,
+        "specialty": specialty,
+    }, None
+
+
+def _build_next_available_response(
+    search: Dict[str, Any],
+    target_doctors: List[Dict[str, Any]],
+    weekly: Dict[str, List[Dict[str, Any]]],
+    overrides: Dict[Tuple[str, str], Dict[str, Any]],
+    appointments: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Scan the range for open times and shape the find_next_available response"""
+    if not target_doctors:
+        return {
+            "message": f"No doctors available for {search['specialty']}",
+            "next_available": [],
+            "suggestion": "Try a different specialty"
         }
+    
+    label = search["specialty"] or target_doctors[0]["specialty"]
+    
+    matrix = AvailabilityMatrix.build(
+        target_doctors,
+        weekly,
+        overrides,
+        appointments,
+        search["start"],
+        (search["end"] - search["start"]).days + 1
+    )
+    slots = matrix.next_open_times(
+        search["limit"],
+        allowed=search["allowed"],
+        earliest_slot=search["earliest_slot"],
+    )
+    
+    if not slots:
+        return {
+            "message": f"No open slots for {label} between {search['start']} and {search['end']}",
+            "next_available": [],
+            "suggestion": "Try a longer range, wider time windows, or a different doctor"
+        }
+    
+    print(f"   ✅ Found {len(slots)} open times, earliest {slots[0]['date']} {slots[0]['time']}")
+    
+    return {
+        "message": f"Next {len(slots)} open time(s) for {label.title()}",
+        "searched": {"from": search["start"].isoformat(), "to": search["end"].isoformat()},
+        "next_available": slots,
+        "instruction": "Use book_appointment with the date, time and doctor_id to book one of these"
+    }
+
+
+def _next_available_error(e: Exception) -> Dict[str, Any]:
+    print(f"   ❌ Error: {e}")
+    return {
+        "error": True,
+        "message": f"Failed to find available slots: {str(e)}",
+        "next_available": []
+    }
+
+
+class AvailabilityMatrix:
+    """
+    Free slots for many doctors over many days as one boolean NumPy array.
+    
+    `free[d, n, s]` is True when doctor d works slot s on day n and has no
+    active appointment then. Multi-doctor, multi-day questions become array
+    reductions and sliding-window sums instead of per-slot database checks.
+    """
+    
+    def __init__(self, doctors: List[Dict[str, Any]], start_date: date, free: np.ndarray):
+        self.doctors = doctors
+        self.start_date = start_date
+        self.free = free
+        self.doctor_index = {doctor["id"]: i for i, doctor in enumerate(doctors)}
+        self.dates = [start_date + timedelta(days=n) for n in range(free.shape[1])]
+        self.specialties = np.array([doctor.get("specialty", "").lower() for doctor in doctors])
+    
+    @classmethod
+    def build(
+        cls,
+        doctors: List[Dict[str, Any]],
+        weekly_schedules: Dict[str, List[Dict[str, Any]]],
+        overrides: Dict[Tuple[str, str], Dict[str, Any]],
+        appointments: List[Dict[str, Any]],
+        start_date: date,
+        days: int
+    ) -> "AvailabilityMatrix":
+        """Build from weekly schedules, date overrides and active appointments (same rules as the calendar)"""
+        doctor_index = {doctor["id"]: i for i, doctor in enumerate(doctors)}
+        
+        # Working hours per doctor and weekday, then broadcast onto the date range
+        weekly = np.zeros((len(doctors), 7, SLOTS_PER_DAY), dtype=bool)
+        for doctor_id, rows in weekly_schedules.items():
+            if doctor_id not in doctor_index:
+                continue
+            for row in rows:
+                if row.get("is_available", True):
+                    weekly[doctor_index[doctor_id], row["day_of_week"],
+                           time_to_slot(row["start_time"]):time_to_slot(row["end_time"])] = True
+        
+        weekdays = np.array([(start_date + timedelta(days=n)).weekday() for n in range(days)])
+        free = weekly[:, weekdays, :]
+        free[:, weekdays >= 5, :] = False  # Clinic is closed on weekends
+        
+        extra_start, extra_end = (time_to_slot(t) for t in EXTRA_DAY_HOURS)
+        for (doctor_id, day_str), override in overrides.items():
+            d = doctor_index.get(doctor_id)
+            n = (date.fromisoformat(day_str) - start_date).days
+            if d is None or not 0 <= n < days or weekdays[n] >= 5:
+                continue
+            if not override.get("is_available", True):
+                free[d, n, :] = False
+            elif not free[d, n].any():
+                free[d, n, extra_start:extra_end] = True
+        
+        # Appointment dates and times repeat heavily - parse each distinct value once
+        day_offsets = {(start_date + timedelta(days=n)).isoformat(): n for n in range(days)}
+        slot_of = {t: time_to_slot(t) for t in {row["appointment_time"] for row in appointments}}
+        rows = [
+            (doctor_index[row["doctor_id"]], day_offsets[str(row["appointment_date"])], slot_of[row["appointment_time"]])
+            for row in appointments
+            if row.get("doctor_id") in doctor_index and str(row["appointment_date"]) in day_offsets
+        ]
+        if rows:
+            d, n, s = np.array(rows, dtype=np.int32).T
+            free[d, n, s] = False
+        
+        return cls(doctors, start_date, free)
+    
+    def _doctor_mask(self, specialty: Optional[str]) -> np.ndarray:
+        if not specialty:
+            return np.ones(len(self.doctors), dtype=bool)
+        return self.specialties == specialty.lower()
+    
+    def run_starts(self, minutes: int) -> np.ndarray:
+        """Boolean (doctors, days, slots) array: True where `minutes` of consecutive free time begin"""
+        length = max(1, -(-minutes // SLOT_MINUTES))
+        if length > SLOTS_PER_DAY:
+            return np.zeros_like(self.free)
+        # Sliding-window sum along the slot axis via a cumulative sum
+        counts = np.cumsum(self.free, axis=2, dtype=np.int16)
+        counts = np.concatenate([np.zeros(self.free.shape[:2] + (1,), dtype=np.int16), counts], axis=2)
+        window = counts[:, :, length:] - counts[:, :, :-length]
+        starts = np.zeros_like(self.free)
+        starts[:, :, :SLOTS_PER_DAY - length + 1] = window == length
+        return starts
+    
+    def doctors_free_for(
+        self,
+        minutes: int,
+        specialty: Optional[str] = None,
+        weekdays_only: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Doctors with at least `minutes` of consecutive free time, per day.
+        
+        Returns:
+            List of {date, doctors: [{doctor_id, doctor_name, first_start}]} for days with any match
+        """
+        starts = self.run_starts(minutes) & self._doctor_mask(specialty)[:, None, None]
+        has_run = starts.any(axis=2)                       # (doctors, days)
+        first_start = starts.argmax(axis=2)                # earliest start per doctor-day
+        
+        results = []
+        for n in np.flatnonzero(has_run.any(axis=0)):
+            if weekdays_only and self.dates[n].weekday() >= 5:
+                continue
+            results.append({
+                "date": self.dates[n].isoformat(),
+                "doctors": [
+                    {
+                        "doctor_id": self.doctors[d]["id"],
+                        "doctor_name": self.doctors[d]["name"],
+                        "first_start": slot_to_time(int(first_start[d, n])),
+                    }
+                    for d in np.flatnonzero(has_run[:, n])
+                ],
+            })
+        return results
+    
+    def capacity_by_day(self, specialty: Optional[str] = None) -> np.ndarray:
+        """Open slots per day summed over doctors (optionally one specialty)"""
+        return self.free[self._doctor_mask(specialty)].sum(axis=(0, 2))
+    
+    def next_open_times(
+        self,
+        limit: int,
+        allowed: int = (1 << SLOTS_PER_DAY) - 1,
+        earliest_slot: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        First `limit` times any doctor is free, earliest first.
+        
+        Args:
+            limit: Number of open times to return
+            allowed: Bitmap of acceptable times of day (see window_mask)
+            earliest_slot: Slots before this one are skipped on the first day (e.g. already past today)
+        
+        Returns:
+            List of {date, time, doctors: [{doctor_id, doctor_name}]} entries
+        """
+        allowed_slots = np.array([(allowed >> s) & 1 for s in range(SLOTS_PER_DAY)], dtype=bool)
+        open_now = self.free & allowed_slots
+        if open_now.shape[1]:
+            open_now[:, 0, :earliest_slot] = False
+        
+        # Row-major order over (days, slots) is chronological
+        days, slots = np.nonzero(open_now.any(axis=0))
+        return [
+            {
+                "date": self.dates[n].isoformat(),
+                "time": slot_to_time(int(s)),
+                "doctors": [
+                    {"doctor_id": self.doctors[d]["id"], "doctor_name": self.doctors[d]["name"]}
+                    for d in np.flatnonzero(open_now[:, n, s])
+                ],
+            }
+            for n, s in zip(days[:limit], slots[:limit])
+        ]
+    
+    def most_open_day(self, specialty: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Day with the most open capacity, or None when nothing is free"""
+        capacity = self.capacity_by_day(specialty)
+        if not capacity.size or not capacity.max():
+            return None
+        n = int(capacity.argmax())
+        return {"date": self.dates[n].isoformat(), "open_slots": int(capacity[n])}
+    
+    def free_slots(self, doctor_id: str, day: date) -> List[str]:
+        """Open times for one doctor on one day"""
+        d = self.doctor_index[doctor_id]
+        n = (day - self.start_date).days
+        return [slot_to_time(int(s)) for s in np.flatnonzero(self.free[d, n])]
+
+
+def build_availability_matrix(
+    specialty: Optional[str] = None,
+    start_date: Optional[date] = None,
+    days: int = 30
+) -> AvailabilityMatrix:
+    """Load schedules, overrides and appointments for a specialty (or everyone) into an AvailabilityMatrix"""
+    db = get_db()
+    start_date = start_date or datetime.now().date()
+    first, last = start_date.isoformat(), (start_date + timedelta(days=days - 1)).isoformat()
+    
+    target_doctors = db.get_doctors(specialty)
+    doctor_ids = [doctor["id"] for doctor in target_doctors]
+    
+    return AvailabilityMatrix.build(
+        target_doctors,
+        db.get_weekly_schedules(doctor_ids),
+        db.get_range_overrides(doctor_ids, first, last),
+        db.get_range_appointments(doctor_ids, first, last),
+        start_date,
+        days
+    )
 
 
 def get_doctor_schedule(doctor_identifier: str) -> Dict[str, Any]:
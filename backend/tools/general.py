@@ -1,5 +1,9 @@
 import os
 from mistralai import Mistral
+from backend import deadline
+
+# Upper bound for one Mistral call; a shorter request deadline takes precedence
+MISTRAL_TIMEOUT_SECONDS = float(os.getenv("MISTRAL_TIMEOUT_SECONDS", "30"))
 
 def is_health_related(question):
     """Check if the question is health-related using specific medical/health keywords only."""
@@ -35,65 +39,53 @@ def is_health_related(question):
     question_lower = question.lower()
     return any(keyword in question_lower for keyword in health_keywords)
 
-def answer(question, context=None):
-    """
-    Answer general health and wellness questions.
-    Only responds to health-related queries.
-    
-    Args:
-        question: The health question to answer
-        context: Additional context or patient information (optional)
-    """
-    print(f"\n🔧 TOOL CALLED: general_query")
-    print(f"   Question: {question}")
-    print(f"   Context: {context or 'None'}")
-    
-    # Validate that query is health-related
-    if not is_health_related(question):
-        print(f"   ⚠️ Non-health question detected")
-        return {
-            "error": True,
-            "message": "I can only answer health-related questions.",
-            "suggestion": "Please ask about health topics like:\n• Medical conditions and symptoms\n• Treatments and medications\n• Diet and nutrition\n• Exercise and fitness\n• Mental health and wellness\n• Healthcare appointments and services"
-        }
-    
+def _api_key():
+    """Configured Mistral API key, or None while .env still has the placeholder"""
     api_key = os.getenv("MISTRAL_API_KEY")
-    
     if not api_key or api_key == "your-mistral-api-key-here":
-        print(f"   ⚠️ Mistral API key not configured, using template response")
-        
-        # Common health topics with responses
-        health_knowledge = {
-            "exercise": "Regular exercise is crucial for health. Aim for 150 minutes of moderate aerobic activity or 75 minutes of vigorous activity per week, plus strength training twice weekly.",
-            "sleep": "Adults need 7-9 hours of quality sleep per night. Maintain a consistent sleep schedule and create a relaxing bedtime routine.",
-            "water": "Stay hydrated by drinking 8-10 glasses (about 2 liters) of water daily. Increase intake during exercise or hot weather.",
-            "diet": "A balanced diet includes fruits, vegetables, whole grains, lean proteins, and healthy fats. Limit processed foods, sugar, and sodium.",
-            "stress": "Manage stress through exercise, meditation, deep breathing, adequate sleep, and connecting with others. Seek professional help if needed.",
-            "vitamins": "A balanced diet usually provides necessary vitamins. Consult a doctor before taking supplements."
-        }
-        
-        answer = "I'm a healthcare assistant. "
-        for topic, info in health_knowledge.items():
-            if topic in question.lower():
-                answer = info
-                break
-        else:
-            answer = "I can help with health questions. Could you please be more specific about your health concern?"
-        
-        return {
-            "answer": answer,
-            "source": "template",
-            "disclaimer": "⚕️ This is general information. Please consult a healthcare professional for medical advice."
-        }
+        return None
+    return api_key
+
+def _off_topic_result():
+    print(f"   ⚠️ Non-health question detected")
+    return {
+        "error": True,
+        "message": "I can only answer health-related questions.",
+        "suggestion": "Please ask about health topics like:\n• Medical conditions and symptoms\n• Treatments and medications\n• Diet and nutrition\n• Exercise and fitness\n• Mental health and wellness\n• Healthcare appointments and services"
+    }
+
+def _template_answer(question):
+    """Canned answer used when Mistral is not configured"""
+    # Common health topics with responses
+    health_knowledge = {
+        "exercise": "Regular exercise is crucial for health. Aim for 150 minutes of moderate aerobic activity or 75 minutes of vigorous activity per week, plus strength training twice weekly.",
+        "sleep": "Adults need 7-9 hours of quality sleep per night. Maintain a consistent sleep schedule and create a relaxing bedtime routine.",
+        "water": "Stay hydrated by drinking 8-10 glasses (about 2 liters) of water daily. Increase intake during exercise or hot weather.",
+        "diet": "A balanced diet includes fruits, vegetables, whole grains, lean proteins, and healthy fats. Limit processed foods, sugar, and sodium.",
+        "stress": "Manage stress through exercise, meditation, deep breathing, adequate sleep, and connecting with others. Seek professional help if needed.",
+        "vitamins": "A balanced diet usually provides necessary vitamins. Consult a doctor before taking supplements."
+    }
     
-    # Use Mistral AI for response
-    client = Mistral(api_key=api_key)
+    answer = "I'm a healthcare assistant. "
+    for topic, info in health_knowledge.items():
+        if topic in question.lower():
+            answer = info
+            break
+    else:
+        answer = "I can help with health questions. Could you please be more specific about your health concern?"
     
-    try:
-        messages = [
-            {
-                "role": "system",
-                "content": """You are a certified healthcare information assistant. Follow these rules strictly:
+    return {
+        "answer": answer,
+        "source": "template",
+        "disclaimer": "⚕️ This is general information. Please consult a healthcare professional for medical advice."
+    }
+
+def _messages(question, context):
+    """Chat messages asking Mistral to answer the question"""
+    messages = [
+        {
+            "role": "system",
+            "content": """You are a certified healthcare information assistant. Follow these rules strictly:
 
 SCOPE: Only answer questions about medical conditions, symptoms, treatments, medications, nutrition, fitness, mental health, or healthcare services. For any other topic, reply: "I can only assist with health-related questions."
 
@@ -113,39 +105,126 @@ HARD RULES:
 - Never recommend specific prescription drug doses.
 - Never contradict emergency medical advice.
 - If the question involves an emergency, always say: "Call emergency services (911) immediately." """
-            },
-            {
-                "role": "user",
-                "content": question
-            }
-        ]
-
-        if context:
-            messages.insert(1, {
-                "role": "system",
-                "content": f"Patient context (use only for relevance, do not expose): {context}"
-            })
-        
+        },
+        {
+            "role": "user",
+            "content": question
+        }
+    ]
+
+    if context:
+        messages.insert(1, {
+            "role": "system",
+            "content": f"Patient context (use only for relevance, do not expose): {context}"
+        })
+    return messages
+
+def _answer_result(answer):
+    return {
+        "answer": answer,
+        "source": "mistral_ai",
+        "disclaimer": "⚕️ This information is for educational purposes. Please consult a healthcare professional for personalized medical advice."
+    }
+
+def _error_result(e):
+    error_msg = str(e)
+    print(f"   ❌ Error: {error_msg}")
+    return {
+        "error": True,
+        "message": f"Unable to process your question: {error_msg}",
+        "suggestion": "Please try again or rephrase your health question."
+    }
+
+def answer(question, context=None):
+    """
+    Answer general health and wellness questions.
+    Only responds to health-related queries.
+    
+    Args:
+        question: The health question to answer
+        context: Additional context or patient information (optional)
+    """
+    print(f"\n🔧 TOOL CALLED: general_query")
+    print(f"   Question: {question}")
+    print(f"   Context: {context or 'None'}")
+    
+    # Validate that query is health-related
+    if not is_health_related(question):
+        return _off_topic_result()
+    
+    api_key = _api_key()
+    
+    if not api_key:
+        print(f"   ⚠️ Mistral API key not configured, using template response")
+        return _template_answer(question)
+    
+    # Use Mistral AI for response
+    client = Mistral(api_key=api_key)
+    
+    try:
         response = client.chat.complete(
             model="mistral-small-latest",
-            messages=messages
+            messages=_messages(question, context),
+            timeout_ms=deadline.timeout_ms(MISTRAL_TIMEOUT_SECONDS)
         )
         
         answer = response.choices[0].message.content
         
         print(f"   ✅ Response generated successfully")
         
-        return {
-            "answer": answer,
-            "source": "mistral_ai",
-            "disclaimer": "⚕️ This information is for educational purposes. Please consult a healthcare professional for personalized medical advice."
-        }
+        return _answer_result(answer)
         
     except Exception as e:
-        error_msg = str(e)
-        print(f"   ❌ Error: {error_msg}")
-        return {
-            "error": True,
-            "message": f"Unable to process your question: {error_msg}",
-            "suggestion": "Please try again or rephrase your health question."
-        }
+        return _error_result(e)
+
+async def answer_stream(question, context=None):
+    """
+    Streaming variant of answer() for the SSE endpoint.
+    
+    Yields the answer's text pieces (str) as Mistral produces them, then
+    the same result dict answer() returns. Off-topic questions and the
+    template fallback yield only the result.
+    
+    Args:
+        question: The health question to answer
+        context: Additional context or patient information (optional)
+    """
+    print(f"\n🔧 TOOL CALLED: general_query (streaming)")
+    print(f"   Question: {question}")
+    print(f"   Context: {context or 'None'}")
+    
+    if not is_health_related(question):
+        yield _off_topic_result()
+        return
+    
+    api_key = _api_key()
+    
+    if not api_key:
+        print(f"   ⚠️ Mistral API key not configured, using template response")
+        yield _template_answer(question)
+        return
+    
+    client = Mistral(api_key=api_key)
+    
+    try:
+        stream = await client.chat.stream_async(
+            model="mistral-small-latest",
+            messages=_messages(question, context),
+            timeout_ms=deadline.timeout_ms(MISTRAL_TIMEOUT_SECONDS)
+        )
+        
+        pieces = []
+        async with stream:
+            async for event in stream:
+                text = event.data.choices[0].delta.content if event.data.choices else None
+                if isinstance(text, str) and text:
+                    pieces.append(text)
+                    yield text
+        
+        print(f"   ✅ Response streamed successfully")
+        result = _answer_result("".join(pieces))
+        
+    except Exception as e:
+        result = _error_result(e)
+    
+    yield result
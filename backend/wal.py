@@ -0,0 +1,247 @@
+"""
+Write-ahead log for Healthcare MCP Server
+Append-only JSON-lines segments for bookings that could not reach Supabase,
+with group-commit fsync and a lock file shared across worker processes
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_SEGMENT_PATTERN = re.compile(r"^(?P<prefix>.+)-(?P<index>\d{8})\.jsonl$")
+
+
+@contextmanager
+def _exclusive(fd: int):
+    """Hold an exclusive cross-process lock on fd"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def try_exclusive(fd: int):
+    """Take an exclusive cross-process lock on fd without waiting; yields whether it was taken"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class WriteAheadLog:
+    """Segmented JSON-lines log with group-commit fsync"""
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "bookings",
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        commit_delay: float = 0.002,
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_max_bytes = segment_max_bytes
+        self.commit_delay = commit_delay
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()          # guards the active fd and sequence numbers
+        self._fsync_lock = threading.Lock()    # held by the group-commit leader
+        self._sync_cond = threading.Condition()
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._leader_active = False
+        self._retired: List[int] = []          # rotated-out fds awaiting their final fsync
+        self._corrupt: Set[Tuple[str, int]] = set()  # (segment_name, offset) of unreadable lines
+
+        self._lock_fd = os.open(os.path.join(directory, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        existing = self.segments()
+        self._index = self._segment_index(existing[-1]) if existing else 1
+        self._fd = self._open_segment(self._index)
+
+    # ============ Segments ============
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"{self.prefix}-{index:08d}.jsonl")
+
+    @staticmethod
+    def _segment_index(path: str) -> int:
+        return int(_SEGMENT_PATTERN.match(os.path.basename(path)).group("index"))
+
+    def _open_segment(self, index: int) -> int:
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+        return os.open(self._segment_path(index), flags, 0o644)
+
+    def segments(self) -> List[str]:
+        """Paths of every segment, oldest first"""
+        names = [
+            name for name in os.listdir(self.directory)
+            if (match := _SEGMENT_PATTERN.match(name)) and match.group("prefix") == self.prefix
+        ]
+        return [os.path.join(self.directory, name) for name in sorted(names)]
+
+    def _advance_segment(self) -> None:
+        """Move to the newest segment, rotating if the active one is full (call under both locks)"""
+        # Another worker may already have rotated past our segment
+        while os.path.exists(self._segment_path(self._index + 1)):
+            self._retire_and_open(self._index + 1)
+        if os.fstat(self._fd).st_size >= self.segment_max_bytes:
+            self._retire_and_open(self._index + 1)
+
+    def _retire_and_open(self, index: int) -> None:
+        self._retired.append(self._fd)
+        self._index = index
+        self._fd = self._open_segment(index)
+
+    # ============ Writing ============
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record and return once it is durable on disk"""
+        line = (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+        with self._lock:
+            with _exclusive(self._lock_fd):
+                self._advance_segment()
+                os.write(self._fd, line)
+            self._written_seq += 1
+            seq = self._written_seq
+
+        self._wait_durable(seq)
+
+    def _wait_durable(self, seq: int) -> None:
+        with self._sync_cond:
+            while self._synced_seq < seq:
+                if not self._leader_active:
+                    self._leader_active = True
+                    break
+                self._sync_cond.wait()
+            else:
+                return  # a leader's fsync already covered this write
+
+        try:
+            self._group_commit()
+        finally:
+            with self._sync_cond:
+                self._leader_active = False
+                self._sync_cond.notify_all()
+
+    def _group_commit(self) -> None:
+        if self.commit_delay:
+            time.sleep(self.commit_delay)  # let concurrent appenders join this fsync
+
+        with self._fsync_lock:
+            with self._lock:
+                target = self._written_seq
+                fd = self._fd
+                retired, self._retired = self._retired, []
+
+            for old_fd in retired:
+                os.fsync(old_fd)
+                os.close(old_fd)
+            os.fsync(fd)
+
+        with self._sync_cond:
+            self._synced_seq = max(self._synced_seq, target)
+
+    def close(self) -> None:
+        """Flush and close every open file"""
+        with self._fsync_lock, self._lock:
+            for fd in self._retired + [self._fd]:
+                os.fsync(fd)
+                os.close(fd)
+            self._retired = []
+            os.close(self._lock_fd)
+
+    # ============ Reading ============
+
+    def read(self, segment: Optional[str] = None, offset: int = 0) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+        """
+        Yield (segment_name, next_offset, record) from a position onward.
+
+        (segment_name, next_offset) is a checkpoint: passing it back resumes
+        right after that record. A torn final line from a crash is skipped, and
+        so is a complete line that does not decode (counted in corrupt_lines),
+        so one bad record cannot stall readers behind it.
+        """
+        for path in self.segments():
+            name = os.path.basename(path)
+            if segment is not None and name < segment:
+                continue
+            start = offset if name == segment else 0
+
+            with open(path, "rb") as f:
+                f.seek(start)
+                position = start
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # incomplete write still in progress or torn
+                    line_start = position
+                    position += len(raw)
+                    if not raw.strip():
+                        continue
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        self._skip_corrupt(name, line_start)
+                        continue
+                    yield name, position, record
+
+    def _skip_corrupt(self, name: str, offset: int) -> None:
+        if (name, offset) in self._corrupt:
+            return  # already reported on an earlier read
+        self._corrupt.add((name, offset))
+        print(f"   ⚠️  Skipping unreadable line in {name} at byte {offset}")
+
+    @property
+    def corrupt_lines(self) -> int:
+        """Unreadable lines skipped by read() so far"""
+        return len(self._corrupt)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Every record in the log"""
+        return [record for _, _, record in self.read()]
+
+    def prune(self, before_segment: str) -> int:
+        """Delete whole segments older than before_segment (e.g. once replayed); returns how many"""
+        removed = 0
+        for path in self.segments():
+            if os.path.basename(path) >= before_segment:
+                break
+            if self._segment_index(path) == self._index:
+                break
+            os.remove(path)
+            removed += 1
+        return removed
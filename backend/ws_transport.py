@@ -0,0 +1,207 @@
+"""
+WebSocket chat channel for Healthcare MCP Server
+One persistent connection per chat session at /ws: tool calls tagged with ids
+run concurrently over it, LLM tools stream their text, and the server pushes
+events such as a slot the session was shown being booked by someone else
+
+Client -> server:
+    {"type": "call", "id": 1, "name": "get_available_slots", "args": {...}, "deadline_ms": 5000}
+    {"type": "cancel", "id": 1}
+
+Server -> client:
+    {"type": "token", "id": 1, "text": "..."}                        generate_diet, general_query
+    {"type": "result", "id": 1, "result": {...}}                     same JSON as /mcp/call
+    {"type": "error", "id": 1, "message": "..."}                     malformed message
+    {"type": "event", "event": "slot_taken", "doctor_id": ..., "doctor_name": ..., "date": ..., "time": ...}
+
+Results arrive as calls finish, not in the order they were sent. A cancelled
+call gets no result.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from backend.deadline import deadline_scope, parse_budget_ms
+from backend.events import Subscription, get_event_bus
+from backend.mcp import stream_tool
+from backend.mcp_transport import MCP_MAX_IN_FLIGHT
+from backend.occupancy import slot_to_time, time_to_slot
+
+# Slots remembered per session for slot_taken notices; oldest are forgotten first
+MAX_WATCHED_SLOTS = 500
+
+# Calls one session may have running or waiting for an in-flight slot
+MAX_PENDING_CALLS = 4 * MCP_MAX_IN_FLIGHT
+
+SlotKey = Tuple[str, str, str]  # (doctor_id, date, time)
+
+
+class ChatSession:
+    """
+    One WebSocket connection and the calls running on it.
+
+    Open slots returned by get_available_slots and find_next_available are
+    watched; if one of them is booked through another session, this client
+    gets a slot_taken event. Its own bookings do not notify it.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self._send_lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(MCP_MAX_IN_FLIGHT)
+        self._calls: Dict[Any, asyncio.Task] = {}
+        self._watched: Dict[SlotKey, Optional[str]] = {}  # -> doctor name
+        self._closed = False
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Send one message; quietly dropped once the client has gone"""
+        if self._closed:
+            return
+        data = json.dumps(message, default=str)
+        async with self._send_lock:
+            try:
+                await self.websocket.send_text(data)
+            except (WebSocketDisconnect, RuntimeError):
+                self._closed = True
+
+    # ============ Watched Slots ============
+
+    def _watch(self, doctor_id: Any, date: Any, time: Any, doctor_name: Optional[str]) -> None:
+        if not doctor_id or not date or not time:
+            return
+        key = (str(doctor_id), str(date), str(time))
+        self._watched.pop(key, None)
+        self._watched[key] = doctor_name
+        while len(self._watched) > MAX_WATCHED_SLOTS:
+            del self._watched[next(iter(self._watched))]
+
+    def _watch_result(self, name: str, result: Dict[str, Any]) -> None:
+        """Remember the open slots a lookup showed to the client"""
+        if result.get("error"):
+            return
+        if name == "get_available_slots":
+            for time, doctors in (result.get("available_slots") or {}).items():
+                for doctor in doctors:
+                    self._watch(doctor.get("doctor_id"), result.get("date"), time, doctor.get("doctor_name"))
+        elif name == "find_next_available":
+            for slot in result.get("next_available") or []:
+                for doctor in slot.get("doctors") or []:
+                    self._watch(doctor.get("doctor_id"), slot.get("date"), slot.get("time"), doctor.get("doctor_name"))
+
+    def _unwatch_booking(self, args: Dict[str, Any]) -> None:
+        """The client is booking this date and time itself - that is not news to it"""
+        try:
+            time = slot_to_time(time_to_slot(str(args.get("time"))))
+        except ValueError:
+            return  # Rejected by validation anyway
+        date = str(args.get("date"))
+        for key in [key for key in self._watched if key[1:] == (date, time)]:
+            del self._watched[key]
+
+    async def _pump_events(self, subscription: Subscription) -> None:
+        while True:
+            event = await subscription.get()
+            if event["event"] != "slot_taken":
+                continue
+            key = (event["doctor_id"], event["date"], event["time"])
+            if key not in self._watched:
+                continue
+            doctor_name = self._watched.pop(key)
+            await self.send({"type": "event", **event, "doctor_name": doctor_name})
+
+    # ============ Calls ============
+
+    async def _call(self, request_id: Any, name: str, args: Any, budget: Optional[float]) -> None:
+        try:
+            # Waited for here rather than in the receive loop, so cancels are
+            # still read while every in-flight slot is taken
+            async with self._in_flight:
+                if name == "book_appointment" and isinstance(args, dict):
+                    self._unwatch_booking(args)
+                with deadline_scope(budget):
+                    async for event, data in stream_tool(name, args):
+                        if event == "token":
+                            await self.send({"type": "token", "id": request_id, "text": data["text"]})
+                        else:
+                            self._watch_result(name, data)
+                            await self.send({"type": "result", "id": request_id, "result": data})
+        except asyncio.CancelledError:
+            pass
+
+    async def _handle(self, raw: Any) -> None:
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            await self.send({"type": "error", "id": None, "message": "Messages must be JSON"})
+            return
+        if not isinstance(message, dict):
+            await self.send({"type": "error", "id": None, "message": "Messages must be JSON objects"})
+            return
+
+        request_id = message.get("id")
+        kind = message.get("type")
+        if not isinstance(request_id, (str, int, type(None))):
+            await self.send({"type": "error", "id": None, "message": "'id' must be a string or number"})
+            return
+
+        if kind == "cancel":
+            task = self._calls.get(request_id)
+            if task is not None:
+                task.cancel()
+            return
+
+        if kind != "call":
+            await self.send({"type": "error", "id": request_id, "message": f"Unknown message type: {kind}"})
+            return
+        if request_id is None or not isinstance(message.get("name"), str):
+            await self.send({"type": "error", "id": request_id, "message": "A call needs an 'id' and a 'name'"})
+            return
+        if request_id in self._calls:
+            await self.send({"type": "error", "id": request_id, "message": f"Call {request_id} is already running"})
+            return
+        if len(self._calls) >= MAX_PENDING_CALLS:
+            await self.send({"type": "error", "id": request_id, "message": "Too many calls pending on this connection"})
+            return
+
+        args = message.get("args")
+        task = asyncio.create_task(self._call(
+            request_id,
+            message["name"],
+            {} if args is None else args,
+            parse_budget_ms(message.get("deadline_ms"))
+        ))
+        self._calls[request_id] = task
+        task.add_done_callback(lambda done: self._finished(request_id, done))
+
+    def _finished(self, request_id: Any, task: asyncio.Task) -> None:
+        if self._calls.get(request_id) is task:
+            del self._calls[request_id]
+
+    async def serve(self) -> None:
+        """Accept the connection and serve it until the client disconnects"""
+        await self.websocket.accept()
+        bus = get_event_bus()
+        subscription = bus.subscribe()
+        pump = asyncio.create_task(self._pump_events(subscription))
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                await self._handle(message.get("text") or message.get("bytes"))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closed = True
+            bus.unsubscribe(subscription)
+            pump.cancel()
+            for task in list(self._calls.values()):
+                task.cancel()
+
+
+async def serve_websocket(websocket: WebSocket) -> None:
+    """Serve one chat session on websocket"""
+    await ChatSession(websocket).serve()
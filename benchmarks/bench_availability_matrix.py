@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Availability Matrix Benchmark for Healthcare MCP Server
+Times AvailabilityMatrix against a per-slot Python scan on a synthetic roster
+
+Usage:
+    python benchmarks/bench_availability_matrix.py                  # 1,000 doctors x 90 days
+    python benchmarks/bench_availability_matrix.py --doctors 5000 --days 180
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Everything below runs on synthetic rows and makes no database calls, but
+# importing the tools module constructs the Supabase client
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from seed_database import generate_roster, _split_doctor  # noqa: E402
+from backend.occupancy import SLOT_MINUTES, SLOTS_PER_DAY, slot_to_time  # noqa: E402
+from backend.tools.doctors import AvailabilityMatrix  # noqa: E402
+
+
+def synthetic_inputs(doctor_count, days, fill_rate, seed):
+    """Roster, weekly schedules, overrides and appointments for the benchmark"""
+    rng = random.Random(seed)
+    start = date.today()
+
+    doctors, weekly = [], {}
+    for entry in generate_roster(doctor_count, seed=seed):
+        doctor, rows = _split_doctor(entry)
+        doctors.append(doctor)
+        weekly[doctor["id"]] = rows
+
+    overrides = {}
+    for doctor in rng.sample(doctors, k=doctor_count // 10):
+        day = start + timedelta(days=rng.randrange(days))
+        overrides[(doctor["id"], day.isoformat())] = {"is_available": rng.random() < 0.3}
+
+    appointments = []
+    for doctor in doctors:
+        for n in range(days):
+            for slot in range(36, 68):  # 09:00-17:00
+                if rng.random() < fill_rate:
+                    appointments.append({
+                        "doctor_id": doctor["id"],
+                        "appointment_date": (start + timedelta(days=n)).isoformat(),
+                        "appointment_time": slot_to_time(slot),
+                    })
+
+    return doctors, weekly, overrides, appointments, start
+
+
+def python_scan(doctors, weekly, overrides, appointments, start, days, minutes):
+    """Baseline: check every doctor-day-slot in Python, like looping over check_doctor_conflict"""
+    booked = {(row["doctor_id"], row["appointment_date"], row["appointment_time"]) for row in appointments}
+    length = -(-minutes // SLOT_MINUTES)
+    matches = 0
+
+    for doctor in doctors:
+        for n in range(days):
+            day = start + timedelta(days=n)
+            if day.weekday() >= 5:
+                continue
+            override = overrides.get((doctor["id"], day.isoformat()))
+            if override is not None and not override["is_available"]:
+                continue
+
+            working = set()
+            for row in weekly[doctor["id"]]:
+                if row["day_of_week"] == day.weekday():
+                    first = int(row["start_time"][:2]) * 4
+                    last = int(row["end_time"][:2]) * 4
+                    working.update(range(first, last))
+            if override is not None and not working:
+                working.update(range(36, 68))
+
+            run = 0
+            for slot in range(SLOTS_PER_DAY):
+                free = slot in working and (doctor["id"], day.isoformat(), slot_to_time(slot)) not in booked
+                run = run + 1 if free else 0
+                if run >= length:
+                    matches += 1
+                    break
+
+    return matches
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"   {label:<42} {elapsed * 1000:>10.1f} ms")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy availability matrix")
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--minutes", type=int, default=45, help="Consecutive free time to search for")
+    parser.add_argument("--fill-rate", type=float, default=0.6, help="Share of working slots already booked")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-baseline", action="store_true", help="Only time the matrix")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"📊 Availability matrix: {args.doctors} doctors x {args.days} days x {SLOTS_PER_DAY} slots")
+    print("=" * 60)
+
+    doctors, weekly, overrides, appointments, start = synthetic_inputs(
+        args.doctors, args.days, args.fill_rate, args.seed
+    )
+    print(f"   {len(appointments):,} appointments, {len(overrides):,} overrides\n")
+
+    matrix, _ = timed("build matrix", lambda: AvailabilityMatrix.build(
+        doctors, weekly, overrides, appointments, start, args.days
+    ))
+    by_day, matrix_time = timed(
+        f"doctors free {args.minutes} min (all days)",
+        lambda: matrix.doctors_free_for(args.minutes)
+    )
+    timed("open capacity per day (cardiology)", lambda: matrix.capacity_by_day("cardiology"))
+    best, _ = timed("day with most open cardiology capacity", lambda: matrix.most_open_day("cardiology"))
+
+    matrix_matches = sum(len(day["doctors"]) for day in by_day)
+    print(f"\n   {matrix_matches:,} doctor-days with {args.minutes} free minutes; best cardiology day: {best}")
+
+    if not args.skip_baseline:
+        print()
+        baseline_matches, baseline_time = timed(
+            "per-slot Python scan (baseline)",
+            lambda: python_scan(doctors, weekly, overrides, appointments, start, args.days, args.minutes)
+        )
+        assert baseline_matches == matrix_matches, (baseline_matches, matrix_matches)
+        print(f"\n   ✅ Same answer, {baseline_time / matrix_time:.0f}x faster query")
+
+
+if __name__ == "__main__":
+    main()
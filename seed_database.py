@@ -2,41 +2,191 @@
 """
 Database Seeding Script for Healthcare MCP Server
 Run this after setting up Supabase tables to populate initial data
+
+Usage:
+    python seed_database.py                              # Built-in 8-doctor roster
+    python seed_database.py --roster doctors.json        # Load a roster from JSON or CSV
+    python seed_database.py --generate 5000 --output roster.json   # Build a synthetic roster
 """
 
+import argparse
+import csv
+import json
 import os
+import random
 import sys
+import time
 from dotenv import load_dotenv
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from backend.database import get_db
-
 load_dotenv()
 
+DEFAULT_WORKING_DAYS = [0, 1, 2, 3, 4]  # Monday-Friday
+DEFAULT_START_TIME = "09:00"
+DEFAULT_END_TIME = "17:00"
+
+# Generated shifts stay within bookable hours: Monday-Friday, 08:00 to the
+# 17:45 slot (end times are exclusive)
+CLINIC_DAYS = range(5)
+CLINIC_OPEN_HOUR = 8
+CLINIC_CLOSE_HOUR = 18
+
+SPECIALTIES = [
+    "cardiology", "dermatology", "orthopedics", "pediatrics", "general practice",
+    "neurology", "oncology", "psychiatry", "ophthalmology", "gastroenterology",
+]
+FIRST_NAMES = [
+    "Sarah", "Michael", "Emily", "James", "Priya", "Robert", "Lisa", "David", "Aisha", "Carlos",
+    "Mei", "Omar", "Hannah", "Raj", "Sofia", "Daniel", "Fatima", "Lucas", "Grace", "Kenji",
+]
+LAST_NAMES = [
+    "Johnson", "Chen", "Davis", "Wilson", "Patel", "Brown", "Anderson", "Kim", "Khan", "Garcia",
+    "Nguyen", "Singh", "Müller", "Rossi", "Okafor", "Silva", "Cohen", "Tanaka", "Ali", "Martin",
+]
+
+
+# ============ Roster Files ============
+
+def _schedule_rows(doctor_id, days, start_time, end_time):
+    return [
+        {
+            "doctor_id": doctor_id,
+            "day_of_week": int(day),
+            "start_time": start_time,
+            "end_time": end_time,
+            "is_available": True,
+        }
+        for day in days
+    ]
+
+
+def _split_doctor(entry):
+    """Split a roster entry into its doctor row and schedule rows"""
+    doctor = {
+        "id": entry["id"],
+        "name": entry["name"],
+        "specialty": entry["specialty"].strip().lower(),
+        "email": entry.get("email") or None,
+        "years_experience": int(entry["years_experience"]) if entry.get("years_experience") else None,
+    }
+
+    schedules = entry.get("schedules")
+    if schedules:
+        rows = [
+            {
+                "doctor_id": doctor["id"],
+                "day_of_week": int(s["day_of_week"]),
+                "start_time": s["start_time"],
+                "end_time": s["end_time"],
+                "is_available": s.get("is_available", True),
+            }
+            for s in schedules
+        ]
+    else:
+        days = entry.get("working_days") or DEFAULT_WORKING_DAYS
+        if isinstance(days, str):
+            days = [day for day in days.replace(",", "|").split("|") if day.strip()]
+        rows = _schedule_rows(
+            doctor["id"],
+            days,
+            entry.get("start_time") or DEFAULT_START_TIME,
+            entry.get("end_time") or DEFAULT_END_TIME,
+        )
+
+    return doctor, rows
+
+
+def load_roster(path):
+    """
+    Load doctors and schedules from a JSON or CSV roster file.
+
+    JSON: a list of doctors, each optionally with a "schedules" list of
+    {day_of_week, start_time, end_time} entries.
+    CSV: columns id,name,specialty,email,years_experience and optionally
+    working_days (e.g. "0|1|2|3|4"), start_time, end_time.
+
+    Returns:
+        Tuple of (doctors, schedules)
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            entries = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+
+    doctors, schedules = [], []
+    for entry in entries:
+        doctor, rows = _split_doctor(entry)
+        doctors.append(doctor)
+        schedules.extend(rows)
+    return doctors, schedules
+
+
+def generate_roster(count, seed=42):
+    """Build a synthetic roster of `count` doctors with varied weekly schedules"""
+    rng = random.Random(seed)
+    roster = []
+
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        start_hour = CLINIC_OPEN_HOUR + rng.choice([0, 0, 1, 1, 1, 2])
+        shift_hours = min(rng.choice([6, 7, 8, 8, 9]), CLINIC_CLOSE_HOUR - start_hour)
+        days = sorted(rng.sample(CLINIC_DAYS, rng.choice([3, 4, 5, 5, 5])))
+
+        roster.append({
+            "id": f"doc_{i:05d}",
+            "name": f"Dr. {first} {last}",
+            "specialty": rng.choice(SPECIALTIES),
+            "email": f"{first.lower()}.{last.lower()}.{i}@healthcare.com",
+            "years_experience": rng.randint(1, 35),
+            "schedules": [
+                {
+                    "day_of_week": day,
+                    "start_time": f"{start_hour:02d}:00",
+                    "end_time": f"{start_hour + shift_hours:02d}:00",
+                }
+                for day in days
+            ],
+        })
+
+    return roster
+
+
+# ============ Seeding ============
+
+def seed_all(roster_path=None, batch_size=None):
+    """Seed all database tables, from the built-in data or a roster file"""
+    from backend.database import get_db
 
-def seed_all():
-    """Seed all database tables with initial data"""
     print("=" * 60)
     print("🏥 Healthcare MCP Server - Database Seeder")
     print("=" * 60)
     
     db = get_db()
+    doctors = schedules = None
+
+    if roster_path:
+        doctors, schedules = load_roster(roster_path)
+        print(f"\n📂 Loaded {len(doctors)} doctors and {len(schedules)} schedules from {roster_path}")
     
     try:
+        started = time.perf_counter()
+
         # Seed doctors
         print("\n📋 Step 1: Seeding doctors...")
-        doctor_count = db.seed_doctors()
+        doctor_count = db.seed_doctors(doctors, batch_size=batch_size)
         print(f"   ✅ Seeded {doctor_count} doctors")
         
         # Seed schedules
         print("\n📅 Step 2: Seeding doctor schedules...")
-        schedule_count = db.seed_schedules()
+        schedule_count = db.seed_schedules(schedules, batch_size=batch_size)
         print(f"   ✅ Seeded {schedule_count} schedules")
         
         print("\n" + "=" * 60)
-        print("✨ Database seeding complete!")
+        print(f"✨ Database seeding complete in {time.perf_counter() - started:.1f}s!")
         print("=" * 60)
         print("\nNext steps:")
         print("1. Start the server: ./start.sh")
@@ -53,6 +203,8 @@ def seed_all():
 
 def verify_connection():
     """Verify database connection works"""
+    from backend.database import get_db
+
     print("\n🔌 Testing database connection...")
     try:
         db = get_db()
@@ -65,7 +217,29 @@ def verify_connection():
         return False
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed the Healthcare MCP Supabase database")
+    parser.add_argument("--roster", help="JSON or CSV roster file to load instead of the built-in doctors")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Rows per upsert request (default: SEED_BATCH_SIZE or 500)")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="Write a synthetic roster of N doctors to --output and exit")
+    parser.add_argument("--output", default="roster.json", help="Where --generate writes the roster")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for --generate")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
+    if args.generate:
+        roster = generate_roster(args.generate, seed=args.seed)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(roster, f)
+        print(f"✅ Wrote {len(roster)} doctors to {args.output}")
+        print(f"   Seed it with: python seed_database.py --roster {args.output}")
+        sys.exit(0)
+
     print("\nChecking environment...")
     
     # Check env vars
@@ -78,7 +252,7 @@ if __name__ == "__main__":
         sys.exit(1)
     
     if verify_connection():
-        seed_all()
+        seed_all(roster_path=args.roster, batch_size=args.batch_size)
     else:
         print("\nPlease check your Supabase credentials and try again.")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -88,6 +88,42 @@ CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(appointment_dat
 CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments(status);
 CREATE INDEX IF NOT EXISTS idx_appointments_datetime ON appointments(appointment_date, appointment_time);
 
+-- At most one active appointment per doctor-slot. Double bookings fail with a
+-- unique violation, and conflict checks become index-only lookups.
+-- Existing double bookings would make the index fail to build, so stop with a
+-- clear message instead; see "Existing double bookings" in SUPABASE_SETUP.md.
+DO $$
+DECLARE
+    v_duplicates INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO v_duplicates
+    FROM (
+        SELECT 1 FROM appointments
+        WHERE status <> 'cancelled'
+        GROUP BY doctor_id, appointment_date, appointment_time
+        HAVING COUNT(*) > 1
+    ) AS taken_twice;
+
+    IF v_duplicates > 0 THEN
+        RAISE EXCEPTION '% doctor slot(s) have more than one active appointment', v_duplicates
+            USING HINT = 'Cancel the extra bookings (see SUPABASE_SETUP.md, "Existing double bookings"), then re-run this script';
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_appointments_active_slot
+    ON appointments(doctor_id, appointment_date, appointment_time)
+    WHERE status <> 'cancelled';
+
+-- ============================================================
+-- OPTIONAL: SERVER-SIDE FUZZY DOCTOR SEARCH (pg_trgm)
+-- The backend resolves names from an in-memory trigram index; these GIN
+-- indexes only help deployments that search doctors with ILIKE/similarity()
+-- in SQL. Uncomment to enable; requires the pg_trgm extension.
+-- ============================================================
+-- CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- CREATE INDEX IF NOT EXISTS idx_doctors_name_trgm ON doctors USING gin (name gin_trgm_ops);
+-- CREATE INDEX IF NOT EXISTS idx_doctors_specialty_trgm ON doctors USING gin (specialty gin_trgm_ops);
+
 -- ============================================================
 -- ROW LEVEL SECURITY POLICIES
 -- ============================================================
@@ -139,4 +175,145 @@ DROP TRIGGER IF EXISTS update_appointments_updated_at ON appointments;
 CREATE TRIGGER update_appointments_updated_at
     BEFORE UPDATE ON appointments
     FOR EACH ROW
-    EXECUTE FUNCTION update_updated_at_column();
\ No newline at end of file
+    EXECUTE FUNCTION update_updated_at_column();
+-- ============================================================
+-- FUNCTION: try_insert_appointment (NULL when the slot is taken)
+-- ============================================================
+CREATE OR REPLACE FUNCTION try_insert_appointment(
+    p_confirmation_number TEXT,
+    p_patient_id TEXT,
+    p_doctor_id TEXT,
+    p_date DATE,
+    p_time TIME,
+    p_specialty TEXT,
+    p_reason TEXT
+)
+RETURNS appointments AS $$
+DECLARE
+    v_appointment appointments%ROWTYPE;
+    v_constraint TEXT;
+BEGIN
+    INSERT INTO appointments (
+        confirmation_number, patient_id, doctor_id, appointment_date,
+        appointment_time, specialty, reason, status
+    ) VALUES (
+        p_confirmation_number, p_patient_id, p_doctor_id, p_date,
+        p_time, p_specialty, p_reason, 'confirmed'
+    )
+    RETURNING * INTO v_appointment;
+    RETURN v_appointment;
+EXCEPTION WHEN unique_violation THEN
+    GET STACKED DIAGNOSTICS v_constraint = CONSTRAINT_NAME;
+    IF v_constraint = 'idx_appointments_active_slot' THEN
+        RETURN NULL;
+    END IF;
+    RAISE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================
+-- FUNCTION: book_slot (validate + assign + insert in one transaction)
+-- Called by the backend through client.rpc("book_slot", ...)
+-- ============================================================
+CREATE OR REPLACE FUNCTION book_slot(
+    p_confirmation_number TEXT,
+    p_patient_id TEXT,
+    p_date DATE,
+    p_time TIME,
+    p_specialty TEXT,
+    p_reason TEXT DEFAULT NULL,
+    p_doctor_id TEXT DEFAULT NULL,
+    p_candidates TEXT[] DEFAULT NULL  -- auto-assign preference order from the backend's assignment strategy
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_doctor doctors%ROWTYPE;
+    v_appointment appointments%ROWTYPE;
+    v_weekday INTEGER := EXTRACT(ISODOW FROM p_date)::INTEGER - 1; -- 0=Monday
+BEGIN
+    IF p_doctor_id IS NOT NULL THEN
+        SELECT * INTO v_doctor FROM doctors WHERE id = p_doctor_id;
+        IF NOT FOUND THEN
+            RETURN jsonb_build_object('status', 'doctor_not_found');
+        END IF;
+
+        IF lower(v_doctor.specialty) <> lower(p_specialty) THEN
+            RETURN jsonb_build_object('status', 'specialty_mismatch', 'doctor', to_jsonb(v_doctor));
+        END IF;
+
+        -- The active-slot unique index decides conflicts
+        v_appointment := try_insert_appointment(
+            p_confirmation_number, p_patient_id, v_doctor.id, p_date, p_time, p_specialty, p_reason
+        );
+        IF v_appointment.id IS NULL THEN
+            RETURN jsonb_build_object('status', 'conflict', 'doctor', to_jsonb(v_doctor));
+        END IF;
+    ELSE
+        -- Auto-assign: free working doctors in the specialty, in p_candidates order
+        -- (other free doctors after them), or least booked that day first without it.
+        -- Mirrors backend/availability.py: end times are exclusive, a doctor_availability
+        -- row with is_available = false takes the day off, and one with is_available = true
+        -- opens 09:00-17:00 on a day without weekly hours.
+        FOR v_doctor IN
+            SELECT d.*
+            FROM doctors d
+            LEFT JOIN doctor_availability o
+              ON o.doctor_id = d.id
+             AND o.date = p_date
+            WHERE d.specialty = lower(p_specialty)
+              AND coalesce(o.is_available, TRUE)
+              AND (
+                  EXISTS (
+                      SELECT 1 FROM doctor_schedules s
+                      WHERE s.doctor_id = d.id
+                        AND s.day_of_week = v_weekday
+                        AND s.is_available
+                        AND p_time >= s.start_time AND p_time < s.end_time
+                  )
+                  OR (
+                      o.is_available
+                      AND p_time >= TIME '09:00' AND p_time < TIME '17:00'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM doctor_schedules s
+                          WHERE s.doctor_id = d.id
+                            AND s.day_of_week = v_weekday
+                            AND s.is_available
+                      )
+                  )
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM appointments a
+                  WHERE a.doctor_id = d.id
+                    AND a.appointment_date = p_date
+                    AND a.appointment_time = p_time
+                    AND a.status <> 'cancelled'
+              )
+            ORDER BY
+                array_position(p_candidates, d.id) NULLS LAST,
+                CASE WHEN p_candidates IS NULL THEN (
+                    SELECT count(*) FROM appointments a
+                    WHERE a.doctor_id = d.id
+                      AND a.appointment_date = p_date
+                      AND a.status <> 'cancelled'
+                ) END,
+                d.id
+        LOOP
+            v_appointment := try_insert_appointment(
+                p_confirmation_number, p_patient_id, v_doctor.id, p_date, p_time, p_specialty, p_reason
+            );
+            -- Taken concurrently? Try the next candidate
+            EXIT WHEN v_appointment.id IS NOT NULL;
+        END LOOP;
+
+        IF v_appointment.id IS NULL THEN
+            RETURN jsonb_build_object('status', 'unavailable');
+        END IF;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'status', 'booked',
+        'doctor', to_jsonb(v_doctor),
+        'appointment', to_jsonb(v_appointment)
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,12 @@
+"""
+Shared test setup
+The backend reads its configuration at import time, so dummy credentials are
+set before any backend module is imported. No test talks to Supabase or Mistral.
+"""
+
+import os
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("MISTRAL_API_KEY", "your-mistral-api-key-here")
+os.environ.setdefault("BOOKINGS_REPLAY_ENABLED", "false")
@@ -0,0 +1,65 @@
+"""
+Assignment strategies: the base class is abstract and a bad ASSIGNMENT_STRATEGY fails loudly
+"""
+
+import pytest
+
+from backend import assignment
+from backend.occupancy import OccupancyIndex
+from backend.tools import booking
+
+DOCTORS = [
+    {"id": "doc_2", "specialty": "cardiology", "years_experience": 20},
+    {"id": "doc_1", "specialty": "cardiology", "years_experience": 0},
+]
+
+
+@pytest.fixture
+def unset_strategy(monkeypatch):
+    monkeypatch.setattr(assignment, "_strategy", None)
+
+
+def test_base_strategy_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        assignment.AssignmentStrategy()
+
+
+def test_strategy_without_order_cannot_be_instantiated():
+    class Incomplete(assignment.AssignmentStrategy):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_least_booked_prefers_the_quieter_doctor():
+    occupancy = OccupancyIndex()
+    occupancy.load_day(["doc_1", "doc_2"], "2030-01-07", [
+        {"doctor_id": "doc_1", "appointment_date": "2030-01-07", "appointment_time": "09:00"},
+    ])
+
+    ordered = assignment.LeastBookedStrategy().order(DOCTORS, "2030-01-07", occupancy)
+
+    assert [doctor["id"] for doctor in ordered] == ["doc_2", "doc_1"]
+
+
+def test_unknown_strategy_names_the_choices(monkeypatch, unset_strategy):
+    monkeypatch.setenv("ASSIGNMENT_STRATEGY", "fastest")
+
+    with pytest.raises(ValueError, match="Unknown ASSIGNMENT_STRATEGY 'fastest'.*least_booked"):
+        assignment.get_assignment_strategy()
+
+
+def test_auto_assigned_booking_does_not_swallow_a_bad_strategy(monkeypatch, unset_strategy):
+    monkeypatch.setenv("ASSIGNMENT_STRATEGY", "fastest")
+
+    class NoDatabase:
+        occupancy = OccupancyIndex()
+
+        def get_available_doctors(self, specialty, date, time):
+            raise AssertionError("ranking should not start without a strategy")
+
+    monkeypatch.setattr(booking, "get_db", lambda: NoDatabase())
+
+    with pytest.raises(ValueError, match="ASSIGNMENT_STRATEGY"):
+        booking.book(user_id="patient-1", date="2030-01-07", time="10:00", specialty="cardiology")
@@ -0,0 +1,35 @@
+"""
+AsyncDatabase sends every query through its one pooled httpx client
+"""
+
+import asyncio
+import sys
+
+import httpx
+
+from backend.database import AsyncDatabase
+
+
+def test_postgrest_uses_the_pooled_client_and_opens_no_other(monkeypatch):
+    opened = []
+
+    class CountingClient(httpx.AsyncClient):
+        def __init__(self, *args, **kwargs):
+            opened.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", CountingClient)
+    monkeypatch.setattr(sys.modules["postgrest._async.client"], "AsyncClient", CountingClient)
+
+    async def scenario():
+        adb = object.__new__(AsyncDatabase)  # Skip the singleton
+        adb._init_client()
+        try:
+            return adb
+        finally:
+            await adb.aclose()
+
+    adb = asyncio.run(scenario())
+
+    assert len(opened) == 1 and opened[0] is adb.http
+    assert adb.client.session is adb.http
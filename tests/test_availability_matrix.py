@@ -0,0 +1,101 @@
+"""
+AvailabilityMatrix: the open-time search behind find_next_available and the capacity queries
+"""
+
+from datetime import date
+
+import pytest
+
+from backend.availability import window_mask
+from backend.occupancy import time_to_slot
+from backend.tools.doctors import AvailabilityMatrix, _parse_search
+
+MONDAY = date(2030, 1, 7)
+DOCTORS = [
+    {"id": "doc_1", "name": "Ada Heart", "specialty": "cardiology"},
+    {"id": "doc_2", "name": "Ben Skin", "specialty": "dermatology"},
+]
+WEEKLY = {
+    doctor["id"]: [
+        {"day_of_week": day, "start_time": "09:00", "end_time": "10:00", "is_available": True}
+        for day in range(5)
+    ]
+    for doctor in DOCTORS
+}
+
+
+def _matrix(overrides=None, appointments=(), days=7):
+    return AvailabilityMatrix.build(DOCTORS, WEEKLY, overrides or {}, list(appointments), MONDAY, days)
+
+
+def _times(slots):
+    return [(slot["date"], slot["time"], [doctor["doctor_id"] for doctor in slot["doctors"]]) for slot in slots]
+
+
+def test_open_times_are_chronological_with_every_free_doctor():
+    slots = _matrix(appointments=[
+        {"doctor_id": "doc_1", "appointment_date": "2030-01-07", "appointment_time": "09:00:00"},
+    ]).next_open_times(3)
+
+    assert _times(slots) == [
+        ("2030-01-07", "09:00", ["doc_2"]),
+        ("2030-01-07", "09:15", ["doc_1", "doc_2"]),
+        ("2030-01-07", "09:30", ["doc_1", "doc_2"]),
+    ]
+    assert slots[0]["doctors"][0]["doctor_name"] == "Ben Skin"
+
+
+def test_windows_and_earliest_slot_limit_the_search():
+    slots = _matrix().next_open_times(
+        3, allowed=window_mask([("09:30", "10:00")]), earliest_slot=time_to_slot("09:45")
+    )
+
+    assert [(slot["date"], slot["time"]) for slot in slots] == [
+        ("2030-01-07", "09:45"),
+        ("2030-01-08", "09:30"),
+        ("2030-01-08", "09:45"),
+    ]
+
+
+def test_day_off_and_weekends_have_no_open_times():
+    overrides = {(doctor["id"], "2030-01-07"): {"is_available": False} for doctor in DOCTORS}
+    overrides[("doc_1", "2030-01-12")] = {"is_available": True}   # Saturday: the clinic is closed
+
+    slots = _matrix(overrides).next_open_times(100)
+
+    assert {slot["date"] for slot in slots} == {"2030-01-08", "2030-01-09", "2030-01-10", "2030-01-11"}
+
+
+def test_extra_clinic_day_opens_default_hours():
+    weekly = {"doc_1": []}
+    matrix = AvailabilityMatrix.build(DOCTORS[:1], weekly, {("doc_1", "2030-01-08"): {"is_available": True}}, [], MONDAY, 7)
+
+    slots = matrix.next_open_times(1)
+
+    assert (slots[0]["date"], slots[0]["time"]) == ("2030-01-08", "09:00")
+
+
+def test_most_open_day_is_the_day_with_the_most_free_slots():
+    appointments = [
+        {"doctor_id": "doc_1", "appointment_date": day, "appointment_time": "09:00"}
+        for day in ("2030-01-07", "2030-01-08", "2030-01-10", "2030-01-11")
+    ]
+
+    assert _matrix(appointments=appointments).most_open_day("cardiology") == {"date": "2030-01-09", "open_slots": 4}
+    assert _matrix({("doc_1", f"2030-01-{day:02d}"): {"is_available": False} for day in range(7, 14)}) \
+        .most_open_day("cardiology") is None
+
+
+@pytest.mark.parametrize("window", ["12:00-09:00", "09:00-09:00"])
+def test_window_that_does_not_start_before_it_ends_is_rejected(window):
+    search, error = _parse_search("cardiology", None, None, 14, 5, ["08:00-10:00", window])
+
+    assert search is None
+    assert error["message"] == f"Invalid time window: {window} (start must be before end)"
+
+
+def test_windows_with_unpadded_hours_are_accepted():
+    search, error = _parse_search("cardiology", None, None, 14, 5, ["9:00-12:00"])
+
+    assert error is None
+    assert search["allowed"] == window_mask([("9:00", "12:00")])
@@ -0,0 +1,157 @@
+"""
+Bookings that run out of time must not reach the fallback log
+A book_slot() or insert that timed out waiting for an answer may still have
+committed, so replaying a fallback copy later could double-book the slot. One
+that timed out connecting never reached the database and falls back as usual.
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+from backend import deadline
+from backend.database import RpcUnavailableError
+from backend.mcp import call_tool
+from backend.occupancy import OccupancyIndex
+from backend.tools import booking
+
+DOCTOR = {"id": "doc_1", "name": "Ada Heart", "specialty": "cardiology"}
+DATE = (date.today() + timedelta(days=7)).isoformat()
+
+
+class FakeDatabase:
+    """Stands in for Database; book_slot and create_appointment raise what the test asks for"""
+
+    def __init__(self, book_slot_error=None, insert_error=None):
+        self.book_slot_error = book_slot_error
+        self.insert_error = insert_error
+        self.occupancy = OccupancyIndex()
+        self.inserted = []
+
+    def get_available_doctors(self, specialty, date, time):
+        return [DOCTOR]
+
+    def get_doctor_by_id(self, doctor_id):
+        return DOCTOR
+
+    def book_slot(self, booking_data, candidates=None):
+        raise self.book_slot_error
+
+    def create_appointment(self, booking_data):
+        if self.insert_error:
+            raise self.insert_error
+        self.inserted.append(dict(booking_data))
+        return booking_data
+
+
+class FakeAsyncDatabase(FakeDatabase):
+    async def get_available_doctors(self, specialty, date, time):
+        return [DOCTOR]
+
+    async def get_doctor_by_id(self, doctor_id):
+        return DOCTOR
+
+    async def book_slot(self, booking_data, candidates=None):
+        raise self.book_slot_error
+
+    async def create_appointment(self, booking_data):
+        return FakeDatabase.create_appointment(self, booking_data)
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """Bookings written to the fallback log"""
+    saved = []
+    monkeypatch.setattr(booking, "save_booking", lambda data: saved.append(dict(data)) or data)
+    return saved
+
+
+def _use(monkeypatch, db):
+    monkeypatch.setattr(booking, "get_db", lambda: db)
+    monkeypatch.setattr(booking, "get_async_db", lambda: db)
+    return db
+
+
+def _book(**overrides):
+    args = {"user_id": "patient-1", "date": DATE, "time": "10:00", "specialty": "cardiology"}
+    args.update(overrides)
+    return booking.book(**args)
+
+
+def test_deadline_in_book_slot_is_raised_not_retried(monkeypatch, fallback):
+    db = _use(monkeypatch, FakeDatabase(book_slot_error=deadline.DeadlineExceeded("Deadline exceeded")))
+
+    with pytest.raises(deadline.DeadlineExceeded):
+        _book()
+
+    assert db.inserted == []
+    assert fallback == []
+
+
+def test_http_timeout_in_book_slot_is_raised(monkeypatch, fallback):
+    _use(monkeypatch, FakeDatabase(book_slot_error=httpx.ReadTimeout("timed out")))
+
+    with pytest.raises(httpx.TimeoutException):
+        _book(doctor_id="doc_1")
+
+    assert fallback == []
+
+
+def test_timeout_on_step_by_step_insert_skips_fallback(monkeypatch, fallback):
+    _use(monkeypatch, FakeDatabase(
+        book_slot_error=RpcUnavailableError("book_slot"),
+        insert_error=httpx.WriteTimeout("timed out"),
+    ))
+
+    with pytest.raises(httpx.TimeoutException):
+        _book()
+
+    assert fallback == []
+
+
+@pytest.mark.parametrize("error", [httpx.ConnectTimeout("connect timed out"), httpx.PoolTimeout("no connection")])
+def test_request_that_never_reached_the_database_uses_fallback(monkeypatch, fallback, error):
+    _use(monkeypatch, FakeDatabase(book_slot_error=error, insert_error=error))
+
+    result = _book()
+
+    assert result["confirmation_number"].startswith("APT-")
+    assert [row["confirmation_number"] for row in fallback] == [result["confirmation_number"]]
+
+
+def test_outage_still_uses_fallback(monkeypatch, fallback):
+    _use(monkeypatch, FakeDatabase(
+        book_slot_error=RpcUnavailableError("book_slot"),
+        insert_error=ConnectionError("connection refused"),
+    ))
+
+    result = _book()
+
+    assert result["confirmation_number"].startswith("APT-")
+    assert [row["confirmation_number"] for row in fallback] == [result["confirmation_number"]]
+
+
+def test_call_tool_reports_timed_out_booking_as_deadline_error(monkeypatch, fallback):
+    _use(monkeypatch, FakeDatabase(book_slot_error=httpx.ReadTimeout("timed out")))
+
+    result = call_tool("book_appointment", {
+        "user_id": "patient-1", "date": DATE, "time": "10:00", "specialty": "cardiology",
+    })
+
+    assert result["tool"] == "book_appointment"
+    assert "deadline" in result["error"]
+    assert fallback == []
+
+
+def test_async_booking_timeout_skips_fallback(monkeypatch, fallback):
+    _use(monkeypatch, FakeAsyncDatabase(
+        book_slot_error=RpcUnavailableError("book_slot"),
+        insert_error=deadline.DeadlineExceeded("Deadline exceeded"),
+    ))
+
+    with pytest.raises(deadline.DeadlineExceeded):
+        asyncio.run(booking.book_async(user_id="patient-1", date=DATE, time="10:00", specialty="cardiology"))
+
+    assert fallback == []
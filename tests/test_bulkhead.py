@@ -0,0 +1,87 @@
+"""
+Bulkheads: callers beyond the slots queue in order, and once the queue is full
+they are rejected at once with a retry-after hint
+"""
+
+import asyncio
+
+import pytest
+
+from backend import deadline, mcp
+from backend.bulkhead import Bulkhead, BulkheadFull
+
+
+async def _hold(bulkhead, release, order, label):
+    async with bulkhead.enter_async():
+        order.append(label)
+        await release.wait()
+
+
+def test_full_queue_rejects_immediately():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1)
+        release, order = asyncio.Event(), []
+        holders = [asyncio.create_task(_hold(bulkhead, release, order, label)) for label in ("first", "queued")]
+        await asyncio.sleep(0)
+
+        with pytest.raises(BulkheadFull) as full:
+            async with bulkhead.enter_async():
+                pass
+        stats = bulkhead.stats()
+
+        release.set()
+        await asyncio.gather(*holders)
+        return full.value, stats, order, bulkhead.stats()
+
+    full, stats, order, after = asyncio.run(scenario())
+
+    assert full.name == "test"
+    assert full.retry_after >= 1
+    assert (stats["active"], stats["queued"], stats["rejected"]) == (1, 1, 1)
+    assert order == ["first", "queued"]
+    assert (after["active"], after["queued"], after["admitted"]) == (0, 0, 2)
+
+
+def test_thread_callers_share_the_slots():
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=0)
+
+    with bulkhead.enter():
+        with pytest.raises(BulkheadFull):
+            with bulkhead.enter():
+                pass
+
+    with bulkhead.enter():
+        pass
+    assert bulkhead.stats()["rejected"] == 1
+
+
+def test_queued_caller_gives_up_at_its_deadline():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release, [], "first"))
+        await asyncio.sleep(0)
+
+        with deadline.deadline_scope(0.02):
+            with pytest.raises(asyncio.TimeoutError):
+                async with bulkhead.enter_async():
+                    pass
+        queued = bulkhead.stats()["queued"]
+
+        release.set()
+        await holder
+        return queued
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_call_tool_reports_a_full_bulkhead_as_busy(monkeypatch):
+    bulkhead = Bulkhead("booking", max_concurrent=1, max_queue=0)
+    monkeypatch.setitem(mcp.BULKHEADS, mcp.tools["cancel_appointment"]["bulkhead"], bulkhead)
+
+    with bulkhead.enter():
+        result = mcp.call_tool("cancel_appointment", {"confirmation_number": "APT-1"})
+
+    assert result["tool"] == "cancel_appointment"
+    assert result["retry_after"] >= 1
+    assert "Too many requests" in result["error"]
@@ -0,0 +1,77 @@
+"""
+/mcp/call_batch: calls run concurrently, results keep request order and a
+failing call only fails its own entry
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend import main
+
+client = TestClient(main.app)
+
+
+def _use_tools(monkeypatch, handlers):
+    async def call_tool_async(name, args):
+        return await handlers[name](args)
+
+    monkeypatch.setattr(main, "call_tool_async", call_tool_async)
+
+
+def test_failed_calls_are_isolated_and_order_is_kept(monkeypatch):
+    async def slow(args):
+        await asyncio.sleep(0.05)
+        return {"doctors": ["slow"]}
+
+    async def quick(args):
+        return {"doctors": ["quick"]}
+
+    async def broken(args):
+        raise RuntimeError("connection reset")
+
+    async def invalid(args):
+        return {"error": "Missing required field: date"}
+
+    _use_tools(monkeypatch, {"slow": slow, "quick": quick, "broken": broken, "invalid": invalid})
+
+    response = client.post("/mcp/call_batch", json={"calls": [
+        {"name": "slow"}, {"name": "broken"}, {"args": {}}, {"name": "invalid"}, {"name": "quick"},
+    ]})
+
+    assert response.json()["results"] == [
+        {"doctors": ["slow"]},
+        {"error": "Tool execution failed: connection reset"},
+        {"error": "Missing 'name' field in call"},
+        {"error": "Missing required field: date"},
+        {"doctors": ["quick"]},
+    ]
+
+
+def test_calls_run_concurrently_up_to_the_limit(monkeypatch):
+    monkeypatch.setattr(main, "MCP_BATCH_CONCURRENCY", 2)
+    running, peak = 0, 0
+
+    async def lookup(args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return {"ok": True}
+
+    _use_tools(monkeypatch, {"lookup": lookup})
+
+    response = client.post("/mcp/call_batch", json={"calls": [{"name": "lookup"}] * 5})
+
+    assert response.json()["results"] == [{"ok": True}] * 5
+    assert peak == 2
+
+
+def test_malformed_and_oversized_batches_are_rejected(monkeypatch):
+    monkeypatch.setattr(main, "MCP_BATCH_MAX_CALLS", 2)
+
+    assert client.post("/mcp/call_batch", json={"calls": []}).json() == {"error": "Missing 'calls' list in request"}
+    assert client.post("/mcp/call_batch", json={"calls": [{"name": "get_doctors"}] * 3}).json() == {
+        "error": "Too many calls in batch: 3 (max 2)"
+    }
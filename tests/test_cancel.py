@@ -0,0 +1,116 @@
+"""
+Cancelling: a cancel that does not apply is only "already cancelled" when the row says so
+"""
+
+import pytest
+
+from backend.cache import TTLCache
+from backend.database import Database
+from backend.occupancy import OccupancyIndex
+from backend.tools import booking
+
+
+class FakeQuery:
+    """A postgrest query chain over a list of rows; update() applies only where filters match"""
+
+    def __init__(self, rows, writable):
+        self.rows = rows
+        self.writable = writable
+        self.filters = []
+        self.changes = None
+
+    def update(self, changes):
+        self.changes = changes
+        return self
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(check(row) for check in self.filters)]
+        if self.changes is not None:
+            if not self.writable:
+                matched = []
+            for row in matched:
+                row.update(self.changes)
+
+        class Response:
+            data = [dict(row) for row in matched]
+        return Response()
+
+
+class FakeClient:
+    def __init__(self, rows, writable=True):
+        self.rows = rows
+        self.writable = writable
+
+    def table(self, name):
+        return FakeQuery(self.rows, self.writable)
+
+
+def _database(rows, writable=True):
+    db = object.__new__(Database)  # Skip the singleton
+    db.client = FakeClient(rows, writable)
+    db.occupancy = OccupancyIndex()
+    db.appointment_cache = TTLCache()
+    return db
+
+
+def _appointment(status):
+    return {
+        "confirmation_number": "APT-1",
+        "doctor_id": "doc_1",
+        "appointment_date": "2030-01-07",
+        "appointment_time": "09:00",
+        "status": status,
+    }
+
+
+def test_confirmed_appointment_is_cancelled():
+    rows = [_appointment("confirmed")]
+
+    outcome, row = _database(rows).cancel_appointment("APT-1", "patient asked")
+
+    assert outcome == "cancelled"
+    assert rows[0]["status"] == "cancelled"
+
+
+def test_cancelled_appointment_is_already_cancelled():
+    outcome, _ = _database([_appointment("cancelled")]).cancel_appointment("APT-1", "again")
+
+    assert outcome == "already_cancelled"
+
+
+def test_unknown_appointment_is_not_found():
+    assert _database([]).cancel_appointment("APT-1", "unknown") == ("not_found", None)
+
+
+def test_update_that_did_not_apply_is_not_reported_as_already_cancelled():
+    # Readable but not updatable, as with a row-level security policy
+    outcome, row = _database([_appointment("confirmed")], writable=False).cancel_appointment("APT-1", "x")
+
+    assert outcome == "not_cancellable"
+    assert row["status"] == "confirmed"
+
+
+@pytest.mark.parametrize("outcome, message", [
+    ("not_found", "not found"),
+    ("already_cancelled", "already cancelled"),
+    ("not_cancellable", "could not be cancelled"),
+])
+def test_failed_outcomes_are_errors(outcome, message):
+    result = booking._cancel_response(outcome, "APT-1")
+
+    assert result["error"] is True
+    assert message in result["message"]
@@ -0,0 +1,61 @@
+"""
+MCP stdio transport: cancellations are read even while every in-flight slot is taken
+"""
+
+import asyncio
+import io
+import json
+import queue
+import sys
+
+from backend import mcp_transport
+
+
+class FakeStdin:
+    """stdin whose lines are fed by the test; b"" is end of input"""
+
+    def __init__(self):
+        self.lines = queue.Queue()
+        self.buffer = self
+
+    def readline(self):
+        return self.lines.get()
+
+
+class FakeStdout:
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+
+def test_cancel_is_read_while_every_slot_is_taken(monkeypatch):
+    stdin, stdout = FakeStdin(), FakeStdout()
+    monkeypatch.setattr(sys, "stdin", stdin)
+    monkeypatch.setattr(sys, "stdout", stdout)
+    monkeypatch.setattr(mcp_transport, "MCP_MAX_IN_FLIGHT", 1)
+
+    async def handle_payload(payload):
+        if payload["method"] == "slow":
+            await asyncio.Event().wait()
+        return {"jsonrpc": "2.0", "id": payload["id"], "result": {}}
+
+    monkeypatch.setattr(mcp_transport, "handle_payload", handle_payload)
+
+    for message in (
+        {"jsonrpc": "2.0", "id": 1, "method": "slow"},
+        {"jsonrpc": "2.0", "id": 2, "method": "quick"},
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}},
+    ):
+        stdin.lines.put(json.dumps(message).encode() + b"\n")
+    stdin.lines.put(b"")
+
+    async def scenario():
+        server = asyncio.ensure_future(mcp_transport.serve_stdio())
+        try:
+            await asyncio.wait_for(asyncio.shield(server), 2)
+        finally:
+            server.cancel()
+
+    asyncio.run(scenario())
+
+    responses = [json.loads(line) for line in stdout.buffer.getvalue().splitlines()]
+    assert responses == [{"jsonrpc": "2.0", "id": 2, "result": {}}]
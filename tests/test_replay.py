@@ -0,0 +1,150 @@
+"""
+Fallback replay: duplicates are skipped, confirmation-number collisions are not
+"""
+
+import os
+
+from backend.occupancy import OccupancyIndex
+from backend.replay import ReplayWorker, replacement_number
+from backend.tools.booking import new_confirmation_number
+from backend.wal import WriteAheadLog, try_exclusive
+
+
+def _booking(number, patient="patient-1", doctor="doc_1", date="2030-01-07", time="09:00"):
+    return {
+        "confirmation_number": number,
+        "patient_id": patient,
+        "doctor_id": doctor,
+        "appointment_date": date,
+        "appointment_time": time,
+        "specialty": "cardiology",
+        "reason": None,
+        "status": "confirmed",
+    }
+
+
+class FakeDatabase:
+    """The parts of Database the replay worker uses, backed by a dict"""
+
+    def __init__(self, stored=()):
+        self.rows = {row["confirmation_number"]: row for row in stored}
+        self.occupancy = OccupancyIndex()
+        self.inserted = []
+
+    def existing_appointments(self, confirmation_numbers):
+        return {number: self.rows[number] for number in confirmation_numbers if number in self.rows}
+
+    def load_day_occupancy(self, doctor_ids, date):
+        self.occupancy.load_day(doctor_ids, date, [
+            row for row in self.rows.values() if row["appointment_date"] == date
+        ])
+
+    def insert_appointments(self, rows):
+        for row in rows:
+            self.rows[row["confirmation_number"]] = row
+            self.inserted.append(row)
+
+    def get_available_doctors(self, specialty, date, time):
+        return []
+
+
+def _replay(tmp_path, records, db):
+    wal = WriteAheadLog(str(tmp_path), commit_delay=0)
+    for record in records:
+        wal.append(record)
+    worker = ReplayWorker(wal, db=db)
+    worker.run_once()
+    return worker
+
+
+def test_already_replayed_booking_is_skipped(tmp_path):
+    # Stored with seconds on the time, as Postgres returns it
+    db = FakeDatabase([_booking("APT-1", time="09:00:00")])
+
+    worker = _replay(tmp_path, [_booking("APT-1")], db)
+
+    assert db.inserted == []
+    assert worker.stats["duplicates"] == 1
+
+
+def test_booking_logged_twice_is_inserted_once(tmp_path):
+    db = FakeDatabase()
+
+    worker = _replay(tmp_path, [_booking("APT-1"), _booking("APT-1")], db)
+
+    assert [row["confirmation_number"] for row in db.inserted] == ["APT-1"]
+    assert worker.stats["duplicates"] == 1
+
+
+def test_colliding_confirmation_number_is_renumbered_not_dropped(tmp_path):
+    other = _booking("APT-1", patient="someone-else", doctor="doc_2", time="11:00")
+    db = FakeDatabase([other])
+
+    worker = _replay(tmp_path, [_booking("APT-1")], db)
+
+    assert len(db.inserted) == 1
+    replayed = db.inserted[0]
+    assert replayed["patient_id"] == "patient-1"
+    assert replayed["confirmation_number"] != "APT-1"
+    assert db.rows["APT-1"] is other
+    assert (worker.stats["duplicates"], worker.stats["renumbered"], worker.stats["replayed"]) == (0, 1, 1)
+
+
+def test_collision_within_one_batch_keeps_both_bookings(tmp_path):
+    db = FakeDatabase()
+
+    worker = _replay(tmp_path, [_booking("APT-1"), _booking("APT-1", patient="patient-2", time="10:00")], db)
+
+    assert sorted(row["patient_id"] for row in db.inserted) == ["patient-1", "patient-2"]
+    assert len({row["confirmation_number"] for row in db.inserted}) == 2
+    assert worker.stats["renumbered"] == 1
+
+
+def test_confirmation_numbers_are_unique():
+    numbers = {new_confirmation_number() for _ in range(100_000)}
+    assert len(numbers) == 100_000
+
+
+def test_retried_batch_finds_the_renumbered_insert(tmp_path):
+    other = _booking("APT-1", patient="someone-else", doctor="doc_2", time="11:00")
+    db = FakeDatabase([other])
+    worker = _replay(tmp_path, [_booking("APT-1")], db)
+
+    # A crash before the checkpoint is saved replays the same batch again
+    os.remove(worker.checkpoint_path)
+    again = ReplayWorker(WriteAheadLog(str(tmp_path), commit_delay=0), db=db)
+    again.run_once()
+
+    assert len(db.inserted) == 1
+    assert again.stats["duplicates"] == 1
+    assert again.stats["renumbered"] == 0
+
+
+def test_renumbered_bookings_are_logged_for_follow_up(tmp_path):
+    db = FakeDatabase([_booking("APT-1", patient="someone-else", time="11:00")])
+
+    worker = _replay(tmp_path, [_booking("APT-1")], db)
+
+    new_number = db.inserted[0]["confirmation_number"]
+    assert new_number == replacement_number(_booking("APT-1"))
+    assert worker.renumbered.records() == [{
+        "original_confirmation_number": "APT-1",
+        "confirmation_number": new_number,
+        "patient_id": "patient-1",
+        "appointment_date": "2030-01-07",
+        "appointment_time": "09:00",
+    }]
+
+
+def test_only_one_process_replays_at_a_time(tmp_path):
+    db = FakeDatabase()
+    wal = WriteAheadLog(str(tmp_path), commit_delay=0)
+    wal.append(_booking("APT-1"))
+    busy, idle = ReplayWorker(wal, db=db), ReplayWorker(wal, db=db)
+
+    # Separate lock-file descriptors exclude each other like separate processes
+    with try_exclusive(busy._run_lock_fd):
+        assert idle.run_once() == 0
+    assert db.inserted == []
+
+    assert idle.run_once() == 1
@@ -0,0 +1,171 @@
+"""
+Tool result cache: writes drop what they affect, results computed across a write are
+not stored, and coalesced calls are counted apart from misses
+"""
+
+import asyncio
+
+from backend import mcp, result_cache
+from backend.cache import TTLCache
+from backend.occupancy import OccupancyIndex
+from backend.result_cache import ToolResultCache
+
+SLOTS_ARGS = {"specialty": "Cardiology", "date": "2030-01-07"}
+
+
+def _cache_result(cache, name, args, result):
+    cache.put(name, args, result, 0.01, cache.version())
+
+
+def test_equivalent_arguments_share_an_entry():
+    cache = ToolResultCache()
+    _cache_result(cache, "get_available_slots", SLOTS_ARGS, {"available_slots": {}})
+
+    assert cache.get("get_available_slots", {"specialty": " cardiology ", "date": "2030-01-07"}) is not None
+
+
+def test_errors_are_not_cached():
+    cache = ToolResultCache()
+    _cache_result(cache, "get_doctors", {}, {"error": True})
+
+    assert cache.get("get_doctors", {}) is None
+
+
+def test_booking_on_a_date_drops_that_dates_slots():
+    cache = ToolResultCache()
+    _cache_result(cache, "get_available_slots", SLOTS_ARGS, {"available_slots": {}})
+    _cache_result(cache, "get_available_slots", {**SLOTS_ARGS, "date": "2030-01-08"}, {"available_slots": {}})
+
+    cache.invalidate_tag(("slots", "2030-01-07"))
+
+    assert cache.get("get_available_slots", SLOTS_ARGS) is None
+    assert cache.get("get_available_slots", {**SLOTS_ARGS, "date": "2030-01-08"}) is not None
+
+
+def test_cancel_drops_the_cached_appointment():
+    cache = ToolResultCache()
+    _cache_result(cache, "get_appointment", {"confirmation_number": "APT-1"}, {"status": "confirmed"})
+
+    cache.invalidate_for("cancel_appointment", {"confirmation_number": " APT-1 "})
+
+    assert cache.get("get_appointment", {"confirmation_number": "APT-1"}) is None
+
+
+def test_result_computed_across_an_invalidation_is_not_stored():
+    cache = ToolResultCache()
+    version = cache.version()            # the lookup starts
+    cache.invalidate_tag(("slots", "2030-01-07"))   # a booking lands meanwhile
+
+    cache.put("get_available_slots", SLOTS_ARGS, {"available_slots": {"09:00": []}}, 0.01, version)
+
+    assert cache.get("get_available_slots", SLOTS_ARGS) is None
+
+
+def test_unrelated_invalidation_does_not_block_the_put():
+    cache = ToolResultCache()
+    version = cache.version()
+    cache.invalidate_tag(("slots", "2030-01-08"))
+
+    cache.put("get_available_slots", SLOTS_ARGS, {"available_slots": {}}, 0.01, version)
+
+    assert cache.get("get_available_slots", SLOTS_ARGS) is not None
+
+
+def test_clear_blocks_puts_that_started_before_it():
+    cache = ToolResultCache()
+    version = cache.version()
+    cache.clear()
+
+    cache.put("get_doctors", {}, {"doctors": []}, 0.01, version)
+
+    assert cache.get("get_doctors", {}) is None
+
+
+def test_seeding_schedules_drops_cached_schedules_and_slots():
+    cache = ToolResultCache()
+    _cache_result(cache, "get_doctor_schedule", {"doctor_id": "doc_001"}, {"schedule": []})
+    _cache_result(cache, "get_available_slots", SLOTS_ARGS, {"available_slots": {}})
+    _cache_result(cache, "get_doctors", {}, {"doctors": []})
+
+    cache.on_table_change("doctor_schedules")
+
+    assert cache.get("get_doctor_schedule", {"doctor_id": "doc_001"}) is None
+    assert cache.get("get_available_slots", SLOTS_ARGS) is None
+    assert cache.get("get_doctors", {}) is not None
+
+
+def test_seeding_doctors_drops_the_roster_and_schedules():
+    cache = ToolResultCache()
+    _cache_result(cache, "get_doctors", {"specialty": "cardiology"}, {"doctors": []})
+    _cache_result(cache, "get_doctor_schedule", {"doctor_id": "Priya Patel"}, {"schedule": []})
+
+    cache.on_table_change("doctors")
+
+    assert cache.get("get_doctors", {"specialty": "cardiology"}) is None
+    assert cache.get("get_doctor_schedule", {"doctor_id": "Priya Patel"}) is None
+
+
+def test_availability_override_drops_only_that_dates_slots():
+    cache = ToolResultCache()
+    _cache_result(cache, "get_available_slots", SLOTS_ARGS, {"available_slots": {}})
+    _cache_result(cache, "get_available_slots", {**SLOTS_ARGS, "date": "2030-01-08"}, {"available_slots": {}})
+    _cache_result(cache, "get_doctor_schedule", {"doctor_id": "doc_001"}, {"schedule": []})
+
+    cache.on_table_change("doctor_availability", "2030-01-07")
+
+    assert cache.get("get_available_slots", SLOTS_ARGS) is None
+    assert cache.get("get_available_slots", {**SLOTS_ARGS, "date": "2030-01-08"}) is not None
+    assert cache.get("get_doctor_schedule", {"doctor_id": "doc_001"}) is not None
+
+
+def test_coalesced_calls_are_not_counted_as_misses(monkeypatch):
+    cache = ToolResultCache()
+    monkeypatch.setattr(mcp, "get_result_cache", lambda: cache)
+
+    async def slow_get_doctors(args):
+        await asyncio.sleep(0.05)
+        return {"doctors": []}
+
+    monkeypatch.setitem(mcp._async_handlers, "get_doctors", slow_get_doctors)
+
+    async def scenario():
+        return await asyncio.gather(*(mcp.call_tool_async("get_doctors", {}) for _ in range(30)))
+
+    assert all(result == {"doctors": []} for result in asyncio.run(scenario()))
+    stats = cache.stats()["tools"]["get_doctors"]
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (0, 1, 29)
+
+    assert asyncio.run(mcp.call_tool_async("get_doctors", {})) == {"doctors": []}
+    assert cache.stats()["tools"]["get_doctors"]["hits"] == 1
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.occupancy = OccupancyIndex()
+        self.doctor_cache = TTLCache()
+
+    def add_change_listener(self, listener):
+        pass
+
+
+def test_cold_lookup_that_loads_occupancy_is_cached(monkeypatch):
+    db = FakeDatabase()
+    cache = ToolResultCache()
+    cache.attach(db)
+    monkeypatch.setattr(mcp, "get_result_cache", lambda: cache)
+    monkeypatch.setattr(result_cache, "get_db", lambda: db)
+
+    async def get_available_slots(args):
+        # A cold lookup loads the day's occupancy before answering
+        db.occupancy.load_day(["doc_1"], args["date"], [])
+        return {"available_slots": {"09:00": []}}
+
+    monkeypatch.setitem(mcp._async_handlers, "get_available_slots", get_available_slots)
+
+    asyncio.run(mcp.call_tool_async("get_available_slots", SLOTS_ARGS))
+
+    assert cache.get("get_available_slots", SLOTS_ARGS) == {"available_slots": {"09:00": []}}
+
+    db.occupancy.book("doc_1", "2030-01-07", "09:00")
+
+    assert cache.get("get_available_slots", SLOTS_ARGS) is None
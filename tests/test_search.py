@@ -0,0 +1,56 @@
+"""
+Doctor search index: exact IDs and full names rank first, typos and prefixes
+still match, and specialties are only searched when no name is close
+"""
+
+from backend.search import DoctorSearchIndex, normalize
+
+DOCTORS = [
+    {"id": "doc_001", "name": "Priya Patel", "specialty": "Cardiology"},
+    {"id": "doc_002", "name": "Paul Pratt", "specialty": "Cardiology"},
+    {"id": "doc_003", "name": "Maria Gomez", "specialty": "Dermatology"},
+    {"id": "doc_004", "name": "Priya Shah", "specialty": "Pediatrics"},
+]
+
+
+def _ids(matches):
+    return [doctor["id"] for _, doctor in matches]
+
+
+def test_normalize_drops_title_and_punctuation():
+    assert normalize("  Dr. Priya-Patel ") == "priya patel"
+    assert normalize("Doctor O'Neil") == "o neil"
+
+
+def test_exact_id_is_the_only_match():
+    assert DoctorSearchIndex(DOCTORS).search(" doc_003 ") == [(1.0, DOCTORS[2])]
+
+
+def test_full_name_outranks_partial_matches():
+    matches = DoctorSearchIndex(DOCTORS).search("Dr. Priya Patel")
+
+    assert matches[0] == (1.0, DOCTORS[0])
+    assert "doc_004" in _ids(matches[1:])
+
+
+def test_word_prefixes_match():
+    assert _ids(DoctorSearchIndex(DOCTORS).search("pri pat")) == ["doc_001"]
+
+
+def test_typo_still_finds_the_doctor():
+    matches = DoctorSearchIndex(DOCTORS).search("Maria Gomes")
+
+    assert _ids(matches)[0] == "doc_003"
+    assert matches[0][0] < 1.0
+
+
+def test_specialty_is_searched_when_no_name_matches():
+    assert _ids(DoctorSearchIndex(DOCTORS).search("cardio")) == ["doc_002", "doc_001"]
+
+
+def test_unrelated_terms_and_limit():
+    index = DoctorSearchIndex(DOCTORS)
+
+    assert index.search("zzzz") == []
+    assert index.search("   ") == []
+    assert len(index.search("cardiology", limit=1)) == 1
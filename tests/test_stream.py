@@ -0,0 +1,75 @@
+"""
+/mcp/stream: text arrives as token events and every call ends with one result event
+"""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from backend import main, mcp
+from backend.result_cache import ToolResultCache
+
+client = TestClient(main.app)
+
+
+def _events(response):
+    """Parse an SSE body into (event, data) pairs"""
+    events = []
+    for block in response.text.split("\n\n"):
+        if not block:
+            continue
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_streamed_answer_is_framed_as_tokens_then_result(monkeypatch):
+    async def general_query(args):
+        yield "Drink "
+        yield "water."
+        yield {"answer": "Drink water.", "question": args["question"]}
+
+    monkeypatch.setitem(mcp._stream_handlers, "general_query", general_query)
+
+    response = client.post("/mcp/stream", json={"name": "general_query", "args": {"question": "Thirsty?"}})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text.endswith("\n\n")
+    assert _events(response) == [
+        ("token", {"text": "Drink "}),
+        ("token", {"text": "water."}),
+        ("result", {"answer": "Drink water.", "question": "Thirsty?"}),
+    ]
+
+
+def test_failed_stream_ends_with_an_error_result(monkeypatch):
+    async def general_query(args):
+        yield "Partial"
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setitem(mcp._stream_handlers, "general_query", general_query)
+
+    events = _events(client.post("/mcp/stream", json={"name": "general_query", "args": {"question": "?"}}))
+
+    assert events[0] == ("token", {"text": "Partial"})
+    assert events[-1] == ("result", {"error": "Tool execution failed: model unavailable", "tool": "general_query"})
+
+
+def test_non_streaming_tool_sends_only_the_result(monkeypatch):
+    monkeypatch.setattr(mcp, "get_result_cache", lambda: ToolResultCache())
+
+    async def get_doctors(args):
+        return {"doctors": [{"id": "doc_1"}]}
+
+    monkeypatch.setitem(mcp._async_handlers, "get_doctors", get_doctors)
+
+    events = _events(client.post("/mcp/stream", json={"name": "get_doctors", "args": {}}))
+
+    assert events == [("result", {"doctors": [{"id": "doc_1"}]})]
+
+
+def test_invalid_arguments_send_only_an_error_result():
+    events = _events(client.post("/mcp/stream", json={"name": "general_query", "args": {}}))
+
+    assert events == [("result", {"error": "Missing required field: question"})]
@@ -0,0 +1,122 @@
+"""
+Sync and async tools share validation, ranking and response shaping, so both
+paths must answer alike; the sync call_tool keeps the cache in front of handlers
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from backend import assignment, mcp
+from backend.database import RpcUnavailableError, SlotTakenError
+from backend.occupancy import OccupancyIndex
+from backend.result_cache import ToolResultCache
+from backend.tools import booking
+
+DATE = (date.today() + timedelta(days=7)).isoformat()
+DOCTORS = [
+    {"id": "doc_1", "name": "Ada Heart", "specialty": "cardiology"},
+    {"id": "doc_2", "name": "Ben Pulse", "specialty": "cardiology"},
+]
+
+
+class FakeDatabase:
+    """book_slot is not deployed; doc_1 is busier today and its slot is already taken"""
+
+    def __init__(self):
+        self.occupancy = OccupancyIndex()
+        self.occupancy.load_day(["doc_1", "doc_2"], DATE, [{"doctor_id": "doc_1", "appointment_time": "09:00"}])
+        self.book_slot_candidates = None
+        self.inserted = []
+
+    def get_available_doctors(self, specialty, date, time):
+        return list(DOCTORS)
+
+    def get_doctor_by_id(self, doctor_id):
+        return next((doctor for doctor in DOCTORS if doctor["id"] == doctor_id), None)
+
+    def book_slot(self, booking_data, candidates=None):
+        self.book_slot_candidates = candidates
+        raise RpcUnavailableError("book_slot")
+
+    def create_appointment(self, booking_data):
+        if booking_data["doctor_id"] == "doc_1":
+            raise SlotTakenError("taken")
+        self.inserted.append(dict(booking_data))
+        return booking_data
+
+
+class FakeAsyncDatabase(FakeDatabase):
+    async def get_available_doctors(self, specialty, date, time):
+        return FakeDatabase.get_available_doctors(self, specialty, date, time)
+
+    async def get_doctor_by_id(self, doctor_id):
+        return FakeDatabase.get_doctor_by_id(self, doctor_id)
+
+    async def book_slot(self, booking_data, candidates=None):
+        return FakeDatabase.book_slot(self, booking_data, candidates)
+
+    async def create_appointment(self, booking_data):
+        return FakeDatabase.create_appointment(self, booking_data)
+
+
+def _book_both(monkeypatch, **overrides):
+    """Book once through each path; returns [(result, db), ...] for sync then async"""
+    monkeypatch.setattr(assignment, "_strategy", assignment.LeastBookedStrategy())
+    args = {"user_id": "patient-1", "date": DATE, "time": "10:00", "specialty": "cardiology"}
+    args.update(overrides)
+
+    sync_db, async_db = FakeDatabase(), FakeAsyncDatabase()
+    monkeypatch.setattr(booking, "get_db", lambda: sync_db)
+    monkeypatch.setattr(booking, "get_async_db", lambda: async_db)
+    return [
+        (booking.book(**args), sync_db),
+        (asyncio.run(booking.book_async(**args)), async_db),
+    ]
+
+
+def _comparable(result):
+    return {key: value for key, value in result.items() if key not in ("confirmation_number", "message")}
+
+
+def test_both_paths_rank_with_the_assignment_strategy(monkeypatch):
+    (sync_result, sync_db), (async_result, async_db) = _book_both(monkeypatch)
+
+    assert sync_db.book_slot_candidates == async_db.book_slot_candidates == ["doc_2", "doc_1"]
+    assert _comparable(sync_result) == _comparable(async_result)
+    assert sync_result["details"]["Doctor ID"] == "doc_2"
+
+
+def test_both_paths_report_a_taken_requested_doctor_alike(monkeypatch):
+    (sync_result, _), (async_result, _) = _book_both(monkeypatch, doctor_id="doc_1")
+
+    assert sync_result == async_result
+    assert sync_result["error"] is True
+
+
+@pytest.mark.parametrize("overrides", [{"time": "10:07"}, {"doctor_id": "doc_9"}])
+def test_both_paths_reject_bad_requests_alike(monkeypatch, overrides):
+    (sync_result, sync_db), (async_result, _) = _book_both(monkeypatch, **overrides)
+
+    assert sync_result == async_result
+    assert sync_result["error"] is True
+    assert sync_db.inserted == []
+
+
+def test_sync_call_tool_answers_repeat_reads_from_the_cache(monkeypatch):
+    cache = ToolResultCache()
+    monkeypatch.setattr(mcp, "get_result_cache", lambda: cache)
+    calls = []
+    monkeypatch.setitem(mcp._handlers, "get_doctors", lambda args: calls.append(args) or {"doctors": []})
+
+    assert mcp.call_tool("get_doctors", {"specialty": "Cardiology"}) == {"doctors": []}
+    assert mcp.call_tool("get_doctors", {"specialty": " cardiology "}) == {"doctors": []}
+
+    assert len(calls) == 1
+    assert cache.stats()["tools"]["get_doctors"]["hits"] == 1
+
+
+def test_sync_call_tool_rejects_unknown_tools_and_bad_arguments():
+    assert mcp.call_tool("no_such_tool", {})["error"] == "Unknown tool: no_such_tool"
+    assert "error" in mcp.call_tool("get_available_slots", {"date": DATE})
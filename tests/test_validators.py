@@ -0,0 +1,46 @@
+"""
+Compiled argument validators: each failure names the field and what was expected
+"""
+
+import pytest
+
+from backend.mcp import compile_validator, validate_tool_args
+
+BOOKING = {"user_id": "patient-1", "date": "2030-01-07", "time": "09:00"}
+
+
+@pytest.mark.parametrize("tool, args, message", [
+    ("book_appointment", {**BOOKING, "user_id": ""}, "Missing required field: user_id"),
+    ("book_appointment", {"date": "2030-01-07", "time": "09:00"}, "Missing required field: user_id"),
+    ("book_appointment", {**BOOKING, "date": "07/01/2030"},
+     "Invalid value for 'date': '07/01/2030' (expected YYYY-MM-DD)"),
+    ("book_appointment", {**BOOKING, "time": "9am"}, "Invalid value for 'time': '9am' (expected HH:MM)"),
+    ("book_appointment", {**BOOKING, "user_id": 7}, "Invalid type for 'user_id': expected string"),
+    ("find_next_available", {}, "Missing required field: specialty or doctor_id"),
+    ("find_next_available", {"specialty": "cardiology", "days": "7"}, "Invalid type for 'days': expected integer"),
+    ("find_next_available", {"specialty": "cardiology", "days": True}, "Invalid type for 'days': expected integer"),
+    ("find_next_available", {"specialty": "cardiology", "time_windows": ["09:00-12:00", "noon"]},
+     "Invalid value for 'time_windows[1]': 'noon' (expected HH:MM-HH:MM)"),
+    ("no_such_tool", {}, "Unknown tool: no_such_tool"),
+])
+def test_invalid_arguments_name_the_problem(tool, args, message):
+    assert validate_tool_args(tool, args) == (False, message)
+
+
+@pytest.mark.parametrize("tool, args", [
+    ("book_appointment", {**BOOKING, "specialty": None, "reason": "checkup"}),
+    ("book_appointment", {**BOOKING, "unexpected": 1}),
+    ("find_next_available", {"doctor_id": "doc_001", "days": 7, "time_windows": [" 09:00 - 12:00 "]}),
+])
+def test_valid_arguments_pass(tool, args):
+    assert validate_tool_args(tool, args) == (True, None)
+
+
+def test_nested_paths_and_non_object_arguments():
+    validator = compile_validator({
+        "type": "object",
+        "properties": {"patient": {"type": "object", "properties": {"dob": {"type": "string", "format": "date"}}}},
+    })
+
+    assert validator({"patient": {"dob": "1990-13-01"}}) == "Invalid value for 'patient.dob': '1990-13-01' (expected YYYY-MM-DD)"
+    assert validator(["not", "an", "object"]) == "Tool arguments must be an object"
@@ -0,0 +1,109 @@
+"""
+Write-ahead log: concurrent appends share an fsync, segments rotate and prune,
+and unreadable lines are skipped instead of stalling readers
+"""
+
+import os
+import threading
+
+from backend import wal as wal_module
+from backend.wal import WriteAheadLog
+
+
+def _count_fsyncs(monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(wal_module.os, "fsync", lambda fd: calls.append(fd) or real_fsync(fd))
+    return calls
+
+
+def test_concurrent_appends_share_fsyncs(tmp_path, monkeypatch):
+    log = WriteAheadLog(str(tmp_path), commit_delay=0.05)
+    fsyncs = _count_fsyncs(monkeypatch)
+    barrier = threading.Barrier(20)
+
+    def append(number):
+        barrier.wait()
+        log.append({"n": number})
+
+    threads = [threading.Thread(target=append, args=(number,)) for number in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(record["n"] for record in log.records()) == list(range(20))
+    assert 1 <= len(fsyncs) < 20
+
+
+def test_append_is_durable_when_it_returns(tmp_path, monkeypatch):
+    log = WriteAheadLog(str(tmp_path), commit_delay=0)
+    fsyncs = _count_fsyncs(monkeypatch)
+
+    log.append({"n": 1})
+
+    assert len(fsyncs) == 1
+
+
+def test_full_segment_rotates_and_reads_stay_in_order(tmp_path):
+    log = WriteAheadLog(str(tmp_path), segment_max_bytes=40, commit_delay=0)
+    for number in range(6):
+        log.append({"n": number, "pad": "x" * 40})
+
+    assert len(log.segments()) == 6
+    assert [record["n"] for record in log.records()] == list(range(6))
+
+
+def test_checkpoint_resumes_in_a_later_segment(tmp_path):
+    log = WriteAheadLog(str(tmp_path), segment_max_bytes=40, commit_delay=0)
+    for number in range(4):
+        log.append({"n": number, "pad": "x" * 40})
+
+    checkpoints = [(segment, offset) for segment, offset, _ in log.read()]
+
+    assert [record["n"] for _, _, record in log.read(*checkpoints[1])] == [2, 3]
+
+
+def test_prune_keeps_the_active_segment(tmp_path):
+    log = WriteAheadLog(str(tmp_path), segment_max_bytes=40, commit_delay=0)
+    for number in range(3):
+        log.append({"n": number, "pad": "x" * 40})
+    active = os.path.basename(log.segments()[-1])
+
+    assert log.prune("~") == 2   # sorts after every segment name
+    assert [os.path.basename(path) for path in log.segments()] == [active]
+
+
+def _write_raw(log, data):
+    with open(log.segments()[-1], "ab") as f:
+        f.write(data)
+
+
+def test_corrupt_line_is_skipped_and_counted_once(tmp_path):
+    log = WriteAheadLog(str(tmp_path), commit_delay=0)
+    log.append({"n": 1})
+    _write_raw(log, b'{"n": 2, "trunc\n')
+    log.append({"n": 3})
+
+    assert [record["n"] for record in log.records()] == [1, 3]
+    assert [record["n"] for record in log.records()] == [1, 3]
+    assert log.corrupt_lines == 1
+
+
+def test_checkpoint_moves_past_a_corrupt_line(tmp_path):
+    log = WriteAheadLog(str(tmp_path), commit_delay=0)
+    log.append({"n": 1})
+    first = next(iter(log.read()))[:2]
+    _write_raw(log, b"\xff\xfe not json\n")
+    log.append({"n": 2})
+
+    assert [record["n"] for _, _, record in log.read(*first)] == [2]
+
+
+def test_torn_tail_is_not_counted_as_corrupt(tmp_path):
+    log = WriteAheadLog(str(tmp_path), commit_delay=0)
+    log.append({"n": 1})
+    _write_raw(log, b'{"n": 2')
+
+    assert [record["n"] for record in log.records()] == [1]
+    assert log.corrupt_lines == 0
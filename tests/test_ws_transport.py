@@ -0,0 +1,140 @@
+"""
+WebSocket chat sessions: which slots are watched and when slot_taken is pushed
+"""
+
+import asyncio
+import json
+from datetime import date, timedelta
+
+from backend import ws_transport
+from backend.availability import window_mask
+from backend.events import EventBus
+from backend.tools.doctors import _build_next_available_response
+from backend.ws_transport import ChatSession
+
+MONDAY = date(2030, 1, 7)
+DOCTORS = [
+    {"id": "doc_1", "name": "Ada Heart", "specialty": "cardiology"},
+    {"id": "doc_2", "name": "Ben Pulse", "specialty": "cardiology"},
+]
+WEEKLY = {
+    doctor["id"]: [{"day_of_week": 0, "start_time": "09:00", "end_time": "09:30", "is_available": True}]
+    for doctor in DOCTORS
+}
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+
+def _next_available_result():
+    """A find_next_available result built by the tool's own response code"""
+    search = {
+        "start": MONDAY,
+        "end": MONDAY + timedelta(days=1),
+        "limit": 5,
+        "allowed": window_mask([]),
+        "earliest_slot": 0,
+        "specialty": "cardiology",
+    }
+    return _build_next_available_response(search, DOCTORS, WEEKLY, {}, [])
+
+
+def test_find_next_available_results_are_watched():
+    session = ChatSession(FakeWebSocket())
+
+    session._watch_result("find_next_available", _next_available_result())
+
+    assert session._watched == {
+        ("doc_1", "2030-01-07", "09:00"): "Ada Heart",
+        ("doc_2", "2030-01-07", "09:00"): "Ben Pulse",
+        ("doc_1", "2030-01-07", "09:15"): "Ada Heart",
+        ("doc_2", "2030-01-07", "09:15"): "Ben Pulse",
+    }
+
+
+def test_available_slots_results_are_watched():
+    session = ChatSession(FakeWebSocket())
+
+    session._watch_result("get_available_slots", {
+        "date": "2030-01-07",
+        "available_slots": {"09:00": [{"doctor_id": "doc_1", "doctor_name": "Ada Heart"}]},
+    })
+
+    assert session._watched == {("doc_1", "2030-01-07", "09:00"): "Ada Heart"}
+
+
+def test_errors_are_not_watched():
+    session = ChatSession(FakeWebSocket())
+
+    session._watch_result("find_next_available", {"error": True, "next_available": []})
+
+    assert session._watched == {}
+
+
+def test_own_booking_unwatches_that_time():
+    session = ChatSession(FakeWebSocket())
+    session._watch_result("find_next_available", _next_available_result())
+
+    session._unwatch_booking({"date": "2030-01-07", "time": "9:00"})
+
+    assert set(session._watched) == {("doc_1", "2030-01-07", "09:15"), ("doc_2", "2030-01-07", "09:15")}
+
+
+def test_slot_taken_is_pushed_once_for_watched_slots():
+    async def scenario():
+        websocket = FakeWebSocket()
+        session = ChatSession(websocket)
+        session._watch_result("find_next_available", _next_available_result())
+
+        bus = EventBus()
+        subscription = bus.subscribe()
+        pump = asyncio.create_task(session._pump_events(subscription))
+
+        bus.on_slot_change("doc_2", "2030-01-07", "09:15", True)
+        bus.on_slot_change("doc_2", "2030-01-07", "09:15", True)   # already reported
+        bus.on_slot_change("doc_1", "2030-01-08", "09:00", True)   # never shown
+        bus.on_slot_change("doc_1", "2030-01-07", "09:00", False)  # a release
+        await asyncio.sleep(0.05)
+        pump.cancel()
+        return websocket.sent
+
+    assert asyncio.run(scenario()) == [{
+        "type": "event",
+        "event": "slot_taken",
+        "doctor_id": "doc_2",
+        "doctor_name": "Ben Pulse",
+        "date": "2030-01-07",
+        "time": "09:15",
+    }]
+
+
+def test_cancel_is_handled_while_every_slot_is_taken(monkeypatch):
+    async def stream_tool(name, args):
+        if name == "slow":
+            await asyncio.Event().wait()
+        yield "result", {"tool": name}
+
+    monkeypatch.setattr(ws_transport, "stream_tool", stream_tool)
+
+    async def scenario():
+        websocket = FakeWebSocket()
+        session = ChatSession(websocket)
+        session._in_flight = asyncio.Semaphore(1)
+
+        await session._handle(json.dumps({"type": "call", "id": 1, "name": "slow"}))
+        await asyncio.sleep(0)
+        # Must return at once even though call 1 holds the only slot
+        await asyncio.wait_for(session._handle(json.dumps({"type": "call", "id": 2, "name": "quick"})), 1)
+        await asyncio.wait_for(session._handle(json.dumps({"type": "cancel", "id": 1})), 1)
+        await asyncio.sleep(0.05)
+        return websocket.sent, session._calls
+
+    sent, running = asyncio.run(scenario())
+
+    assert sent == [{"type": "result", "id": 2, "result": {"tool": "quick"}}]
+    assert running == {}